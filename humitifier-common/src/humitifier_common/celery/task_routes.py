@@ -1,8 +1,14 @@
 from .task_names import SERVER_QUEUE_PREFIX, SCANNER_QUEUE_PREFIX
 
+SCANNER_QUEUE = "scanner"
+# Consumed by a dedicated scanner worker (see the scanner's docker/entrypoint.sh);
+# tasks sent here skip the (possibly long) line of tasks on the regular scanner
+# queue. Used for manual scans.
+SCANNER_PRIORITY_QUEUE = "scanner_priority"
+
 
 task_routes = {
-    f"{SCANNER_QUEUE_PREFIX}.*": {"queue": "scanner"},
+    f"{SCANNER_QUEUE_PREFIX}.*": {"queue": SCANNER_QUEUE},
     f"{SERVER_QUEUE_PREFIX}.*": {"queue": "default"},
     f"celery.*": {"queue": "default"},  # Needed for celery tasks to be scheduled
 }
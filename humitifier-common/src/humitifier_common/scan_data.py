@@ -34,10 +34,25 @@ class ScanInput(BaseModel):
         each key represents the fact type and the value provides corresponding
         scanning options.
     :type artefacts: dict[str, ArtefactScanOptions]
+    :ivar partial: Whether only a subset of the artefacts configured for the host
+        is requested. The results of a partial scan are merged with the previous
+        scan of the host by the server.
+    :type partial: bool
+    :ivar available_artefacts: Artefacts that are configured for the host, but were
+        not requested. The scanner will collect these only if a requested artefact
+        requires them, using the given options.
+    :type available_artefacts: dict[str, ArtefactScanOptions]
+    :ivar scan_lease: Identifies the dispatch of this scan by the server. The server
+        uses this to drop the results of scans that were superseded by another scan
+        of the same host.
+    :type scan_lease: str | None
     """
 
     hostname: str
     artefacts: dict[str, ArtefactScanOptions]
+    partial: bool = False
+    available_artefacts: dict[str, ArtefactScanOptions] = {}
+    scan_lease: str | None = None
 
 
 class ScanErrorMetadata(BaseModel):
@@ -7,4 +7,4 @@ source /app/.venv/bin/activate
 cd /app/src/ || exit 1
 
 # Run the probe
-exec python -m celery -A humitifier_scanner.celery_worker inspect ping -d scanner@$HOSTNAME
+exec python -m celery -A humitifier_scanner.celery_worker inspect ping -d scanner@$HOSTNAME,scanner_priority@$HOSTNAME
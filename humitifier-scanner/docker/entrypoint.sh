@@ -9,5 +9,22 @@ cd /app/src/ || exit 1
 # Set default log level to INFO if not provided via the environment variable
 LOG_LEVEL=${LOG_LEVEL:-INFO}
 
-# Run celery worker
-exec python -m celery -A humitifier_scanner.celery_worker worker -Q scanner -l "$LOG_LEVEL" -n scanner@%h
+# Number of scans that can run at once for the priority queue, used for manual scans
+PRIORITY_CONCURRENCY=${PRIORITY_CONCURRENCY:-1}
+
+# Run the celery workers. Celery doesn't consume the queues of a worker in the
+# order they are listed, and a worker prefetches scans from its queues; manual
+# scans would end up waiting behind regular scans. The priority queue therefore
+# gets a dedicated worker, which only reserves the scans it is running.
+python -m celery -A humitifier_scanner.celery_worker worker -Q scanner_priority -c "$PRIORITY_CONCURRENCY" --prefetch-multiplier=1 -l "$LOG_LEVEL" -n scanner_priority@%h &
+python -m celery -A humitifier_scanner.celery_worker worker -Q scanner -l "$LOG_LEVEL" -n scanner@%h &
+
+# Pass shutdown signals on to both workers
+trap 'kill -TERM $(jobs -p) 2>/dev/null' TERM INT
+
+# Stop the other worker (and thereby the container) if either worker exits
+wait -n
+status=$?
+kill -TERM $(jobs -p) 2>/dev/null
+wait
+exit $status
@@ -110,6 +110,11 @@ def _get_scan_order(
 
         collectors.append(collector)
 
+    # Partial scans only request the artefacts that are due, which may not include
+    # the facts those artefacts require. Add those from the available artefacts.
+    if input_data.partial:
+        collectors = _add_required_collectors(collectors, input_data)
+
     requested_facts = [
         collector.artefact_name()
         for collector in collectors
@@ -146,6 +151,35 @@ def _get_scan_order(
     return scan_order, errors
 
 
+def _add_required_collectors(
+    collectors: list[Type[Collector]], input_data: ScanInput
+) -> list[Type[Collector]]:
+    collectors = list(collectors)
+    collected = {collector.artefact_name() for collector in collectors}
+    queue = deque(collectors)
+
+    while queue:
+        collector = queue.popleft()
+
+        for required_fact in collector.required_facts:
+            artefact = required_fact.__artefact_name__
+            if artefact in collected or artefact not in input_data.available_artefacts:
+                # Missing facts are reported when resolving the dependencies
+                continue
+
+            variant = input_data.available_artefacts[artefact].variant
+            required_collector = registry.get(artefact, variant)
+            if not required_collector:
+                continue
+
+            logger.debug(f"Adding required artefact {artefact} to partial scan")
+            collectors.append(required_collector)
+            collected.add(artefact)
+            queue.append(required_collector)
+
+    return collectors
+
+
 def resolve_collector_order(collectors, dependencies):
     # Step 1: Build the dependency graph and in-degree count
     dependency_graph = defaultdict(set)
@@ -26,3 +26,6 @@ class AnnotatedAlertData(BaseModel):
 class GeneratedAlerts(BaseModel):
     host: str
     alerts: list[AnnotatedAlertData]
+    # Creators whose stored alerts should be kept as-is, for example because
+    # the generator did not finish in time
+    preserved_creators: list[str] = []
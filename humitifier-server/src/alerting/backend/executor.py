@@ -0,0 +1,197 @@
+import math
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from functools import cache
+from typing import TYPE_CHECKING
+
+import sentry_sdk
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from alerting.backend.data import AlertData
+
+if TYPE_CHECKING:
+    from .generator import BaseAlertGenerator
+
+
+@dataclass
+class GeneratorResult:
+    """The outcome of running a single alert generator."""
+
+    generator: "BaseAlertGenerator"
+    alerts: list[AlertData] = field(default_factory=list)
+    duration: float = 0.0
+    timed_out: bool = False
+
+    @property
+    def creator(self) -> str:
+        return self.generator._creator
+
+
+class BaseGeneratorExecutor:
+    """
+    Runs a list of alert generators and collects their results.
+
+    Results are always returned in the same order as the given generators, so
+    callers can still make decisions based on generator order (like stopping on
+    the first fatal alert).
+
+    :param timeout: The time budget in seconds for a single generator. None
+        disables the budget.
+    """
+
+    def __init__(self, timeout: float | None = None):
+        self.timeout = timeout
+
+    def run(self, generators: list["BaseAlertGenerator"]) -> list[GeneratorResult]:
+        raise NotImplementedError
+
+    @staticmethod
+    def _run_generator(
+        generator: "BaseAlertGenerator", parent_span=None
+    ) -> GeneratorResult:
+        span = (
+            parent_span.start_child(
+                op="alerting.generator",
+                name=generator._creator,
+            )
+            if parent_span
+            else nullcontext()
+        )
+
+        with span:
+            start = time.monotonic()
+            alerts = generator.generate_alerts()
+            duration = time.monotonic() - start
+
+        if not alerts:
+            alerts = []
+        elif isinstance(alerts, AlertData):
+            alerts = [alerts]
+
+        return GeneratorResult(generator=generator, alerts=alerts, duration=duration)
+
+
+class SerialGeneratorExecutor(BaseGeneratorExecutor):
+    """
+    Runs all generators one after another in the calling thread.
+
+    A running generator cannot be interrupted, so the time budget is only
+    checked afterwards; an overrunning generator is reported as timed out, but
+    its alerts are discarded just like in the threaded executor.
+    """
+
+    def run(self, generators: list["BaseAlertGenerator"]) -> list[GeneratorResult]:
+        parent_span = sentry_sdk.get_current_span()
+        results = []
+
+        for generator in generators:
+            result = self._run_generator(generator, parent_span)
+            if self.timeout is not None and result.duration > self.timeout:
+                result.alerts = []
+                result.timed_out = True
+            results.append(result)
+
+        return results
+
+
+class ThreadPoolGeneratorExecutor(BaseGeneratorExecutor):
+    """
+    Runs generators concurrently in a thread pool.
+
+    Alert generators are pure Python and do not touch the database, so they
+    can safely run in worker threads. Generators that exceed their time budget
+    are abandoned; their thread is left to finish in the background, and its
+    result is ignored. Threads cannot be interrupted, so every run uses its own
+    pool, which is shut down without waiting for abandoned generators. This way
+    a hung generator never takes up a worker of a later run.
+
+    :param max_workers: The maximum number of threads to use
+    :param timeout: The time budget in seconds for a single generator. The
+        budget starts when the generator starts running, not when it is queued.
+        The run as a whole gets one budget per round of `max_workers`
+        generators; generators that haven't finished (or even started) by then
+        are reported as timed out, so hung generators cannot stall the run.
+    """
+
+    # How often we check for generators that have exceeded their budget
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, max_workers: int = 4, timeout: float | None = None):
+        super().__init__(timeout=timeout)
+        self.max_workers = max_workers
+
+    def run(self, generators: list["BaseAlertGenerator"]) -> list[GeneratorResult]:
+        if not generators:
+            return []
+
+        parent_span = sentry_sdk.get_current_span()
+        started_at: dict[int, float] = {}
+        results: dict[int, GeneratorResult] = {}
+
+        def _task(index: int, generator: "BaseAlertGenerator") -> GeneratorResult:
+            started_at[index] = time.monotonic()
+            return self._run_generator(generator, parent_span)
+
+        deadline = None
+        if self.timeout is not None:
+            rounds = math.ceil(len(generators) / self.max_workers)
+            deadline = time.monotonic() + self.timeout * rounds
+
+        pool = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="alert-generator"
+        )
+        pending: dict[Future, int] = {
+            pool.submit(_task, index, generator): index
+            for index, generator in enumerate(generators)
+        }
+
+        try:
+            while pending:
+                done, _ = wait(
+                    pending,
+                    timeout=self.POLL_INTERVAL if self.timeout is not None else None,
+                    return_when=FIRST_COMPLETED,
+                )
+
+                for future in done:
+                    index = pending.pop(future)
+                    # Re-raises any exception raised by the generator
+                    results[index] = future.result()
+
+                if deadline is None:
+                    continue
+
+                now = time.monotonic()
+                for future, index in list(pending.items()):
+                    start = started_at.get(index)
+                    if now > deadline or (
+                        start is not None and now - start > self.timeout
+                    ):
+                        del pending[future]
+                        results[index] = GeneratorResult(
+                            generator=generators[index],
+                            duration=now - start if start is not None else 0.0,
+                            timed_out=True,
+                        )
+        finally:
+            # Don't wait for abandoned generators; cancel anything not started
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        return [results[index] for index in range(len(generators))]
+
+
+@cache
+def get_generator_executor() -> BaseGeneratorExecutor:
+    """
+    Returns the executor configured by ALERTING_GENERATOR_EXECUTOR.
+    """
+    executor_class = import_string(settings.ALERTING_GENERATOR_EXECUTOR)
+    kwargs = {"timeout": settings.ALERTING_GENERATOR_TIMEOUT}
+
+    if issubclass(executor_class, ThreadPoolGeneratorExecutor):
+        kwargs["max_workers"] = settings.ALERTING_GENERATOR_MAX_WORKERS
+
+    return executor_class(**kwargs)
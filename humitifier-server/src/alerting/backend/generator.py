@@ -2,10 +2,8 @@ from datetime import datetime
 from typing import TypeVar
 
 from django.core.exceptions import ImproperlyConfigured
-from django.db.models import QuerySet
 
 from alerting.backend.data import AlertData, AlertGeneratorType, AnnotatedAlertData
-from alerting.models import Alert
 from hosts.models import Host
 from humitifier_common.artefacts.registry import registry as artefacts_registry
 from humitifier_common.scan_data import ScanOutput
@@ -91,31 +89,25 @@ class BaseAlertGenerator(metaclass=AlertGeneratorMetaclass):
     verbose_name: str = None
 
     def __init__(self):
-        self.existing_alerts = Alert.objects.none()
-
         if self.verbose_name is None:
             raise ImproperlyConfigured("Alert generators must specifiy a verbose name")
 
-    def run(
-        self, existing_alerts: QuerySet[Alert]
-    ) -> AnnotatedAlertData | list[AnnotatedAlertData]:
-        self.existing_alerts = existing_alerts
-
-        alerts = self.generate_alerts()
-        if not alerts:
-            return []
-
-        if isinstance(alerts, AlertData):
-            alerts = [alerts]
+    def annotate_alerts(
+        self, alerts: list[AlertData], existing_identifiers: set[str | None]
+    ) -> list[AnnotatedAlertData]:
+        """
+        Wraps generated alerts with the information needed to save them.
 
+        :param alerts: The alerts generated by this generator
+        :param existing_identifiers: The custom identifiers of the alerts this
+            generator already has stored for the host
+        """
         return [
             AnnotatedAlertData(
                 creator=self._creator,
                 creator_verbose_name=self.verbose_name,
                 data=alert,
-                existing=self.existing_alerts.filter(
-                    custom_identifier=alert.custom_identifier
-                ).exists(),
+                existing=alert.custom_identifier in existing_identifiers,
             )
             for alert in alerts
         ]
@@ -16,6 +16,15 @@ class _AlertGeneratorRegistry:
         self._scan_alert_generators: list[type["BaseScanAlertGenerator"]] = []
         self._artefact_alert_generators: list[type["BaseArtefactAlertGenerator"]] = []
 
+        # Indexes, kept up to date by register()
+        self._generators_by_creator: dict[
+            str, type["BaseScanAlertGenerator"] | type["BaseArtefactAlertGenerator"]
+        ] = {}
+        self._generators_by_artefact: dict[
+            str, list[type["BaseArtefactAlertGenerator"]]
+        ] = {}
+        self._alert_types: list[str] | None = None
+
     def register(
         self,
         generator: type["BaseScanAlertGenerator"] | type["BaseArtefactAlertGenerator"],
@@ -23,21 +32,27 @@ class _AlertGeneratorRegistry:
         match generator._type:
             case AlertGeneratorType.ARTEFACT:
                 self._artefact_alert_generators.append(generator)
+                self._generators_by_artefact.setdefault(
+                    generator.artefact.__artefact_name__, []
+                ).append(generator)
             case AlertGeneratorType.SCAN:
                 self._scan_alert_generators.append(generator)
 
+        # Artefact generators took precedence over scan generators in the old
+        # lookup, keep it that way
+        if (
+            generator._creator not in self._generators_by_creator
+            or generator._type == AlertGeneratorType.ARTEFACT
+        ):
+            self._generators_by_creator[generator._creator] = generator
+
+        # Invalidate the cached alert types
+        self._alert_types = None
+
     def get(
         self, name: str
     ) -> type["BaseScanAlertGenerator"] | type["BaseArtefactAlertGenerator"] | None:
-        for alert_generator in self._artefact_alert_generators:
-            if alert_generator._creator == name:
-                return alert_generator
-
-        for alert_generator in self._scan_alert_generators:
-            if alert_generator._creator == name:
-                return alert_generator
-
-        return None
+        return self._generators_by_creator.get(name)
 
     def get_scan_alert_generators(
         self, scan_output: ScanOutput
@@ -49,24 +64,35 @@ class _AlertGeneratorRegistry:
     ) -> list["BaseArtefactAlertGenerator"]:
         generators = []
 
-        artefacts = list(scan_output.facts.keys())
-        artefacts += list(scan_output.metrics.keys())
+        # Only look at the artefacts in the scan, deduplicated but in order
+        artefacts = dict.fromkeys([*scan_output.facts, *scan_output.metrics])
+
+        for artefact_name in artefacts:
+            generator_classes = self._generators_by_artefact.get(artefact_name)
+            if not generator_classes:
+                continue
 
-        for generator in self._artefact_alert_generators:
-            artefact_name = generator.artefact.__artefact_name__
-            if artefact_name in artefacts:
-                data = scan_output.get_artefact_data(artefact_name)
-                generators.append(generator(data, scan_output.scan_date))
+            data = scan_output.get_artefact_data(artefact_name)
+            generators.extend(
+                generator(data, scan_output.scan_date)
+                for generator in generator_classes
+            )
 
         return generators
 
     def get_alert_types(self) -> list[str]:
-        output = [
-            generator.verbose_name for generator in self._artefact_alert_generators
-        ]
-        output += [generator.verbose_name for generator in self._scan_alert_generators]
-
-        return sorted(set(output))
+        if self._alert_types is None:
+            output = [
+                generator.verbose_name for generator in self._artefact_alert_generators
+            ]
+            output += [
+                generator.verbose_name for generator in self._scan_alert_generators
+            ]
+
+            self._alert_types = sorted(set(output))
+
+        # Return a copy, so callers can't modify the cached list
+        return list(self._alert_types)
 
 
 alert_generator_registry = _AlertGeneratorRegistry()
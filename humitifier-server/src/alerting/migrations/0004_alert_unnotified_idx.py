@@ -0,0 +1,31 @@
+# Generated by Django 5.2.9 on 2026-10-19 10:00
+
+from django.db import migrations, models
+
+
+def mark_existing_alerts_notified(apps, schema_editor):
+    # Existing alerts were never notified, as there was nothing to notify with.
+    # Don't send a digest containing every alert in the system on the first run.
+    Alert = apps.get_model("alerting", "Alert")
+    Alert.objects.filter(_notified=False).update(_notified=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("alerting", "0003_alter_alertacknowledgment_persistent"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="alert",
+            index=models.Index(
+                condition=models.Q(("_notified", False)),
+                fields=["id"],
+                name="alerting_alert_unnotified_idx",
+            ),
+        ),
+        migrations.RunPython(
+            mark_existing_alerts_notified, reverse_code=migrations.RunPython.noop
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Count, Q
 
 from alerting.backend.registry import alert_generator_registry
 from main.models import User
@@ -10,7 +11,36 @@ class AlertSeverity(models.TextChoices):
     CRITICAL = "critical"
 
 
-class AlertManager(models.Manager):
+class AlertQuerySet(models.QuerySet):
+
+    def with_acknowledgement(self):
+        """
+        Fetches the linked acknowledgement of every alert in the same query.
+
+        Both `alert.acknowledgement` and `alert.get_acknowledgment()` will use
+        the fetched value, including when there is no acknowledgement.
+        """
+        return self.select_related("acknowledgement")
+
+    def acknowledged(self):
+        return self.exclude(acknowledgement=None)
+
+    def unacknowledged(self):
+        return self.filter(acknowledgement=None)
+
+    def count_by_severity(self) -> dict[str, int]:
+        """
+        Counts the alerts in this queryset per severity, in a single query.
+        """
+        return self.aggregate(
+            **{
+                severity.value: Count("pk", filter=Q(severity=severity))
+                for severity in AlertSeverity
+            }
+        )
+
+
+class AlertManager(models.Manager.from_queryset(AlertQuerySet)):
 
     def get_for_user(self, user: User):
         if user.is_anonymous:
@@ -32,6 +62,14 @@ class AlertManager(models.Manager):
 class Alert(models.Model):
     class Meta:
         unique_together = ("host", "_creator", "custom_identifier")
+        indexes = [
+            # Used by the notification dispatcher to find unnotified alerts
+            models.Index(
+                fields=["id"],
+                condition=Q(_notified=False),
+                name="alerting_alert_unnotified_idx",
+            ),
+        ]
 
     objects = AlertManager()
 
@@ -101,21 +139,23 @@ class Alert(models.Model):
     )
 
     def get_acknowledgment(self):
-        # The attr will not exist if no link exists
-        # Thanks Django, for this amazing behavior
-        if hasattr(self, "acknowledgement"):
-            return self.acknowledgement
-
-        acknowledgments = AlertAcknowledgment.objects.filter(
-            host=self.host,
-            _creator=self._creator,
-            custom_identifier=self.custom_identifier,
-        )
-
-        if acknowledgments.exists():
-            return acknowledgments.get()
-
-        return None
+        # If the acknowledgement was fetched using select_related (see
+        # AlertQuerySet.with_acknowledgement), use that. This also covers the
+        # case where no acknowledgement is linked.
+        acknowledgement_field = self._meta.get_field("acknowledgement")
+        if acknowledgement_field.is_cached(self):
+            return acknowledgement_field.get_cached_value(self)
+
+        # Otherwise, find either the linked acknowledgement or a (persistent)
+        # acknowledgement matching this alert in a single query
+        return AlertAcknowledgment.objects.filter(
+            Q(_alert=self)
+            | Q(
+                host_id=self.host_id,
+                _creator=self._creator,
+                custom_identifier=self.custom_identifier,
+            )
+        ).first()
 
     @property
     def can_acknowledge(self):
@@ -0,0 +1,28 @@
+"""Notifications for new alerts.
+
+Unnotified alerts are periodically collected, grouped into a digest per recipient,
+and sent using a configurable backend.
+"""
+
+from .backends import (
+    BaseNotificationBackend,
+    ConsoleNotificationBackend,
+    EmailNotificationBackend,
+    FileNotificationBackend,
+    WebhookNotificationBackend,
+    get_notification_backend,
+)
+from .digest import Digest, build_digests
+from .dispatcher import dispatch_notifications
+
+__all__ = [
+    "BaseNotificationBackend",
+    "ConsoleNotificationBackend",
+    "Digest",
+    "EmailNotificationBackend",
+    "FileNotificationBackend",
+    "WebhookNotificationBackend",
+    "build_digests",
+    "dispatch_notifications",
+    "get_notification_backend",
+]
@@ -0,0 +1,105 @@
+import json
+import sys
+import urllib.request
+from functools import cache
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils.module_loading import import_string
+
+from .digest import Digest
+
+
+class BaseNotificationBackend:
+    """
+    Sends rendered digests somewhere. Backends should raise if sending fails, so
+    the alerts are retried in the next run.
+    """
+
+    def send(self, digests: list[Digest]) -> None:
+        raise NotImplementedError
+
+
+class EmailNotificationBackend(BaseNotificationBackend):
+    """
+    Sends every digest as an email, using Django's email settings (SMTP by
+    default). All digests in a batch are sent over a single connection.
+    """
+
+    def send(self, digests: list[Digest]) -> None:
+        messages = [
+            EmailMessage(
+                subject=digest.subject,
+                body=digest.body,
+                from_email=settings.ALERTING_NOTIFICATION_FROM_EMAIL,
+                to=[digest.recipient],
+            )
+            for digest in digests
+        ]
+
+        with get_connection(fail_silently=False) as connection:
+            connection.send_messages(messages)
+
+
+class WebhookNotificationBackend(BaseNotificationBackend):
+    """
+    POSTs every digest as JSON to ALERTING_NOTIFICATION_WEBHOOK_URL.
+    """
+
+    def __init__(self, url: str | None = None, timeout: float = 10):
+        self.url = url or settings.ALERTING_NOTIFICATION_WEBHOOK_URL
+        self.timeout = timeout
+
+    def send(self, digests: list[Digest]) -> None:
+        for digest in digests:
+            request = urllib.request.Request(
+                self.url,
+                data=json.dumps(digest.as_dict()).encode("utf-8"),
+                headers={"Content-Type": "application/json"},
+                method="POST",
+            )
+            # Raises for non-2XX responses
+            with urllib.request.urlopen(request, timeout=self.timeout):
+                pass
+
+
+class ConsoleNotificationBackend(BaseNotificationBackend):
+    """
+    Writes all digests to a stream (stdout by default). Meant for development
+    and testing.
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def send(self, digests: list[Digest]) -> None:
+        for digest in digests:
+            self.stream.write(
+                f"To: {digest.recipient}\nSubject: {digest.subject}\n\n{digest.body}\n"
+            )
+            self.stream.write("-" * 79 + "\n")
+        self.stream.flush()
+
+
+class FileNotificationBackend(ConsoleNotificationBackend):
+    """
+    Appends all digests to ALERTING_NOTIFICATION_FILE_PATH. Meant for
+    development and testing.
+    """
+
+    def __init__(self, path: str | None = None):
+        super().__init__()
+        self.path = path or settings.ALERTING_NOTIFICATION_FILE_PATH
+
+    def send(self, digests: list[Digest]) -> None:
+        with open(self.path, "a", encoding="utf-8") as stream:
+            self.stream = stream
+            super().send(digests)
+
+
+@cache
+def get_notification_backend() -> BaseNotificationBackend:
+    """
+    Returns the backend configured by ALERTING_NOTIFICATION_BACKEND.
+    """
+    return import_string(settings.ALERTING_NOTIFICATION_BACKEND)()
@@ -0,0 +1,105 @@
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.template.loader import render_to_string
+
+from alerting.models import Alert, AlertSeverity
+from main.templatetags.strip_quotes import strip_quotes
+
+_SEVERITY_ORDER = [
+    AlertSeverity.CRITICAL,
+    AlertSeverity.WARNING,
+    AlertSeverity.INFO,
+]
+
+
+@dataclass
+class Digest:
+    """A single notification, containing all new alerts for one recipient."""
+
+    recipient: str
+    alerts: list[Alert] = field(default_factory=list)
+
+    @property
+    def alerts_by_customer(self) -> dict[str, list[Alert]]:
+        output = defaultdict(list)
+        for alert in sorted(
+            self.alerts,
+            key=lambda a: (_SEVERITY_ORDER.index(a.severity), a.host.fqdn),
+        ):
+            customer = strip_quotes(alert.host.customer) or "Unknown customer"
+            output[customer].append(alert)
+
+        return dict(sorted(output.items()))
+
+    @property
+    def counts_by_severity(self) -> dict[str, int]:
+        return {
+            severity.label: len([a for a in self.alerts if a.severity == severity])
+            for severity in _SEVERITY_ORDER
+        }
+
+    @property
+    def subject(self) -> str:
+        return render_to_string(
+            "alerting/notifications/digest_subject.txt", {"digest": self}
+        ).strip()
+
+    @property
+    def body(self) -> str:
+        return render_to_string("alerting/notifications/digest.txt", {"digest": self})
+
+    def as_dict(self) -> dict:
+        return {
+            "recipient": self.recipient,
+            "subject": self.subject,
+            "counts": self.counts_by_severity,
+            "alerts": [
+                {
+                    "host": alert.host.fqdn,
+                    "customer": alert.host.customer,
+                    "severity": alert.severity,
+                    "type": alert.short_message,
+                    "message": alert.message,
+                    "first_seen": alert.created_at.isoformat(),
+                }
+                for alert in self.alerts
+            ],
+        }
+
+
+def get_recipients(alert: Alert) -> set[str]:
+    """
+    Returns the recipients that should be notified of an alert; the contact of
+    the host (if it's an email address), and the globally configured recipients.
+    """
+    recipients = set(settings.ALERTING_NOTIFICATION_RECIPIENTS)
+
+    if alert.host.contact:
+        contact = strip_quotes(alert.host.contact).strip()
+        try:
+            validate_email(contact)
+            recipients.add(contact)
+        except ValidationError:
+            pass
+
+    return recipients
+
+
+def build_digests(alerts: list[Alert]) -> list[Digest]:
+    """
+    Groups alerts into one digest per recipient. Recipients get a single digest,
+    no matter how many alerts (or customers) it covers.
+    """
+    digests: dict[str, Digest] = {}
+
+    for alert in alerts:
+        for recipient in get_recipients(alert):
+            if recipient not in digests:
+                digests[recipient] = Digest(recipient=recipient)
+            digests[recipient].alerts.append(alert)
+
+    return [digests[recipient] for recipient in sorted(digests)]
@@ -0,0 +1,71 @@
+from django.db import transaction
+
+from alerting.models import Alert
+from humitifier_server.logger import logger
+
+from .backends import BaseNotificationBackend, get_notification_backend
+from .digest import build_digests
+
+
+def dispatch_notifications(
+    *,
+    batch_size: int = 500,
+    max_batches: int = 20,
+    backend: BaseNotificationBackend | None = None,
+) -> int:
+    """
+    Sends digests for all alerts that have not been notified yet.
+
+    Alerts are processed in batches. Every batch is locked with
+    `SELECT ... FOR UPDATE SKIP LOCKED`, so multiple dispatchers can run at the same
+    time without sending the same alert twice. Alerts in a batch are grouped into one
+    digest per recipient, which are sent using the backend. If sending fails, the
+    batch is rolled back and will be retried in the next run.
+
+    Acknowledged alerts and alerts of archived hosts are marked as notified without
+    being sent.
+
+    :param batch_size: The maximum number of alerts to process per batch
+    :param max_batches: The maximum number of batches to process per run
+    :param backend: The backend to send digests with, defaults to the configured one
+    :return: The number of alerts that were sent
+    """
+    backend = backend or get_notification_backend()
+    num_sent = 0
+
+    for _ in range(max_batches):
+        with transaction.atomic():
+            alerts = list(
+                Alert.objects.filter(_notified=False)
+                .select_related("host")
+                .with_acknowledgement()
+                .select_for_update(skip_locked=True, of=("self",))
+                .order_by("pk")[:batch_size]
+            )
+
+            if not alerts:
+                break
+
+            to_send = [
+                alert
+                for alert in alerts
+                if not alert.host.archived and alert.get_acknowledgment() is None
+            ]
+
+            digests = build_digests(to_send)
+            if digests:
+                backend.send(digests)
+
+            Alert.objects.filter(pk__in=[alert.pk for alert in alerts]).update(
+                _notified=True
+            )
+
+        logger.info(
+            f"Notifications: sent {len(digests)} digest(s) for {len(to_send)} alert(s)"
+        )
+        num_sent += len(to_send)
+
+        if len(alerts) < batch_size:
+            break
+
+    return num_sent
@@ -1,17 +1,32 @@
+from collections import defaultdict
+
+import sentry_sdk
 from celery import shared_task
+from django.db import transaction
 from django.utils import timezone
 
 from hosts.models import Host
 from humitifier_common.scan_data import ScanOutput
 from humitifier_server.celery.task_names import (
+    ALERTING_DISPATCH_NOTIFICATIONS,
     ALERTING_GENERATE_ALERTS,
     ALERTING_SAVE_ALERTS,
 )
 from humitifier_server.logger import logger
+from scanning.cadence import merge_host_scan
 
-from .backend.data import AnnotatedAlertData, GeneratedAlerts
+from .backend.data import AlertData, AnnotatedAlertData, GeneratedAlerts
+from .backend.executor import (
+    BaseGeneratorExecutor,
+    GeneratorResult,
+    get_generator_executor,
+)
 from .backend.registry import alert_generator_registry
-from .models import Alert
+from .models import Alert, AlertAcknowledgment, AlertSeverity
+
+# Custom identifier used for the alert that replaces the output of a generator
+# that exceeded its time budget
+GENERATOR_TIMEOUT_IDENTIFIER = "generator-timeout"
 
 
 @shared_task(name=ALERTING_GENERATE_ALERTS, pydantic=True)
@@ -27,33 +42,62 @@ def generate_alerts(scan_output: ScanOutput) -> ScanOutput | None:
         logger.error(f"Host {scan_output.hostname} is archived")
         return None
 
+    # Drop the results of scans that were superseded by a newer scan of this host
+    scan_lease = scan_output.original_input.scan_lease
+    if not host.holds_scan_lease(scan_lease):
+        logger.warning(f"Dropping results of a superseded scan of {host.fqdn}")
+        return None
+
+    # Complete partial scans with the previous scan first, as the generators of
+    # artefacts that weren't collected would otherwise remove their alerts
+    scan_output = merge_host_scan(host, scan_output)
+
+    # Fetch the identifiers of all stored alerts in one go, instead of querying
+    # them per generator
+    existing_alerts = defaultdict(set)
+    for creator, custom_identifier in host.alerts.values_list(
+        "_creator", "custom_identifier"
+    ):
+        existing_alerts[creator].add(custom_identifier)
+
+    executor = get_generator_executor()
+
     # Accumulate all alerts from both stages
     all_alerts = []
+    preserved_creators = []
 
     # Step 1: Process scan-based alerts
-    scan_alerts, scan_fatal_found = _process_alert_generators(
-        host,
+    scan_alerts, scan_fatal_found, timed_out = _process_alert_generators(
+        executor,
         alert_generator_registry.get_scan_alert_generators(scan_output),
+        existing_alerts,
         stop_on_fatal=True,
     )
     all_alerts.extend(scan_alerts)
+    preserved_creators.extend(timed_out)
     if scan_fatal_found:
-        _save_alerts_to_task(host.fqdn, all_alerts)
+        _save_alerts_to_task(host.fqdn, all_alerts, preserved_creators)
+        host.record_scan_failure()
+        host.release_scan_lease(scan_lease)
         return None
 
     # Step 2: Process artefact-based alerts (only if no fatal alerts from step 1)
-    artefact_alerts, artefact_fatal_found = _process_alert_generators(
-        host,
+    artefact_alerts, artefact_fatal_found, timed_out = _process_alert_generators(
+        executor,
         alert_generator_registry.get_artefact_alert_generators(scan_output),
+        existing_alerts,
         stop_on_fatal=False,
     )
     all_alerts.extend(artefact_alerts)
+    preserved_creators.extend(timed_out)
 
     # Save all accumulated alerts once (fatal + non-fatal from all stages)
-    _save_alerts_to_task(host.fqdn, all_alerts)
+    _save_alerts_to_task(host.fqdn, all_alerts, preserved_creators)
 
     # Stop further processing if any fatal alert was found
     if artefact_fatal_found:
+        host.record_scan_failure()
+        host.release_scan_lease(scan_lease)
         return None
 
     # No fatal alerts found, return the scan_output for further processing
@@ -61,38 +105,96 @@ def generate_alerts(scan_output: ScanOutput) -> ScanOutput | None:
 
 
 def _process_alert_generators(
-    host, generators, stop_on_fatal
-) -> tuple[list[AnnotatedAlertData], bool]:
+    executor: BaseGeneratorExecutor,
+    generators,
+    existing_alerts: dict[str, set[str | None]],
+    stop_on_fatal: bool,
+) -> tuple[list[AnnotatedAlertData], bool, list[str]]:
+    """
+    Runs the given generators using the executor, and annotates their output.
+
+    :return: A tuple of the generated alerts, whether a fatal alert was found and
+        the creators of generators that exceeded their time budget.
+    """
     alerts = []
     fatal_found = False
+    timed_out = []
+
+    results = executor.run(generators)
+    _record_generator_timings(results)
 
-    for generator in generators:
-        existing_alerts = host.alerts.filter(_creator=generator._creator)
-        generated_alerts = generator.run(existing_alerts)
+    for result in results:
+        existing = existing_alerts[result.creator]
 
-        if not generated_alerts:
+        if result.timed_out:
+            # Keep the previous alerts of this generator, as we don't know whether
+            # they still apply, and tell the user why they weren't updated.
+            timed_out.append(result.creator)
+            alerts.extend(
+                result.generator.annotate_alerts(
+                    [_get_timeout_alert(result, executor.timeout)], existing
+                )
+            )
             continue
 
-        alerts.extend(generated_alerts)
+        if not result.alerts:
+            continue
 
-        # Separate fatal and non-fatal alerts
-        fatal_alerts = [alert for alert in generated_alerts if alert.data.fatal]
+        alerts.extend(result.generator.annotate_alerts(result.alerts, existing))
 
-        if fatal_alerts:
+        if any(alert.fatal for alert in result.alerts):
             fatal_found = True
             if stop_on_fatal:
-                return alerts, fatal_found
+                break
+
+    return alerts, fatal_found, timed_out
 
-    return alerts, fatal_found
+
+def _get_timeout_alert(result: GeneratorResult, timeout: float | None) -> AlertData:
+    return AlertData(
+        severity=AlertSeverity.WARNING,
+        message=(
+            f"Alert generator '{result.generator.verbose_name}' did not finish "
+            f"within its time budget of {timeout} seconds. Its alerts have not been "
+            f"updated for the last scan."
+        ),
+        custom_identifier=GENERATOR_TIMEOUT_IDENTIFIER,
+        can_acknowledge=False,
+    )
 
 
-def _save_alerts_to_task(host_fqdn, alerts):
+def _record_generator_timings(results: list[GeneratorResult]):
+    """Reports how long each generator took, keyed by its creator."""
+    for result in results:
+        logger.debug(
+            f"Alert generator {result.creator} took {result.duration * 1000:.1f}ms"
+        )
+        if result.timed_out:
+            logger.warning(
+                f"Alert generator {result.creator} exceeded its time budget "
+                f"({result.duration:.1f}s)"
+            )
+
+    span = sentry_sdk.get_current_span()
+    if span:
+        for result in results:
+            span.set_data(
+                f"alerting.generator.{result.creator}.duration_ms",
+                round(result.duration * 1000, 2),
+            )
+
+
+def _save_alerts_to_task(host_fqdn, alerts, preserved_creators=None):
     """
     Save all alerts for a given host by sending them to the save_alerts task.
     """
     logger.info(f"Saving {len(alerts)} alerts for host {host_fqdn}.")
     save_alerts.delay(
-        GeneratedAlerts(host=host_fqdn, alerts=alerts).model_dump(mode="json")
+        GeneratedAlerts(
+            host=host_fqdn,
+            alerts=alerts,
+            preserved_creators=preserved_creators or [],
+        ).model_dump(mode="json")
     )
 
 
@@ -104,30 +206,95 @@ def save_alerts(generated_alerts: GeneratedAlerts):
         logger.error(f"Start-scan: Host {generated_alerts.host} is not found")
         raise e
 
-    current_ids = []
+    now = timezone.now()
+    stored_alerts = {
+        (alert._creator, alert.custom_identifier): alert for alert in host.alerts.all()
+    }
+    current_alerts = {}
+    new_alerts = []
 
     for generated_alert in generated_alerts.alerts:
-        if generated_alert.existing:
-            alert_obj = host.alerts.get(
-                _creator=generated_alert.creator,
-                custom_identifier=generated_alert.data.custom_identifier,
-            )
-        else:
+        key = (generated_alert.creator, generated_alert.data.custom_identifier)
+
+        alert_obj = current_alerts.get(key) or stored_alerts.get(key)
+        if alert_obj is None:
             alert_obj = Alert()
             alert_obj._creator = generated_alert.creator
             alert_obj.custom_identifier = generated_alert.data.custom_identifier
             alert_obj.host = host
+            new_alerts.append(alert_obj)
 
-        alert_obj.last_seen_at = timezone.now()
-        alert_obj._notified = False
+        # Only (re)notify for new alerts, or when the severity changed
+        if alert_obj.pk is None or alert_obj.severity != generated_alert.data.severity:
+            alert_obj._notified = False
 
+        alert_obj.last_seen_at = now
         alert_obj.short_message = generated_alert.creator_verbose_name
         alert_obj.message = generated_alert.data.message
         alert_obj.severity = generated_alert.data.severity
         alert_obj._can_acknowledge = generated_alert.data.can_acknowledge
 
-        alert_obj.save()
+        current_alerts[key] = alert_obj
+
+    updated_alerts = [alert for alert in current_alerts.values() if alert.pk]
+
+    with transaction.atomic():
+        Alert.objects.bulk_create(new_alerts)
+        Alert.objects.bulk_update(
+            updated_alerts,
+            [
+                "last_seen_at",
+                "_notified",
+                "short_message",
+                "message",
+                "severity",
+                "_can_acknowledge",
+            ],
+        )
+
+        host.alerts.exclude(
+            id__in=[alert.id for alert in current_alerts.values()]
+        ).exclude(_creator__in=generated_alerts.preserved_creators).delete()
+
+        _link_acknowledgements(host, current_alerts)
+
+
+def _link_acknowledgements(host: Host, alerts: dict[tuple[str, str | None], Alert]):
+    """
+    Links acknowledgements that are not linked to an alert yet (usually
+    persistent ones) to their matching alert.
+
+    bulk_create doesn't send the post_save signal that normally takes care of
+    this, so we do it here for all alerts at once.
+    """
+    acknowledgements = []
+    for acknowledgement in host.alert_acknowledgements.filter(_alert=None):
+        alert = alerts.get(
+            (acknowledgement._creator, acknowledgement.custom_identifier)
+        )
+        if alert is not None:
+            acknowledgement._alert = alert
+            acknowledgements.append(acknowledgement)
+
+    AlertAcknowledgment.objects.bulk_update(acknowledgements, ["_alert"])
+
+
+@shared_task(name=ALERTING_DISPATCH_NOTIFICATIONS)
+def dispatch_notifications(*, batch_size: int = 500, max_batches: int = 20) -> str:
+    """
+    Sends digests for all alerts that have not been notified yet. Meant to be run
+    periodically.
+
+    :param batch_size: The maximum number of alerts to process per batch
+    :type batch_size: int
+    :param max_batches: The maximum number of batches to process per run. Any
+        remaining alerts will be picked up by the next run.
+    :type max_batches: int
+    :return: A message with the number of alerts that were sent
+    :rtype: str
+    """
+    from .notifications import dispatch_notifications as _dispatch
 
-        current_ids.append(alert_obj.id)
+    num_sent = _dispatch(batch_size=batch_size, max_batches=max_batches)
 
-    host.alerts.exclude(id__in=current_ids).delete()
+    return f"Sent notifications for {num_sent} alerts"
@@ -1,7 +1,22 @@
-from django.test import TestCase
+import io
+import time
+from datetime import datetime
+
+from django.test import SimpleTestCase, TestCase, override_settings
 
 from main.models import User
+from humitifier_common.scan_data import ScanOutput
+from .backend.data import (
+    AlertData,
+    AlertGeneratorType,
+    AnnotatedAlertData,
+    GeneratedAlerts,
+)
+from .backend.executor import SerialGeneratorExecutor, ThreadPoolGeneratorExecutor
+from .backend.registry import _AlertGeneratorRegistry
 from .models import Alert, AlertAcknowledgment
+from .notifications import ConsoleNotificationBackend, dispatch_notifications
+from .tasks import save_alerts
 from hosts.models import Host
 
 
@@ -114,3 +129,396 @@ class TestAlertSignals(TestCase):
         self.assertIsNone(
             acknowledgment._alert
         )  # Ensure `_alert` is de-coupled but acknowledgment is not deleted
+
+
+class TestAcknowledgementLookups(TestCase):
+
+    def setUp(self):
+        self.host = Host.objects.create(fqdn="test")
+        self.user = User.objects.create_user(username="testuser")
+
+    def _generated_alerts(self, *custom_identifiers):
+        return GeneratedAlerts(
+            host=self.host.fqdn,
+            alerts=[
+                AnnotatedAlertData(
+                    creator="test!",
+                    creator_verbose_name="Test",
+                    data=AlertData(
+                        severity="warning",
+                        message="Test alert",
+                        custom_identifier=custom_identifier,
+                    ),
+                    existing=False,
+                )
+                for custom_identifier in custom_identifiers
+            ],
+        )
+
+    def test_save_alerts_links_persistent_acknowledgements(self):
+        """
+        Test that save_alerts links persistent acknowledgements to newly created
+        alerts, even though bulk creation bypasses the post_save signal.
+        """
+        acknowledgment = AlertAcknowledgment.objects.create(
+            host=self.host,
+            _creator="test!",
+            custom_identifier="b",
+            acknowledged_by=self.user,
+            persistent=True,
+        )
+
+        save_alerts(self._generated_alerts("a", "b"))
+
+        acknowledgment.refresh_from_db()
+        self.assertEqual(acknowledgment._alert.custom_identifier, "b")
+        self.assertEqual(self.host.alerts.count(), 2)
+
+    def test_save_alerts_updates_existing_alerts(self):
+        """
+        Test that save_alerts updates stored alerts in place, and removes the ones
+        that were not generated again.
+        """
+        save_alerts(self._generated_alerts("a", "b"))
+        alert = self.host.alerts.get(custom_identifier="a")
+
+        save_alerts(self._generated_alerts("a"))
+
+        self.assertEqual(list(self.host.alerts.all()), [alert])
+
+    def test_with_acknowledgement_avoids_queries(self):
+        """
+        Test that get_acknowledgment uses the acknowledgement fetched by
+        with_acknowledgement, both when there is and isn't one.
+        """
+        save_alerts(self._generated_alerts("a", "b"))
+        AlertAcknowledgment.objects.create(
+            host=self.host,
+            _creator="test!",
+            custom_identifier="a",
+            acknowledged_by=self.user,
+            _alert=self.host.alerts.get(custom_identifier="a"),
+        )
+
+        alerts = list(
+            Alert.objects.with_acknowledgement().order_by("custom_identifier")
+        )
+        with self.assertNumQueries(0):
+            self.assertIsNotNone(alerts[0].get_acknowledgment())
+            self.assertIsNone(alerts[1].get_acknowledgment())
+
+    def test_host_alert_counts(self):
+        """
+        Test that the annotated alert counts match the per-host queries.
+        """
+        save_alerts(self._generated_alerts("a", "b"))
+        AlertAcknowledgment.objects.create(
+            host=self.host,
+            _creator="test!",
+            custom_identifier="a",
+            acknowledged_by=self.user,
+            _alert=self.host.alerts.get(custom_identifier="a"),
+        )
+
+        host = Host.objects.with_alert_counts().get(pk=self.host.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(host.num_alerts, 2)
+            self.assertEqual(host.num_warning_alerts, 1)
+            self.assertEqual(host.num_critical_alerts, 0)
+            self.assertEqual(host.num_acknowledged_alerts, 1)
+
+        self.assertEqual(self.host.num_warning_alerts, 1)
+        self.assertEqual(self.host.num_acknowledged_alerts, 1)
+
+
+@override_settings(ALERTING_NOTIFICATION_RECIPIENTS=["ops@example.com"])
+class TestNotificationDispatcher(TestCase):
+
+    def setUp(self):
+        self.host_a = Host.objects.create(
+            fqdn="a.example.com", customer="Customer A", contact="a@example.com"
+        )
+        self.host_b = Host.objects.create(
+            fqdn="b.example.com", customer="Customer B", contact="Someone"
+        )
+        self.user = User.objects.create_user(username="testuser")
+        self.stream = io.StringIO()
+        self.backend = ConsoleNotificationBackend(stream=self.stream)
+
+    def _create_alert(self, host, creator="test!", **kwargs):
+        return Alert.objects.create(
+            host=host,
+            _creator=creator,
+            short_message="Test",
+            message="Test alert",
+            severity="critical",
+            **kwargs,
+        )
+
+    def test_one_digest_per_recipient(self):
+        """
+        Test that alerts are grouped into a single digest per recipient, and
+        marked as notified afterward.
+        """
+        for i in range(10):
+            self._create_alert(self.host_a, creator=f"a{i}")
+            self._create_alert(self.host_b, creator=f"b{i}")
+
+        num_sent = dispatch_notifications(batch_size=1000, backend=self.backend)
+
+        self.assertEqual(num_sent, 20)
+        output = self.stream.getvalue()
+        # The host contact only gets their own alerts, the global recipient all
+        self.assertEqual(output.count("To: "), 2)
+        self.assertIn("To: a@example.com\nSubject: [Humitifier] 10 new alerts", output)
+        self.assertIn(
+            "To: ops@example.com\nSubject: [Humitifier] 20 new alerts", output
+        )
+        self.assertFalse(Alert.objects.filter(_notified=False).exists())
+
+        # Nothing left to send
+        self.assertEqual(dispatch_notifications(backend=self.backend), 0)
+
+    def test_batches(self):
+        """
+        Test that all alerts are processed when they don't fit in one batch.
+        """
+        for i in range(5):
+            self._create_alert(self.host_a, creator=f"a{i}")
+
+        num_sent = dispatch_notifications(batch_size=2, backend=self.backend)
+
+        self.assertEqual(num_sent, 5)
+        self.assertEqual(self.stream.getvalue().count("To: ops@example.com"), 3)
+
+    def test_acknowledged_alerts_are_not_sent(self):
+        """
+        Test that acknowledged alerts are marked as notified without being sent.
+        """
+        alert = self._create_alert(self.host_a)
+        AlertAcknowledgment.objects.create(
+            host=self.host_a,
+            _creator=alert._creator,
+            acknowledged_by=self.user,
+            _alert=alert,
+        )
+
+        self.assertEqual(dispatch_notifications(backend=self.backend), 0)
+        self.assertEqual(self.stream.getvalue(), "")
+        alert.refresh_from_db()
+        self.assertTrue(alert._notified)
+
+    def test_failed_send_is_retried(self):
+        """
+        Test that alerts stay unnotified if the backend fails.
+        """
+        self._create_alert(self.host_a)
+
+        class FailingBackend(ConsoleNotificationBackend):
+            def send(self, digests):
+                raise ConnectionError()
+
+        with self.assertRaises(ConnectionError):
+            dispatch_notifications(backend=FailingBackend())
+
+        self.assertTrue(Alert.objects.filter(_notified=False).exists())
+
+    def test_unchanged_alerts_are_not_renotified(self):
+        """
+        Test that saving an alert again only resets its notified state if the
+        severity changed.
+        """
+        data = AlertData(severity="warning", message="Test alert")
+        generated_alerts = GeneratedAlerts(
+            host=self.host_a.fqdn,
+            alerts=[
+                AnnotatedAlertData(
+                    creator="test!",
+                    creator_verbose_name="Test",
+                    data=data,
+                    existing=False,
+                )
+            ],
+        )
+        save_alerts(generated_alerts)
+        dispatch_notifications(backend=self.backend)
+
+        save_alerts(generated_alerts)
+        self.assertFalse(Alert.objects.filter(_notified=False).exists())
+
+        data.severity = "critical"
+        save_alerts(generated_alerts)
+        self.assertTrue(Alert.objects.filter(_notified=False).exists())
+
+
+class _FakeGenerator:
+    """Stand-in for an alert generator, so we don't pollute the registry."""
+
+    verbose_name = "Fake"
+
+    def __init__(self, creator, duration=0.0):
+        self._creator = creator
+        self.duration = duration
+
+    def generate_alerts(self):
+        time.sleep(self.duration)
+        return AlertData(severity="info", message=self._creator)
+
+
+class TestGeneratorExecutors(SimpleTestCase):
+
+    def test_thread_pool_preserves_order(self):
+        """
+        Test that results are returned in generator order, regardless of which
+        generator finishes first.
+        """
+        generators = [
+            _FakeGenerator("slow", duration=0.2),
+            _FakeGenerator("fast"),
+        ]
+
+        results = ThreadPoolGeneratorExecutor(max_workers=2).run(generators)
+
+        self.assertEqual([result.creator for result in results], ["slow", "fast"])
+        self.assertEqual(results[0].alerts[0].message, "slow")
+        self.assertGreaterEqual(results[0].duration, 0.2)
+
+    def test_thread_pool_timeout(self):
+        """
+        Test that a generator exceeding its budget is reported as timed out,
+        without holding up the other generators.
+        """
+        generators = [
+            _FakeGenerator("stuck", duration=2),
+            _FakeGenerator("fast"),
+        ]
+
+        start = time.monotonic()
+        results = ThreadPoolGeneratorExecutor(max_workers=2, timeout=0.1).run(
+            generators
+        )
+
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertTrue(results[0].timed_out)
+        self.assertEqual(results[0].alerts, [])
+        self.assertFalse(results[1].timed_out)
+        self.assertEqual(len(results[1].alerts), 1)
+
+    def test_thread_pool_timeout_with_all_workers_stuck(self):
+        """
+        Test that generators that never get a worker are reported as timed out,
+        instead of waiting for the stuck generators to finish.
+        """
+        generators = [
+            _FakeGenerator("stuck", duration=2),
+            _FakeGenerator("queued"),
+        ]
+
+        start = time.monotonic()
+        results = ThreadPoolGeneratorExecutor(max_workers=1, timeout=0.1).run(
+            generators
+        )
+
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertTrue(results[0].timed_out)
+        self.assertTrue(results[1].timed_out)
+        self.assertEqual(results[1].alerts, [])
+
+    def test_serial_timeout(self):
+        """
+        Test that the serial executor discards the output of generators that
+        overran their budget.
+        """
+        results = SerialGeneratorExecutor(timeout=0.05).run(
+            [_FakeGenerator("slow", duration=0.1), _FakeGenerator("fast")]
+        )
+
+        self.assertTrue(results[0].timed_out)
+        self.assertEqual(results[0].alerts, [])
+        self.assertFalse(results[1].timed_out)
+
+
+class TestAlertGeneratorRegistry(SimpleTestCase):
+
+    @staticmethod
+    def _generator(creator, type_, artefact_name=None):
+        """
+        Creates a generator class without the metaclass, so it's not added to the
+        global registry.
+        """
+        artefact = (
+            type("Artefact", (), {"__artefact_name__": artefact_name})
+            if artefact_name
+            else None
+        )
+
+        def __init__(self, data, scan_date):
+            self.data = data
+
+        return type(
+            creator,
+            (),
+            {
+                "_creator": creator,
+                "_type": type_,
+                "artefact": artefact,
+                "verbose_name": creator.title(),
+                "__init__": __init__,
+            },
+        )
+
+    def setUp(self):
+        self.registry = _AlertGeneratorRegistry()
+        self.memory = self._generator(
+            "memory", AlertGeneratorType.ARTEFACT, "generic.Memory"
+        )
+        self.memory2 = self._generator(
+            "memory2", AlertGeneratorType.ARTEFACT, "generic.Memory"
+        )
+        self.packages = self._generator(
+            "packages", AlertGeneratorType.ARTEFACT, "generic.PackageList"
+        )
+        self.offline = self._generator("offline", AlertGeneratorType.SCAN)
+
+        for generator in [self.memory, self.memory2, self.packages, self.offline]:
+            self.registry.register(generator)
+
+    def test_get(self):
+        """
+        Test that generators can be looked up by their creator.
+        """
+        self.assertIs(self.registry.get("memory"), self.memory)
+        self.assertIs(self.registry.get("offline"), self.offline)
+        self.assertIsNone(self.registry.get("unknown"))
+
+    def test_artefact_generators_for_present_artefacts(self):
+        """
+        Test that only generators for artefacts in the scan are returned.
+        """
+        scan_output = ScanOutput.model_construct(
+            hostname="test",
+            scan_date=datetime.now(),
+            facts={"generic.Hardware": object()},
+            metrics={"generic.Memory": object()},
+            errors=[],
+        )
+
+        generators = self.registry.get_artefact_alert_generators(scan_output)
+
+        self.assertEqual(
+            [type(generator) for generator in generators], [self.memory, self.memory2]
+        )
+
+    def test_alert_types_cache_is_invalidated(self):
+        """
+        Test that get_alert_types includes generators registered after the first
+        call.
+        """
+        self.assertEqual(
+            self.registry.get_alert_types(),
+            ["Memory", "Memory2", "Offline", "Packages"],
+        )
+
+        self.registry.register(self._generator("dns", AlertGeneratorType.SCAN))
+
+        self.assertIn("Dns", self.registry.get_alert_types())
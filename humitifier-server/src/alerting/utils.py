@@ -11,12 +11,14 @@ def regenerate_alerts(host: Host):
     if not scan_data:
         return
 
-    try:
-        scan_output = scan_data.parsed_data
-    except ValidationError:
+    scan_output = scan_data.parsed_data
+    if not scan_output:
         return
 
-    if not scan_output:
+    try:
+        # Alerts are generated for every artefact, so the whole scan is validated
+        scan_output = scan_output.to_scan_output()
+    except ValidationError:
         return
 
     # Get our generic log-error handler-task
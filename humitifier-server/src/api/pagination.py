@@ -0,0 +1,23 @@
+from rest_framework.pagination import CursorPagination
+
+
+class HostCursorPagination(CursorPagination):
+    """
+    Cursor pagination for hosts. Pages continue after the last host of the previous
+    page, so pages stay consistent when hosts are added or removed while paging.
+
+    Pagination is opt-in, to not break existing integrations: without a cursor or
+    page size, all hosts are returned at once.
+    """
+
+    ordering = ("fqdn", "pk")
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = {self.cursor_query_param, self.page_size_query_param}
+        if not params & request.query_params.keys():
+            return None
+
+        return super().paginate_queryset(queryset, request, view)
@@ -0,0 +1,22 @@
+from rest_framework.renderers import BaseRenderer
+
+from hosts.exports import stream_ndjson
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Renders newline-delimited JSON, with one JSON document per line. Lists are
+    rendered as one line per item.
+
+    Large lists should be streamed instead of rendered, see HostsViewSet.list.
+    """
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        rows = data if isinstance(data, list) else [data]
+        return "".join(stream_ndjson(rows)).encode(self.charset)
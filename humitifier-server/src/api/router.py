@@ -1,7 +1,8 @@
 from rest_framework.routers import DefaultRouter
 
-from api.views import HostsViewSet
+from api.views import HostsViewSet, PackagesViewSet
 
 router = DefaultRouter()
 router.register(r"hosts", HostsViewSet, basename="hosts")
+router.register(r"packages", PackagesViewSet, basename="packages")
 urlpatterns = router.urls
@@ -2,7 +2,7 @@ from drf_spectacular.utils import extend_schema_field
 from pydantic import ValidationError
 from rest_framework import serializers
 
-from hosts.models import Host
+from hosts.models import Host, HostPackageChange
 from humitifier_common.artefacts import RebootPolicy
 
 REBOOT_POLICY_SCHEMA = {
@@ -50,6 +50,13 @@ REBOOT_POLICY_SCHEMA = {
 
 
 class HostSerializer(serializers.ModelSerializer):
+    """
+    Serializes hosts, optionally with only some of the fields.
+
+    Values of searchable fields (see hosts.search) can be added through the
+    "scan_field_values" context: a dict of host pk to a dict of field id to value.
+    """
+
     class Meta:
         model = Host
         fields = [
@@ -74,8 +81,28 @@ class HostSerializer(serializers.ModelSerializer):
         allow_null=True,
     )
 
+    def __init__(self, *args, fields: list[str] | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+
+        scan_field_values = self.context.get("scan_field_values")
+        if scan_field_values is not None:
+            data.update(scan_field_values.get(instance.pk, {}))
+
+        return data
+
     @extend_schema_field(REBOOT_POLICY_SCHEMA)
     def get_reboot_policy(self, obj: Host) -> None | RebootPolicy:
+        # See HostQuerySet.with_reboot_policy
+        if hasattr(obj, "_reboot_policy"):
+            return obj._reboot_policy
+
         if not obj.last_scan_cache:
             return None
 
@@ -90,6 +117,45 @@ class HostSerializer(serializers.ModelSerializer):
         return scan_data.raw_data["facts"]["server.RebootPolicy"]
 
 
+class PackageSerializer(serializers.Serializer):
+
+    name = serializers.CharField()
+
+    num_hosts = serializers.IntegerField()
+
+    num_versions = serializers.IntegerField()
+
+
+class PackageVersionSerializer(serializers.Serializer):
+
+    version = serializers.CharField()
+
+    num_hosts = serializers.IntegerField()
+
+
+class PackageDetailSerializer(serializers.Serializer):
+
+    name = serializers.CharField()
+
+    num_hosts = serializers.IntegerField()
+
+    versions = PackageVersionSerializer(many=True)
+
+
+class PackageChangeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = HostPackageChange
+        fields = [
+            "host",
+            "name",
+            "old_version",
+            "new_version",
+            "changed_at",
+        ]
+
+    host = serializers.CharField(source="host.fqdn")
+
+
 class DataSourceSyncHostSerializer(serializers.Serializer):
 
     fqdn = serializers.CharField()
@@ -1,3 +1,6 @@
+import json
+
+from django.core.cache import cache
 from django.test import TestCase
 from rest_framework.test import APIClient
 
@@ -540,3 +543,174 @@ class HostSyncTestCase(ApiTestCaseMixin, TestCase):
         self.assertEqual(host.is_offline, False)
         # There should online be two now, as we switched the state 4 times
         self.assertEqual(host.offline_periods.count(), 2)
+
+
+class HostsApiTestCase(ApiTestCaseMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+
+        host = Host.objects.create(fqdn="example.org", customer="Example")
+        host.add_scan(
+            {
+                "version": 2,
+                "facts": {
+                    "generic.HostnameCtl": {"os": "Ubuntu"},
+                    "server.RebootPolicy": {"configured": True},
+                },
+            }
+        )
+
+        # Version 1 scans don't have a reboot policy
+        host = Host.objects.create(fqdn="legacy.example.org", customer="Example")
+        host.add_scan({"facts": {"server.RebootPolicy": {"configured": True}}})
+
+    def test_reboot_policy(self):
+        test_request = self.read_client.get("/api/hosts/")
+
+        self.assertRequestSuccessful(test_request)
+        reboot_policies = {
+            host["fqdn"]: host["reboot_policy"] for host in test_request.json()
+        }
+        self.assertEqual(
+            reboot_policies,
+            {"example.org": {"configured": True}, "legacy.example.org": None},
+        )
+
+    def test_fields(self):
+        test_request = self.read_client.get(
+            "/api/hosts/", {"fields": "fqdn,facts.generic.HostnameCtl.os"}
+        )
+
+        self.assertRequestSuccessful(test_request)
+        self.assertEqual(
+            test_request.json(),
+            [
+                {"fqdn": "example.org", "facts.generic.HostnameCtl.os": "Ubuntu"},
+                {"fqdn": "legacy.example.org", "facts.generic.HostnameCtl.os": None},
+            ],
+        )
+
+    def test_unknown_field(self):
+        test_request = self.read_client.get("/api/hosts/", {"fields": "fqdn,unknown"})
+
+        self.assertEqual(test_request.status_code, 400)
+
+    def test_cursor_pagination(self):
+        test_request = self.read_client.get("/api/hosts/", {"page_size": 1})
+
+        self.assertRequestSuccessful(test_request)
+        page = test_request.json()
+        self.assertEqual([host["fqdn"] for host in page["results"]], ["example.org"])
+
+        test_request = self.read_client.get(page["next"])
+
+        self.assertRequestSuccessful(test_request)
+        page = test_request.json()
+        self.assertEqual(
+            [host["fqdn"] for host in page["results"]], ["legacy.example.org"]
+        )
+        self.assertIsNone(page["next"])
+
+    def test_not_modified(self):
+        test_request = self.read_client.get("/api/hosts/")
+        etag = test_request["ETag"]
+
+        test_request = self.read_client.get("/api/hosts/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(test_request.status_code, 304)
+
+        # A new scan changes the response
+        Host.objects.get(fqdn="example.org").add_scan({"version": 2, "facts": {}})
+
+        test_request = self.read_client.get("/api/hosts/", HTTP_IF_NONE_MATCH=etag)
+        self.assertRequestSuccessful(test_request)
+
+    def test_edit_modifies(self):
+        test_request = self.read_client.get("/api/hosts/")
+        etag = test_request["ETag"]
+
+        host = Host.objects.get(fqdn="example.org")
+        host.contact = "admin@example.org"
+        host.save()
+
+        test_request = self.read_client.get("/api/hosts/", HTTP_IF_NONE_MATCH=etag)
+        self.assertRequestSuccessful(test_request)
+
+    def test_etag_does_not_depend_on_cache(self):
+        # Other processes don't share a local memory cache
+        test_request = self.read_client.get("/api/hosts/")
+        etag = test_request["ETag"]
+
+        cache.clear()
+
+        test_request = self.read_client.get("/api/hosts/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(test_request.status_code, 304)
+
+    def test_ndjson(self):
+        test_request = self.read_client.get(
+            "/api/hosts/", {"format": "ndjson", "fields": "fqdn"}
+        )
+
+        self.assertEqual(test_request.status_code, 200)
+        lines = b"".join(test_request.streaming_content).decode().splitlines()
+        self.assertEqual(
+            [json.loads(line) for line in lines],
+            [{"fqdn": "example.org"}, {"fqdn": "legacy.example.org"}],
+        )
+
+
+class PackagesApiTestCase(ApiTestCaseMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+
+        host = Host.objects.create(fqdn="example.org", customer="Example")
+        host.add_scan(self._scan("3.0.2"))
+        host.add_scan(self._scan("3.0.13"))
+
+        # Not accessible for the read client
+        other_host = Host.objects.create(fqdn="other.org", customer="Other")
+        other_host.add_scan(self._scan("1.1.1w"))
+
+    @staticmethod
+    def _scan(openssl_version):
+        return {
+            "facts": {
+                "generic.PackageList": [
+                    {"name": "openssl", "version": openssl_version},
+                ]
+            }
+        }
+
+    def test_list_packages(self):
+        test_request = self.read_client.get("/api/packages/", {"search": "ssl"})
+
+        self.assertRequestSuccessful(test_request)
+        self.assertEqual(
+            test_request.json(),
+            [{"name": "openssl", "num_hosts": 1, "num_versions": 1}],
+        )
+
+    def test_package_versions(self):
+        test_request = self.read_client.get("/api/packages/openssl/")
+
+        self.assertRequestSuccessful(test_request)
+        self.assertEqual(
+            test_request.json()["versions"], [{"version": "3.0.13", "num_hosts": 1}]
+        )
+
+    def test_package_changes(self):
+        test_request = self.read_client.get(
+            "/api/packages/changes/", {"host": "example.org"}
+        )
+
+        self.assertRequestSuccessful(test_request)
+        changes = test_request.json()
+        self.assertEqual(len(changes), 1)
+        self.assertEqual(changes[0]["old_version"], "3.0.2")
+        self.assertEqual(changes[0]["new_version"], "3.0.13")
+
+    def test_unknown_package(self):
+        test_request = self.read_client.get("/api/packages/unknown/")
+
+        self.assertEqual(test_request.status_code, 404)
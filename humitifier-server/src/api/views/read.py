@@ -1,21 +1,68 @@
+import hashlib
+from datetime import datetime
+from itertools import batched
+
+from django.db.models import Count, Max, QuerySet
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date, quote_etag
 from django_filters.rest_framework import DjangoFilterBackend
+from drf_spectacular.utils import OpenApiParameter, OpenApiTypes, extend_schema
 from oauth2_provider.contrib.rest_framework import TokenHasScope
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
 
+from api.pagination import HostCursorPagination
 from api.permissions import TokenHasApplication
-from api.serializers import HostSerializer
+from api.renderers import NDJSONRenderer
+from api.serializers import (
+    HostSerializer,
+    PackageChangeSerializer,
+    PackageDetailSerializer,
+    PackageSerializer,
+)
+from hosts.exports import EXPORT_CHUNK_SIZE, stream_ndjson
 from hosts.filters import HostFilters
 from hosts.models import Host
+from hosts.packages import (
+    get_package_changes,
+    get_package_num_hosts,
+    get_package_summaries,
+    get_package_versions,
+)
+from hosts.search import get_scan_field_values, get_searchable_fields_by_id
+from hosts.search.result_cache import get_application_access_scope
+
+FIELDS_PARAMETER = OpenApiParameter(
+    "fields",
+    str,
+    description="Comma separated fields to include, instead of all fields. Besides "
+    "the fields of hosts, any field of the advanced search can be included, e.g. "
+    "fqdn,os,facts.generic.Hardware.num_cpus",
+)
 
 
 class HostsViewSet(viewsets.ReadOnlyModelViewSet):
     """
-    A viewset for viewing and editing user instances.
+    The hosts the application has access to.
+
+    Responses support conditional requests: the ETag changes whenever the hosts
+    change, and Last-Modified is the time of the most recent scan or edit of the
+    hosts.
+
+    Lists are paginated when a cursor or page_size is given. Bulk consumers can
+    instead request newline-delimited JSON (format=ndjson), which streams all hosts.
     """
 
     permission_classes = [TokenHasApplication, TokenHasScope]
     required_scopes = ["read"]
     serializer_class = HostSerializer
+    pagination_class = HostCursorPagination
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer]
     lookup_field = "fqdn"
     filter_backends = [DjangoFilterBackend]
     filterset_class = HostFilters
@@ -26,4 +73,242 @@ class HostsViewSet(viewsets.ReadOnlyModelViewSet):
         if not hasattr(self.request, "application"):
             return Host.objects.none()
         app = self.request.application
-        return Host.objects.get_for_application(app)
+        # The serializer only needs the reboot policy from the last scan, which
+        # is annotated instead of fetching the whole scan for every host
+        return Host.objects.get_for_application(app).light().with_reboot_policy()
+
+    def _get_requested_fields(self) -> tuple[list[str] | None, list[str]]:
+        """
+        Splits the requested fields into fields of the serializer, and fields of
+        the advanced search.
+
+        :return: The serializer fields, or None for all fields, and the ids of
+                 the search fields.
+        """
+        value = self.request.query_params.get("fields")
+        if not value:
+            return None, []
+
+        searchable_fields = get_searchable_fields_by_id()
+        field_names, field_ids, unknown_fields = [], [], []
+
+        for field in value.split(","):
+            field = field.strip()
+            if field in HostSerializer.Meta.fields:
+                field_names.append(field)
+            elif field in searchable_fields:
+                field_ids.append(field)
+            elif field:
+                unknown_fields.append(field)
+
+        if unknown_fields:
+            raise ValidationError(
+                {"fields": [f"Unknown field: {field}" for field in unknown_fields]}
+            )
+
+        return field_names, field_ids
+
+    def _get_host_serializer(
+        self, hosts, field_names: list[str] | None, field_ids: list[str]
+    ) -> HostSerializer:
+        context = self.get_serializer_context()
+
+        if field_ids:
+            # The values are selected by the database, in one query for all hosts
+            hosts = list(hosts)
+            scan_field_values = get_scan_field_values(
+                Host.objects.filter(pk__in=[host.pk for host in hosts]), field_ids
+            )
+            context["scan_field_values"] = {
+                row["object"].pk: row["fields"] for row in scan_field_values
+            }
+
+        return HostSerializer(hosts, many=True, fields=field_names, context=context)
+
+    def _get_validators(
+        self, last_scanned: datetime | None, last_updated: datetime | None, *parts
+    ) -> tuple[str, int | None]:
+        """
+        Gets the ETag and Last-Modified of a response.
+
+        The validators are derived from the hosts in the database, so they are
+        the same in every process: the ETag covers scans through last_scanned,
+        edits of hosts through last_updated, and the request itself, as the
+        response depends on the requested fields, page and format.
+
+        :param last_scanned: The time of the most recent scan in the response.
+        :param last_updated: The time of the most recent edit of a host in the
+                             response.
+        :param parts: Anything else the response depends on, e.g. the number of
+                      hosts, which changes when hosts are removed.
+        :return: The ETag, and Last-Modified as a timestamp.
+        """
+        key = "|".join(
+            [
+                get_application_access_scope(self.request.application),
+                self.request.get_full_path(),
+                self.request.accepted_media_type,
+                last_scanned.isoformat() if last_scanned else "",
+                last_updated.isoformat() if last_updated else "",
+                *map(str, parts),
+            ]
+        )
+        etag = quote_etag(hashlib.sha256(key.encode()).hexdigest())
+
+        last_modified = max(filter(None, [last_scanned, last_updated]), default=None)
+        return etag, int(last_modified.timestamp()) if last_modified else None
+
+    def _conditional_response(self, etag: str, last_modified: int | None, get_response):
+        """
+        Responds with 304 Not Modified if the client has the current version,
+        otherwise with the response returned by get_response.
+        """
+        response = get_conditional_response(
+            self.request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = get_response()
+
+        response["ETag"] = etag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified)
+
+        return response
+
+    def _stream_ndjson(
+        self, queryset: QuerySet[Host], field_names: list[str] | None, field_ids
+    ) -> StreamingHttpResponse:
+        def _rows():
+            hosts = queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+            for chunk in batched(hosts, EXPORT_CHUNK_SIZE):
+                yield from self._get_host_serializer(chunk, field_names, field_ids).data
+
+        return StreamingHttpResponse(
+            stream_ndjson(_rows()), content_type=NDJSONRenderer.media_type
+        )
+
+    @extend_schema(parameters=[FIELDS_PARAMETER])
+    def list(self, request, *args, **kwargs):
+        field_names, field_ids = self._get_requested_fields()
+        queryset = self.filter_queryset(self.get_queryset())
+
+        stats = queryset.order_by().aggregate(
+            last_scanned=Max("last_scan_date"),
+            last_updated=Max("updated_at"),
+            num_hosts=Count("pk"),
+        )
+        etag, last_modified = self._get_validators(
+            stats["last_scanned"], stats["last_updated"], stats["num_hosts"]
+        )
+
+        def _get_response():
+            if request.accepted_renderer.format == NDJSONRenderer.format:
+                return self._stream_ndjson(queryset, field_names, field_ids)
+
+            page = self.paginate_queryset(queryset)
+            if page is not None:
+                serializer = self._get_host_serializer(page, field_names, field_ids)
+                return self.get_paginated_response(serializer.data)
+
+            serializer = self._get_host_serializer(queryset, field_names, field_ids)
+            return Response(serializer.data)
+
+        return self._conditional_response(etag, last_modified, _get_response)
+
+    @extend_schema(parameters=[FIELDS_PARAMETER])
+    def retrieve(self, request, *args, **kwargs):
+        field_names, field_ids = self._get_requested_fields()
+        host = self.get_object()
+
+        etag, last_modified = self._get_validators(
+            host.last_scan_date, host.updated_at, host.pk
+        )
+
+        def _get_response():
+            serializer = self._get_host_serializer([host], field_names, field_ids)
+            return Response(serializer.data[0])
+
+        return self._conditional_response(etag, last_modified, _get_response)
+
+
+class PackagesViewSet(viewsets.ViewSet):
+    """
+    The fleet-wide package inventory: the installed packages, the number of hosts
+    running each version, and the history of package changes. Archived hosts are
+    not included.
+    """
+
+    permission_classes = [TokenHasApplication, TokenHasScope]
+    required_scopes = ["read"]
+    lookup_field = "name"
+    lookup_value_regex = "[^/]+"
+
+    # The maximum number of changes returned at once
+    max_changes = 1000
+
+    def _get_hosts(self):
+        app = self.request.application
+        return Host.objects.get_for_application(app).exclude(archived=True)
+
+    def _get_scope(self):
+        return get_application_access_scope(self.request.application)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "search", str, description="Only packages with names containing this"
+            )
+        ],
+        responses=PackageSerializer(many=True),
+    )
+    def list(self, request):
+        packages = get_package_summaries(
+            self._get_hosts(),
+            scope=self._get_scope(),
+            search=request.query_params.get("search", ""),
+        )
+        return Response(PackageSerializer(packages, many=True).data)
+
+    @extend_schema(responses=PackageDetailSerializer)
+    def retrieve(self, request, name=None):
+        hosts = self._get_hosts()
+        scope = self._get_scope()
+        versions = get_package_versions(hosts, name, scope=scope)
+        if not versions:
+            raise NotFound()
+
+        num_hosts = get_package_num_hosts(hosts, name, scope=scope)
+        return Response(
+            PackageDetailSerializer(
+                {"name": name, "num_hosts": num_hosts, "versions": versions}
+            ).data
+        )
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter("name", str, description="The exact package name"),
+            OpenApiParameter("host", str, description="The FQDN of the host"),
+            OpenApiParameter(
+                "since", OpenApiTypes.DATETIME, description="Only changes after this"
+            ),
+        ],
+        responses=PackageChangeSerializer(many=True),
+    )
+    @action(detail=False)
+    def changes(self, request):
+        changes = get_package_changes(
+            self._get_hosts(),
+            name=request.query_params.get("name"),
+            host=request.query_params.get("host"),
+        )
+
+        since = request.query_params.get("since")
+        if since:
+            since = parse_datetime(since)
+            if since is None:
+                raise ValidationError({"since": "Invalid date"})
+            changes = changes.filter(changed_at__gt=since)
+
+        return Response(
+            PackageChangeSerializer(changes[: self.max_changes], many=True).data
+        )
@@ -0,0 +1,68 @@
+"""
+Streaming exports.
+
+Exports can contain every host in the fleet, so they are never built in memory.
+Instead, rows are fetched from the database in chunks and written to the response
+as they come in, using a StreamingHttpResponse.
+"""
+
+import csv
+import json
+from typing import Any, Iterable, Iterator
+
+from django.http import StreamingHttpResponse
+
+# The number of hosts fetched from the database at once
+EXPORT_CHUNK_SIZE = 500
+
+
+class _Echo:
+    """A file-like object that returns what is written to it, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows: Iterable[dict[str, Any]], fieldnames: list[str]) -> Iterator[str]:
+    """Streams rows as CSV, with the fieldnames as header"""
+    writer = csv.DictWriter(_Echo(), fieldnames=fieldnames, extrasaction="ignore")
+
+    yield writer.writeheader()
+
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_json_list(rows: Iterable[Any]) -> Iterator[str]:
+    """Streams rows as a JSON list"""
+    yield "["
+
+    for i, row in enumerate(rows):
+        prefix = ",\n" if i else "\n"
+        yield prefix + json.dumps(row, indent=2, default=str)
+
+    yield "\n]"
+
+
+def stream_ndjson(rows: Iterable[Any]) -> Iterator[str]:
+    """Streams rows as newline-delimited JSON, one row per line"""
+    for row in rows:
+        yield json.dumps(row, default=str) + "\n"
+
+
+def stream_lines(lines: Iterable[str]) -> Iterator[str]:
+    """Streams strings as lines of text"""
+    for line in lines:
+        yield f"{line}\n"
+
+
+def streaming_export_response(
+    content: Iterator[str], content_type: str, file_name: str
+) -> StreamingHttpResponse:
+    return StreamingHttpResponse(
+        content,
+        content_type=content_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{file_name}"',
+        },
+    )
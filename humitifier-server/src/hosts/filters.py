@@ -1,11 +1,11 @@
 import django_filters
-from django.db.models.expressions import RawSQL
+from django.db.models import Exists, OuterRef
 from django_filters import ChoiceFilter
 from drf_spectacular.types import OpenApiTypes
 
 from alerting.backend.registry import alert_generator_registry
 from alerting.models import AlertSeverity
-from hosts.models import DataSource, Host, SavedSearch
+from hosts.models import DataSource, Host, HostPackage, SavedSearch
 from main.filters import (
     BooleanChoiceFilter,
     FiltersForm,
@@ -59,52 +59,45 @@ class PackageFilter(django_filters.Filter):
 
         return self.filter_package(qs, value)
 
-    def _build_package_query(self, name_filter, version_filter=None, exact_match=False):
+    def _filter_packages(self, qs, name_filter, version_filter=None, exact_match=False):
         """
-        Helper method to build the common SQL query for package filtering.
+        Helper method to filter hosts on their packages, using the package index
+        (see HostPackage) instead of the package list in their last scan.
 
         :param name_filter: The name filter pattern (string).
         :param version_filter: The version filter pattern (string), optional.
         :param exact_match: Whether to use an exact match for the `version_filter`.
-        :return: Tuple of raw SQL and params.
+        :return: The filtered queryset.
         """
-        query = (
-            "SELECT count(*) FROM jsonb_array_elements("
-            "\"hosts_host\".\"last_scan_cache\"->'facts'->'generic.PackageList'"
-            ") AS pkg WHERE pkg->>'name' LIKE %s"
+        packages = HostPackage.objects.filter(
+            host=OuterRef("pk"), name__contains=name_filter
         )
-        params = [f"%{name_filter}%"]
 
         if version_filter:
-            operator = "=" if exact_match else "LIKE"
-            query += f" AND pkg->>'version' {operator} %s"
-            params.append(version_filter if exact_match else f"%{version_filter}%")
+            if exact_match:
+                packages = packages.filter(version=version_filter)
+            else:
+                packages = packages.filter(version__contains=version_filter)
 
-        return query, params
+        return qs.filter(Exists(packages))
 
     def filter_package(self, qs, value):
         """
         Filters the queryset based on package existence.
         """
-        query, params = self._build_package_query(value)
-        qs = qs.annotate(package_exists=RawSQL(query, params))
-        return qs.filter(package_exists__gt=0)
+        return self._filter_packages(qs, value)
 
     def filter_package_exact_version(self, qs, package, version):
         """
         Filters the queryset for an exact package version match.
         """
-        query, params = self._build_package_query(package, version, exact_match=True)
-        qs = qs.annotate(package_exists=RawSQL(query, params))
-        return qs.filter(package_exists__gt=0)
+        return self._filter_packages(qs, package, version, exact_match=True)
 
     def filter_package_start_version(self, qs, package, version):
         """
         Filters the queryset for a package version starting with `version`.
         """
-        query, params = self._build_package_query(package, version, exact_match=False)
-        qs = qs.annotate(package_exists=RawSQL(query, params))
-        return qs.filter(package_exists__gt=0)
+        return self._filter_packages(qs, package, version, exact_match=False)
 
 
 class HostAlertSeverityFilter(ChoiceFilter):
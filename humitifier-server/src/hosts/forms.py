@@ -12,6 +12,7 @@ class DataSourceForm(forms.ModelForm):
             "source_type",
             "scan_scheduling",
             "default_scan_spec",
+            "max_concurrent_scans",
         ]
         widgets = {
             "source_type": forms.RadioSelect,
@@ -27,6 +27,12 @@ Menu.add_item(
                 icon="icons/search.html",
                 check=lambda request: request.user.is_superuser,
             ),
+            HumitifierMenuItem(
+                "Packages",
+                reverse("hosts:packages"),
+                icon="icons/shield.html",
+                check=lambda request: request.user.is_authenticated,
+            ),
             HumitifierMenuItem(
                 "Data sources",
                 reverse("hosts:data_sources"),
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-19 10:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("hosts", "0027_host_asset_tag"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="datasource",
+            name="max_concurrent_scans",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="The maximum number of scans the scheduler will run at the same time for hosts of this data source. Leave empty for no limit.",
+                null=True,
+                verbose_name="Max. concurrent scans",
+            ),
+        ),
+    ]
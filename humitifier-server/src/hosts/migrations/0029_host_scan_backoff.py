@@ -0,0 +1,31 @@
+# Generated by Django 5.2.9 on 2026-10-19 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("hosts", "0028_datasource_max_concurrent_scans"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="host",
+            name="consecutive_scan_failures",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="host",
+            name="scan_backoff_until",
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="hostofflineperiod",
+            index=models.Index(
+                condition=models.Q(("end_date", None)),
+                fields=["host"],
+                name="hosts_open_offline_period_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-19 11:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("hosts", "0029_host_scan_backoff"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="host",
+            name="scan_statistics",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name="host",
+            name="next_scan_at",
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-19 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("hosts", "0030_host_scan_cadence"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="host",
+            name="scan_lease_token",
+            field=models.UUIDField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="host",
+            name="scan_lease_until",
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
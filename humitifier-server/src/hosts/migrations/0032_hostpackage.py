@@ -0,0 +1,72 @@
+# Generated by Django 5.2.9 on 2026-10-19 14:00
+
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+# Fills the package index from the last scans of existing hosts
+POPULATE_PACKAGES = """
+INSERT INTO hosts_hostpackage (host_id, name, version)
+SELECT DISTINCT host.id, package->>'name', coalesce(package->>'version', '')
+FROM hosts_host AS host
+CROSS JOIN LATERAL jsonb_array_elements(
+    CASE
+        WHEN jsonb_typeof(host.last_scan_cache->'facts'->'generic.PackageList') = 'array'
+        THEN host.last_scan_cache->'facts'->'generic.PackageList'
+        ELSE '[]'::jsonb
+    END
+) AS package
+WHERE package->>'name' IS NOT NULL AND package->>'name' <> ''
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("hosts", "0031_host_scan_lease"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.CreateModel(
+            name="HostPackage",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.TextField()),
+                ("version", models.TextField(blank=True, default="")),
+                (
+                    "host",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="packages",
+                        to="hosts.host",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    django.contrib.postgres.indexes.GinIndex(
+                        fields=["name"],
+                        name="hosts_hostpackage_name_trgm",
+                        opclasses=["gin_trgm_ops"],
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("host", "name", "version"),
+                        name="hosts_hostpackage_unique",
+                    )
+                ],
+            },
+        ),
+        migrations.RunSQL(POPULATE_PACKAGES, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.9 on 2026-10-19 15:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("hosts", "0032_hostpackage"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="hostpackage",
+            index=models.Index(
+                fields=["name", "version"], name="hosts_hostpackage_name_idx"
+            ),
+        ),
+        migrations.CreateModel(
+            name="HostPackageChange",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.TextField()),
+                ("old_version", models.TextField(blank=True, null=True)),
+                ("new_version", models.TextField(blank=True, null=True)),
+                (
+                    "changed_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                (
+                    "host",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="package_changes",
+                        to="hosts.host",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-changed_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["name", "-changed_at"],
+                        name="hosts_packagechange_name_idx",
+                    ),
+                    models.Index(
+                        fields=["host", "-changed_at"],
+                        name="hosts_packagechange_host_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.9 on 2026-10-19 16:00
+
+from django.db import migrations, models
+
+# Fills the package counts from the packages of hosts that aren't archived
+POPULATE_PACKAGE_COUNTS = """
+INSERT INTO hosts_packageversioncount (name, version, num_hosts)
+SELECT package.name, package.version, COUNT(*)
+FROM hosts_hostpackage package
+JOIN hosts_host host ON host.id = package.host_id
+WHERE NOT host.archived
+GROUP BY package.name, package.version;
+INSERT INTO hosts_packagecount (name, num_hosts)
+SELECT package.name, COUNT(DISTINCT package.host_id)
+FROM hosts_hostpackage package
+JOIN hosts_host host ON host.id = package.host_id
+WHERE NOT host.archived
+GROUP BY package.name;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("hosts", "0033_hostpackagechange"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PackageCount",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.TextField(unique=True)),
+                ("num_hosts", models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="PackageVersionCount",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.TextField()),
+                ("version", models.TextField(blank=True, default="")),
+                ("num_hosts", models.IntegerField(default=0)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("name", "version"),
+                        name="hosts_packageversioncount_unique",
+                    )
+                ],
+            },
+        ),
+        migrations.RunSQL(POPULATE_PACKAGE_COUNTS, migrations.RunSQL.noop),
+    ]
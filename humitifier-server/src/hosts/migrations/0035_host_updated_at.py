@@ -0,0 +1,22 @@
+# Generated by Django 5.2.9 on 2026-10-19 17:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("hosts", "0034_packagecount_packageversioncount"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="host",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+    ]
@@ -1,23 +1,159 @@
 import dataclasses
 import uuid
-from datetime import datetime
-from functools import cached_property
+from collections import defaultdict
+from collections.abc import Mapping
+from datetime import datetime, timedelta
+from functools import cache, cached_property
 from typing import Optional
 
-from django.db import models
-from django.db.models import Case, F, Value, When
+from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.db import connection, models, transaction
+from django.db.models import (
+    Case,
+    Count,
+    Exists,
+    F,
+    OuterRef,
+    Q,
+    Subquery,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from django.utils.safestring import mark_safe
+from pydantic import TypeAdapter
 
-from alerting.models import AlertSeverity
+from alerting.models import Alert, AlertSeverity
 from api.models import OAuth2Application
 from hosts.json import HostJSONDecoder, HostJSONEncoder
 
-from humitifier_common.scan_data import ScanInput, ScanOutput
+from humitifier_common.artefacts import registry as artefact_registry
+from humitifier_common.scan_data import ScanError, ScanInput, ScanOutput
 from humitifier_server.logger import logger
 from main.models import User
 from main.templatetags.strip_quotes import strip_quotes
 from scanning.models import ScanSpec
+from scanning.resolution import ResolvedScanSpec, get_resolved_scan_spec
+
+
+@cache
+def _get_artefact_adapter(artefact) -> TypeAdapter:
+    # Artefacts are optional in scans, see FactTypedDict and MetricTypedDict
+    return TypeAdapter(Optional[artefact])
+
+
+def parse_artefact(artefact, data):
+    """
+    Validates the data of a single artefact, the same way ScanOutput validates the
+    artefacts of a scan. Use this when only one artefact of a scan is needed.
+
+    :param artefact: The artefact class, e.g. PackageList.
+    :param data: The raw data of the artefact, from a scan.
+    :raises pydantic.ValidationError: If the data is invalid.
+    """
+    return _get_artefact_adapter(artefact).validate_python(data)
+
+
+class LazyArtefacts(Mapping):
+    """
+    The artefacts of one section of a scan, like ScanOutput.facts. Each artefact is
+    validated on first access, and kept for later use.
+
+    Like ScanOutput, unknown artefacts are left out.
+    """
+
+    def __init__(self, raw_artefacts: dict, artefacts):
+        self._artefacts = {
+            artefact.__artefact_name__: artefact
+            for artefact in artefacts
+            if artefact.__artefact_name__ in raw_artefacts
+        }
+        self._raw_artefacts = raw_artefacts
+        self._parsed_artefacts = {}
+
+    def __getitem__(self, name: str):
+        if name not in self._parsed_artefacts:
+            self._parsed_artefacts[name] = parse_artefact(
+                self._artefacts[name], self._raw_artefacts[name]
+            )
+
+        return self._parsed_artefacts[name]
+
+    def __contains__(self, name):
+        # Without validating the artefact, unlike Mapping.__contains__
+        return name in self._artefacts
+
+    def __iter__(self):
+        return iter(self._artefacts)
+
+    def __len__(self):
+        return len(self._artefacts)
+
+
+class LazyScanOutput:
+    """
+    A scan, like ScanOutput, that only validates the parts of the scan that are
+    used. Most code only needs one or two artefacts of a scan, while validating
+    all of them, like the package list, is slow.
+
+    Artefacts are validated on first access, see LazyArtefacts; the other fields
+    of the scan are validated together, on first access of any of them. Use
+    to_scan_output to validate the whole scan, e.g. to serialize it.
+    """
+
+    def __init__(self, raw_data: dict):
+        self.raw_data = raw_data
+        self.facts = LazyArtefacts(
+            raw_data.get("facts") or {}, artefact_registry.all_facts()
+        )
+        self.metrics = LazyArtefacts(
+            raw_data.get("metrics") or {}, artefact_registry.all_metrics()
+        )
+
+    @cached_property
+    def _envelope(self) -> ScanOutput:
+        return ScanOutput(**{**self.raw_data, "facts": {}, "metrics": {}})
+
+    @property
+    def original_input(self) -> ScanInput:
+        return self._envelope.original_input
+
+    @property
+    def scan_date(self) -> datetime:
+        return self._envelope.scan_date
+
+    @property
+    def hostname(self) -> str:
+        return self._envelope.hostname
+
+    @property
+    def errors(self) -> list[ScanError]:
+        return self._envelope.errors
+
+    @property
+    def version(self) -> int:
+        return self._envelope.version
+
+    def get_artefact_data(self, artefact):
+        """See ScanOutput.get_artefact_data"""
+        if not isinstance(artefact, str):
+            if not hasattr(artefact, "__artefact_name__"):
+                raise KeyError
+            artefact = artefact.__artefact_name__
+
+        if artefact in self.facts:
+            return self.facts[artefact]
+
+        if artefact in self.metrics:
+            return self.metrics[artefact]
+
+        raise KeyError
+
+    def to_scan_output(self) -> ScanOutput:
+        """Validates the whole scan into a ScanOutput"""
+        return ScanOutput(**self.raw_data)
 
 
 @dataclasses.dataclass
@@ -44,7 +180,7 @@ class ScanData:
         return cls(version=version, raw_data=raw_scan, scan_date=created)
 
     @cached_property
-    def parsed_data(self) -> ScanOutput | None:
+    def parsed_data(self) -> LazyScanOutput | None:
         # Should only happen in tests
         if not self.raw_data:
             return None
@@ -60,7 +196,7 @@ class ScanData:
         if "scan_date" not in self.raw_data:
             self.raw_data["scan_date"] = self.scan_date.isoformat()
 
-        return ScanOutput(**self.raw_data)
+        return LazyScanOutput(self.raw_data)
 
 
 class DataSourceType(models.TextChoices):
@@ -150,11 +286,103 @@ class DataSource(models.Model):
         blank=True,
     )
 
+    max_concurrent_scans = models.PositiveIntegerField(
+        "Max. concurrent scans",
+        help_text="The maximum number of scans the scheduler will run at the same "
+        "time for hosts of this data source. Leave empty for no limit.",
+        null=True,
+        blank=True,
+    )
+
     def __str__(self):
         return self.name
 
 
-class HostManager(models.Manager):
+def _alert_count(**filters):
+    """
+    Subquery counting the alerts of the outer host, matching the given filters.
+    """
+    alerts = (
+        Alert.objects.filter(host=OuterRef("pk"), **filters)
+        .order_by()
+        .values("host")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    return Coalesce(Subquery(alerts), 0)
+
+
+def _open_offline_periods():
+    return HostOfflinePeriod.objects.filter(host=OuterRef("pk"), end_date=None)
+
+
+# Fields of Host that can be large, which are not needed to list hosts
+LARGE_HOST_FIELDS = ("last_scan_cache", "scan_statistics")
+
+
+class HostQuerySet(models.QuerySet):
+
+    def light(self):
+        """
+        Defers the fields that can be large, most notably the last scan, which
+        would otherwise be fetched and decoded for every host in a list.
+
+        Accessing a deferred field on a host fetches it with an extra query, so
+        only use this when the last scan isn't needed. Pages that do need it, like
+        the host detail page, should not use this.
+        """
+        return self.defer(*LARGE_HOST_FIELDS)
+
+    def with_reboot_policy(self):
+        """
+        Annotates the reboot policy from the last scan, for use by the API's
+        HostSerializer. This allows the last scan to be deferred using light().
+
+        Like get_scan_object, scans without a version (version 1) are considered
+        to have no reboot policy.
+        """
+        return self.annotate(
+            _reboot_policy=Case(
+                When(
+                    last_scan_cache__version__gt=1,
+                    then=F("last_scan_cache__facts__server.RebootPolicy"),
+                ),
+                default=None,
+            )
+        )
+
+    def online(self):
+        """Excludes hosts that are currently offline (powered down)"""
+        return self.exclude(Exists(_open_offline_periods()))
+
+    def with_offline_state(self):
+        """
+        Annotates whether a host is offline, for use by the is_offline property.
+        """
+        return self.annotate(_is_offline=Exists(_open_offline_periods()))
+
+    def with_alert_counts(self):
+        """
+        Annotates the number of (unacknowledged) alerts per severity, and the
+        number of acknowledged alerts. These are used by the num_*_alerts
+        properties, instead of querying them per host.
+
+        Subqueries are used instead of aggregating over a join, as the latter
+        would be affected by any filters on alerts applied to this queryset.
+        """
+        return self.annotate(
+            _num_alerts=_alert_count(),
+            _num_acknowledged_alerts=_alert_count(acknowledgement__isnull=False),
+            **{
+                f"_num_{severity.value}_alerts": _alert_count(
+                    severity=severity, acknowledgement=None
+                )
+                for severity in AlertSeverity
+            },
+        )
+
+
+class HostManager(models.Manager.from_queryset(HostQuerySet)):
 
     def get_for_user(self, user: User):
         if user.is_anonymous:
@@ -202,6 +430,10 @@ class Host(models.Model):
         auto_now_add=True,
     )
 
+    # When the host was last edited. Saving only the scan state of a host, like
+    # add_scan does, leaves this alone
+    updated_at = models.DateTimeField(auto_now=True)
+
     protected = models.BooleanField(default=False)
 
     archived = models.BooleanField(default=False)
@@ -212,6 +444,25 @@ class Host(models.Model):
 
     last_scan_scheduled = models.DateTimeField(null=True)
 
+    # The number of scans in a row that were rejected. Used to back off from hosts
+    # that keep failing, see record_scan_failure()
+    consecutive_scan_failures = models.PositiveIntegerField(default=0)
+
+    # The scheduler will not scan this host before this date
+    scan_backoff_until = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    # When each artefact was last collected, and how often it changes. Used to
+    # determine the scan cadence of this host, see scanning.cadence
+    scan_statistics = models.JSONField(default=dict, blank=True)
+
+    # When the first artefact of this host is due for collection again
+    next_scan_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    # A lease held by the scan that is currently in flight for this host, to
+    # prevent concurrent scans of the same host. See acquire_scan_lease()
+    scan_lease_token = models.UUIDField(null=True, blank=True)
+    scan_lease_until = models.DateTimeField(null=True, blank=True, db_index=True)
+
     data_source = models.ForeignKey(
         DataSource,
         verbose_name="Data source",
@@ -297,9 +548,29 @@ class Host(models.Model):
         scan.save()
 
         if cache_scan:
+            packages = get_scan_packages(scan_data)
+            if packages != get_scan_packages(self.last_scan_cache):
+                HostPackage.objects.update_for_host(
+                    self, packages, changed_at=scan.created_at
+                )
+
             self.last_scan_cache = scan_data
             self.last_scan_date = scan.created_at
-            self.save()
+            # A successful scan ends any backoff
+            self.consecutive_scan_failures = 0
+            self.scan_backoff_until = None
+            # Only save the scan state, so saving a scan is not mistaken for an
+            # edit of the host (see hosts.signals)
+            self.save(
+                update_fields=[
+                    "last_scan_cache",
+                    "last_scan_date",
+                    "consecutive_scan_failures",
+                    "scan_backoff_until",
+                    "scan_statistics",
+                    "next_scan_at",
+                ]
+            )
 
         return scan
 
@@ -315,75 +586,42 @@ class Host(models.Model):
     ## Properties
     ##
 
+    @property
+    def num_alerts(self):
+        return self._get_alert_count("_num_alerts", self.alerts.all())
+
     @property
     def num_critical_alerts(self):
-        return self._get_alerts_for_severity(AlertSeverity.CRITICAL, count=True)
+        return self._get_alert_count_for_severity(AlertSeverity.CRITICAL)
 
     @property
     def num_warning_alerts(self):
-        return self._get_alerts_for_severity(AlertSeverity.WARNING, count=True)
+        return self._get_alert_count_for_severity(AlertSeverity.WARNING)
 
     @property
     def num_info_alerts(self):
-        return self._get_alerts_for_severity(AlertSeverity.INFO, count=True)
+        return self._get_alert_count_for_severity(AlertSeverity.INFO)
 
     @property
     def num_acknowledged_alerts(self):
-        # Use the prefetched objects if they are available
-        # It's not quicker for a single query, but it is for multiple queries
-        # (Read: the list page)
-        if "alerts" in self._prefetched_objects_cache:
-            if 'alert_acknowledgements' in self._prefetched_objects_cache:
-                acknowledged_alerts = [
-                    ack._alert_id
-                    for ack in self._prefetched_objects_cache["alert_acknowledgements"]
-                ]
-                alerts = [
-                    alert for alert in self.alerts.all()
-                    if alert.id in acknowledged_alerts
-                ]
-            else:
-                alerts = [
-                    alert
-                    for alert in self.alerts.all()
-                    if alert.get_acknowledgment() is not None
-                ]
-
-            return len(alerts)
+        return self._get_alert_count(
+            "_num_acknowledged_alerts", self.alerts.exclude(acknowledgement=None)
+        )
 
-        return self.alerts.exclude(acknowledgement=None).count()
+    def _get_alert_count_for_severity(self, severity):
+        return self._get_alert_count(
+            f"_num_{severity.value}_alerts",
+            self.alerts.filter(severity=severity, acknowledgement=None),
+        )
 
-    def _get_alerts_for_severity(self, severity, count=False):
-        # Use the prefetched objects if they are available
-        # It's not quicker for a single query, but it is for multiple queries
+    def _get_alert_count(self, annotation, queryset):
+        # Use the annotated count if available (see HostQuerySet.with_alert_counts)
+        # It's not quicker for a single host, but it is for multiple hosts
         # (Read: the list page)
-        if "alerts" in self._prefetched_objects_cache:
-            if 'alert_acknowledgements' in self._prefetched_objects_cache:
-                acknowledged_alerts = [
-                    ack._alert_id
-                    for ack in self._prefetched_objects_cache["alert_acknowledgements"]
-                ]
-                alerts = [
-                    alert for alert in self.alerts.all()
-                    if alert.severity == severity and alert.id not in acknowledged_alerts
-                ]
-            else:
-                alerts = [
-                    alert
-                    for alert in self.alerts.all()
-                    if alert.severity == severity
-                    and alert.get_acknowledgment() is None
-                ]
+        if hasattr(self, annotation):
+            return getattr(self, annotation)
 
-            if count:
-                return len(alerts)
-            return alerts
-
-        qs = self.alerts.filter(severity=severity, acknowledgement=None)
-
-        if count:
-            return qs.count()
-        return qs
+        return queryset.count()
 
     @property
     def can_manually_edit(self):
@@ -479,9 +717,14 @@ class Host(models.Model):
 
         :return: None
         """
-        self.archived = True
-        self.archival_date = timezone.now()
-        self.save()
+        with transaction.atomic():
+            if not _lock_archived(self):
+                packages = HostPackage.objects.get_for_host(self)
+                update_package_counts(packages, set())
+
+            self.archived = True
+            self.archival_date = timezone.now()
+            self.save()
         self.alerts.all().delete()
 
     def unarchive(self):
@@ -493,9 +736,14 @@ class Host(models.Model):
             logic conflict.
         :return: None
         """
-        self.archived = False
-        self.archival_date = None
-        self.save()
+        with transaction.atomic():
+            if _lock_archived(self):
+                packages = HostPackage.objects.get_for_host(self)
+                update_package_counts(set(), packages)
+
+            self.archived = False
+            self.archival_date = None
+            self.save()
         self.regenerate_alerts()
 
     def get_scan_spec(self) -> ScanSpec | None:
@@ -507,18 +755,107 @@ class Host(models.Model):
 
         return None
 
-    def get_scan_input(self) -> ScanInput | None:
-        if scan_spec := self.get_scan_spec():
-            return scan_spec.build_scan_input(self)
+    def get_scan_spec_id(self) -> int | None:
+        if self.scan_spec_override_id:
+            return self.scan_spec_override_id
+
+        if self.data_source:
+            return self.data_source.default_scan_spec_id
 
         return None
 
+    def get_resolved_scan_spec(self) -> ResolvedScanSpec | None:
+        if scan_spec_id := self.get_scan_spec_id():
+            return get_resolved_scan_spec(scan_spec_id)
+
+        return None
+
+    def get_scan_input(self, *, partial: bool = False) -> ScanInput | None:
+        if scan_spec := self.get_resolved_scan_spec():
+            return scan_spec.build_scan_input(self, partial=partial)
+
+        return None
+
+    def record_scan_failure(self):
+        """
+        Registers that a scan of this host was rejected. After
+        SCANNING_BACKOFF_THRESHOLD failures in a row, the scheduler will back off
+        exponentially; the next scheduled scan acts as a probe, and a successful
+        scan resets the backoff.
+
+        Scans of the same host can be rejected concurrently, so the counter is
+        incremented in the database. The update locks the row until the end of the
+        transaction, so the backoff is always based on the latest count.
+        """
+        hosts = Host.objects.filter(pk=self.pk)
+
+        with transaction.atomic():
+            hosts.update(consecutive_scan_failures=F("consecutive_scan_failures") + 1)
+            self.consecutive_scan_failures = hosts.values_list(
+                "consecutive_scan_failures", flat=True
+            ).get()
+
+            excess_failures = (
+                self.consecutive_scan_failures - settings.SCANNING_BACKOFF_THRESHOLD
+            )
+            if excess_failures >= 0:
+                backoff = min(
+                    timedelta(minutes=settings.SCANNING_BACKOFF_BASE_MINUTES)
+                    * 2 ** min(excess_failures, 16),
+                    timedelta(hours=settings.SCANNING_BACKOFF_MAX_HOURS),
+                )
+                self.scan_backoff_until = timezone.now() + backoff
+                hosts.update(scan_backoff_until=self.scan_backoff_until)
+
+    def acquire_scan_lease(self, until: datetime) -> uuid.UUID | None:
+        """
+        Acquires the scan lease of this host, if no other scan holds it. The lease
+        is acquired using a single conditional update, so only one of multiple
+        concurrent callers can succeed.
+
+        :param until: When the lease expires, if it isn't released before then
+        :return: The token of the lease, or None if another scan holds the lease
+        """
+        token = uuid.uuid4()
+        acquired = (
+            Host.objects.filter(pk=self.pk)
+            .filter(Q(scan_lease_until=None) | Q(scan_lease_until__lte=timezone.now()))
+            .update(scan_lease_token=token, scan_lease_until=until)
+        )
+        if not acquired:
+            return None
+
+        self.scan_lease_token = token
+        self.scan_lease_until = until
+
+        return token
+
+    def release_scan_lease(self, token: str | uuid.UUID | None):
+        """Releases the scan lease of this host, if it's still held by the token"""
+        if token is None:
+            return
+
+        Host.objects.filter(pk=self.pk, scan_lease_token=token).update(
+            scan_lease_token=None, scan_lease_until=None
+        )
+
+    def holds_scan_lease(self, token: str | uuid.UUID | None) -> bool:
+        """
+        Whether the scan with the given lease token is (still) the current scan of
+        this host. Scans without a token, like uploaded scans, always are.
+        """
+        if token is None:
+            return True
+
+        return str(self.scan_lease_token) == str(token)
+
     @property
     def is_offline(self):
-        if last_offline_period := self.get_last_offline_period():
-            return last_offline_period.end_date is None
+        # Use the annotated value if available (see HostQuerySet.with_offline_state)
+        if hasattr(self, "_is_offline"):
+            return self._is_offline
 
-        return False
+        return self.offline_periods.filter(end_date=None).exists()
 
     def get_last_offline_period(self) -> Optional["HostOfflinePeriod"]:
         return self.offline_periods.all().order_by("-start_date").first()
@@ -553,6 +890,15 @@ class Host(models.Model):
 
 
 class HostOfflinePeriod(models.Model):
+    class Meta:
+        indexes = [
+            # Used to quickly find offline hosts, see HostQuerySet.online()
+            models.Index(
+                fields=["host"],
+                condition=models.Q(end_date=None),
+                name="hosts_open_offline_period_idx",
+            )
+        ]
 
     host = models.ForeignKey(
         Host, on_delete=models.CASCADE, related_name="offline_periods"
@@ -563,6 +909,331 @@ class HostOfflinePeriod(models.Model):
     end_date = models.DateTimeField(null=True, blank=True)
 
 
+def get_scan_packages(scan_data: dict | None) -> set[tuple[str, str]]:
+    """Get the (name, version) of the installed packages from scan data"""
+    facts = (scan_data or {}).get("facts") or {}
+    packages = facts.get("generic.PackageList")
+    if not isinstance(packages, list):
+        return set()
+
+    return {
+        (package["name"], package.get("version") or "")
+        for package in packages
+        if isinstance(package, dict) and package.get("name")
+    }
+
+
+def _get_package_changes(
+    host: "Host",
+    previous: set[tuple[str, str]],
+    current: set[tuple[str, str]],
+    changed_at: datetime,
+) -> list["HostPackageChange"]:
+    """
+    Gets the changes between two (name, version) sets, one per package name.
+    Hosts can have multiple versions of a package installed (e.g. kernels), so
+    versions are joined with a comma.
+    """
+    previous_versions = defaultdict(set)
+    for name, version in previous:
+        previous_versions[name].add(version)
+
+    current_versions = defaultdict(set)
+    for name, version in current:
+        current_versions[name].add(version)
+
+    changes = []
+    for name in sorted({name for name, _ in previous ^ current}):
+        changes.append(
+            HostPackageChange(
+                host=host,
+                name=name,
+                old_version=", ".join(sorted(previous_versions[name])) or None,
+                new_version=", ".join(sorted(current_versions[name])) or None,
+                changed_at=changed_at,
+            )
+        )
+
+    return changes
+
+
+def _lock_archived(host: "Host") -> bool:
+    """
+    Locks the row of a host until the end of the transaction, so its packages
+    and archived state can't change concurrently.
+
+    :return: Whether the host is archived, as stored in the database.
+    """
+    return (
+        Host.objects.select_for_update()
+        .filter(pk=host.pk)
+        .values_list("archived", flat=True)
+        .first()
+        or False
+    )
+
+
+def update_package_counts(
+    old_packages: set[tuple[str, str]], new_packages: set[tuple[str, str]]
+):
+    """
+    Updates PackageCount and PackageVersionCount for one host, whose
+    (name, version) set changed from old_packages to new_packages. Pass an empty
+    set to add or remove all packages of a host, e.g. when it's (un)archived.
+    """
+    version_deltas = {package: 1 for package in new_packages - old_packages}
+    version_deltas.update({package: -1 for package in old_packages - new_packages})
+
+    old_names = {name for name, _ in old_packages}
+    new_names = {name for name, _ in new_packages}
+    name_deltas = {name: 1 for name in new_names - old_names}
+    name_deltas.update({name: -1 for name in old_names - new_names})
+
+    if not version_deltas:
+        return
+
+    # Rows are upserted in a fixed order, so concurrent scans of hosts with
+    # the same packages lock the rows in the same order and can't deadlock.
+    versions = sorted(version_deltas)
+    names = sorted(name_deltas)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO hosts_packageversioncount (name, version, num_hosts)
+            SELECT * FROM unnest(%s::text[], %s::text[], %s::integer[])
+            ORDER BY 1, 2
+            ON CONFLICT (name, version) DO UPDATE
+            SET num_hosts = hosts_packageversioncount.num_hosts + EXCLUDED.num_hosts
+            """,
+            [
+                [name for name, _ in versions],
+                [version for _, version in versions],
+                [version_deltas[package] for package in versions],
+            ],
+        )
+        if names:
+            cursor.execute(
+                """
+                INSERT INTO hosts_packagecount (name, num_hosts)
+                SELECT * FROM unnest(%s::text[], %s::integer[])
+                ORDER BY 1
+                ON CONFLICT (name) DO UPDATE
+                SET num_hosts = hosts_packagecount.num_hosts + EXCLUDED.num_hosts
+                """,
+                [names, [name_deltas[name] for name in names]],
+            )
+
+    removed_names = {name for name, _ in old_packages - new_packages}
+    if removed_names:
+        PackageVersionCount.objects.filter(
+            name__in=removed_names, num_hosts__lte=0
+        ).delete()
+        PackageCount.objects.filter(name__in=removed_names, num_hosts__lte=0).delete()
+
+
+_REBUILD_PACKAGE_COUNTS = """
+DELETE FROM hosts_packageversioncount;
+DELETE FROM hosts_packagecount;
+INSERT INTO hosts_packageversioncount (name, version, num_hosts)
+SELECT package.name, package.version, COUNT(*)
+FROM hosts_hostpackage package
+JOIN hosts_host host ON host.id = package.host_id
+WHERE NOT host.archived
+GROUP BY package.name, package.version;
+INSERT INTO hosts_packagecount (name, num_hosts)
+SELECT package.name, COUNT(DISTINCT package.host_id)
+FROM hosts_hostpackage package
+JOIN hosts_host host ON host.id = package.host_id
+WHERE NOT host.archived
+GROUP BY package.name;
+"""
+
+
+def rebuild_package_counts():
+    """
+    Recomputes PackageCount and PackageVersionCount from the packages of all
+    hosts that aren't archived. These are normally kept up to date
+    incrementally, see update_package_counts.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            "LOCK TABLE hosts_packageversioncount, hosts_packagecount "
+            "IN EXCLUSIVE MODE"
+        )
+        cursor.execute(_REBUILD_PACKAGE_COUNTS)
+
+
+class HostPackageManager(models.Manager):
+
+    def get_for_host(self, host: "Host") -> set[tuple[str, str]]:
+        """Get the (name, version) of the installed packages of a host"""
+        return set(self.filter(host=host).values_list("name", "version"))
+
+    def update_for_host(
+        self,
+        host: "Host",
+        packages: set[tuple[str, str]],
+        changed_at: datetime | None = None,
+    ):
+        """
+        Updates the packages of a host to the given (name, version) set. Only
+        the packages that were added or removed are written.
+
+        Changes are recorded as HostPackageChange, except when the host had no
+        packages yet, which happens for its first scan. The package counts are
+        updated as well, unless the host is archived.
+        """
+        with transaction.atomic():
+            archived = _lock_archived(host)
+
+            current = {
+                (name, version): pk
+                for pk, name, version in self.filter(host=host).values_list(
+                    "pk", "name", "version"
+                )
+            }
+
+            if current:
+                HostPackageChange.objects.bulk_create(
+                    _get_package_changes(
+                        host, set(current), packages, changed_at or timezone.now()
+                    )
+                )
+
+            removed = [pk for package, pk in current.items() if package not in packages]
+            if removed:
+                self.filter(pk__in=removed).delete()
+
+            self.bulk_create(
+                [
+                    HostPackage(host=host, name=name, version=version)
+                    for name, version in packages
+                    if (name, version) not in current
+                ],
+                ignore_conflicts=True,
+            )
+
+            if not archived:
+                update_package_counts(set(current), packages)
+
+
+class HostPackage(models.Model):
+    """
+    The installed packages of a host, as of its last scan. This duplicates the
+    generic.PackageList fact in Host.last_scan_cache, so hosts can be filtered
+    on their packages using indexes, instead of expanding the package list of
+    every host. Kept up to date by Host.add_scan.
+    """
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["host", "name", "version"],
+                name="hosts_hostpackage_unique",
+            )
+        ]
+        indexes = [
+            # Used for substring searches on package names, see PackageFilter
+            GinIndex(
+                fields=["name"],
+                name="hosts_hostpackage_name_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+            # Used for the version distribution of a package, see hosts.packages
+            models.Index(
+                fields=["name", "version"],
+                name="hosts_hostpackage_name_idx",
+            ),
+        ]
+
+    objects = HostPackageManager()
+
+    host = models.ForeignKey(Host, on_delete=models.CASCADE, related_name="packages")
+
+    name = models.TextField()
+
+    version = models.TextField(blank=True, default="")
+
+    def __str__(self):
+        return f"{self.name} {self.version}"
+
+
+class PackageCount(models.Model):
+    """
+    The number of hosts that aren't archived with a package installed, in any
+    version. Maintained incrementally with the packages of the hosts, see
+    update_package_counts, so the package inventory of the whole fleet doesn't
+    have to group all HostPackage rows.
+    """
+
+    name = models.TextField(unique=True)
+
+    num_hosts = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.num_hosts}"
+
+
+class PackageVersionCount(models.Model):
+    """
+    The number of hosts that aren't archived with a version of a package
+    installed. See PackageCount.
+    """
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["name", "version"],
+                name="hosts_packageversioncount_unique",
+            )
+        ]
+
+    name = models.TextField()
+
+    version = models.TextField(blank=True, default="")
+
+    num_hosts = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} {self.version}: {self.num_hosts}"
+
+
+class HostPackageChange(models.Model):
+    """
+    A change in the installed versions of a package on a host, between two
+    scans. old_version is empty for installed packages, new_version for
+    removed packages.
+    """
+
+    class Meta:
+        ordering = ["-changed_at"]
+        indexes = [
+            models.Index(
+                fields=["name", "-changed_at"],
+                name="hosts_packagechange_name_idx",
+            ),
+            models.Index(
+                fields=["host", "-changed_at"],
+                name="hosts_packagechange_host_idx",
+            ),
+        ]
+
+    host = models.ForeignKey(
+        Host, on_delete=models.CASCADE, related_name="package_changes"
+    )
+
+    name = models.TextField()
+
+    old_version = models.TextField(null=True, blank=True)
+
+    new_version = models.TextField(null=True, blank=True)
+
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.name}: {self.old_version} -> {self.new_version}"
+
+
 class Scan(models.Model):
     class Meta:
         ordering = ["-created_at"]
@@ -0,0 +1,190 @@
+"""
+Fleet-wide package inventory.
+
+Answers questions like "which versions of openssl are installed, and on how many
+hosts", using the package index (HostPackage) and the package change history
+(HostPackageChange), which are both kept up to date by Host.add_scan.
+
+Summaries over the whole fleet (pass None as the hosts) are read from the
+package counts (PackageCount and PackageVersionCount), which are maintained with
+the packages of the hosts, so they don't depend on the size of the fleet.
+Summaries over the hosts a user has access to are grouped from the package
+index, and cached until a scan changes the packages of any host, or a host is
+changed; see hosts.search.result_cache.
+"""
+
+import hashlib
+from typing import Callable
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, OuterRef, QuerySet, Subquery
+from django.db.models.functions import Coalesce
+
+from hosts.models import (
+    Host,
+    HostPackage,
+    HostPackageChange,
+    PackageCount,
+    PackageVersionCount,
+)
+from hosts.search.result_cache import HOST_VERSION, get_data_versions
+
+# Data versions the package summaries depend on
+PACKAGE_DEPENDENCIES = [HOST_VERSION, "facts:generic.PackageList"]
+
+
+def _get_cached(key_parts: list[str], compute: Callable[[], list[dict] | int]):
+    if not settings.SEARCH_RESULT_CACHE_TIMEOUT:
+        return compute()
+
+    versions = get_data_versions(PACKAGE_DEPENDENCIES)
+    key = hashlib.sha256("|".join([*key_parts, *versions]).encode()).hexdigest()
+    key = f"hosts:packages:{key}"
+
+    result = cache.get(key)
+    if result is None:
+        result = compute()
+        cache.set(key, result, settings.SEARCH_RESULT_CACHE_TIMEOUT)
+
+    return result
+
+
+def get_package_summaries(
+    hosts: QuerySet[Host] | None, *, scope: str, search: str = ""
+) -> list[dict] | QuerySet:
+    """
+    Gets the installed packages on the given hosts.
+
+    :param hosts: The hosts to include, or None for all hosts that aren't
+                  archived.
+    :param scope: A string identifying the hosts queryset, see
+                  hosts.search.result_cache.get_access_scope.
+    :param search: Only include packages with a name containing this string.
+    :return: Dicts with the name, num_hosts and num_versions of each package,
+             ordered by name.
+    """
+    if hosts is None:
+        packages = PackageCount.objects.all()
+        if search:
+            packages = packages.filter(name__contains=search)
+
+        num_versions = (
+            PackageVersionCount.objects.filter(name=OuterRef("name"))
+            .order_by()
+            .values("name")
+            .annotate(count=Count("pk"))
+            .values("count")
+        )
+        return (
+            packages.annotate(num_versions=Coalesce(Subquery(num_versions), 0))
+            .values("name", "num_hosts", "num_versions")
+            .order_by("name")
+        )
+
+    def _compute():
+        packages = HostPackage.objects.filter(host__in=hosts)
+        if search:
+            packages = packages.filter(name__contains=search)
+
+        return list(
+            packages.values("name")
+            .annotate(
+                num_hosts=Count("host", distinct=True),
+                num_versions=Count("version", distinct=True),
+            )
+            .order_by("name")
+        )
+
+    return _get_cached(["summaries", scope, search], _compute)
+
+
+def get_package_versions(
+    hosts: QuerySet[Host] | None, name: str, *, scope: str
+) -> list[dict]:
+    """
+    Gets the version distribution of a package on the given hosts.
+
+    :param hosts: The hosts to include, or None for all hosts that aren't
+                  archived.
+    :param name: The exact name of the package.
+    :param scope: A string identifying the hosts queryset, see
+                  hosts.search.result_cache.get_access_scope.
+    :return: Dicts with the version and num_hosts of each installed version,
+             ordered by the number of hosts, most common first.
+    """
+    if hosts is None:
+        return list(
+            PackageVersionCount.objects.filter(name=name)
+            .values("version", "num_hosts")
+            .order_by("-num_hosts", "version")
+        )
+
+    def _compute():
+        return list(
+            HostPackage.objects.filter(host__in=hosts, name=name)
+            .values("version")
+            .annotate(num_hosts=Count("host"))
+            .order_by("-num_hosts", "version")
+        )
+
+    return _get_cached(["versions", scope, name], _compute)
+
+
+def get_package_num_hosts(
+    hosts: QuerySet[Host] | None, name: str, *, scope: str
+) -> int:
+    """
+    Gets the number of hosts with a package installed, in any version. This is
+    not the sum of the version distribution, as a host can have several versions
+    of a package installed.
+
+    :param hosts: The hosts to include, or None for all hosts that aren't
+                  archived.
+    :param name: The exact name of the package.
+    :param scope: A string identifying the hosts queryset, see
+                  hosts.search.result_cache.get_access_scope.
+    """
+    if hosts is None:
+        return (
+            PackageCount.objects.filter(name=name)
+            .values_list("num_hosts", flat=True)
+            .first()
+            or 0
+        )
+
+    def _compute():
+        return HostPackage.objects.filter(host__in=hosts, name=name).aggregate(
+            num_hosts=Count("host", distinct=True)
+        )["num_hosts"]
+
+    return _get_cached(["num_hosts", scope, name], _compute)
+
+
+def get_package_changes(
+    hosts: QuerySet[Host] | None,
+    *,
+    name: str | None = None,
+    host: str | None = None,
+) -> QuerySet[HostPackageChange]:
+    """
+    Gets the package changes of the given hosts, most recent first.
+
+    :param hosts: The hosts to include, or None for all hosts that aren't
+                  archived.
+    :param name: Only include changes of the package with this exact name.
+    :param host: Only include changes of the host with this FQDN.
+    """
+    if hosts is None:
+        changes = HostPackageChange.objects.exclude(host__archived=True)
+    else:
+        changes = HostPackageChange.objects.filter(host__in=hosts)
+    changes = changes.select_related("host")
+
+    if name:
+        changes = changes.filter(name=name)
+
+    if host:
+        changes = changes.filter(host__fqdn=host)
+
+    return changes
@@ -15,6 +15,9 @@ class ArtefactVisualizer:
     artefact: type[T] = None
     title: str | None = None
     template: str = "hosts/scan_visualizer/components/base_component.html"
+    # Large artefacts are loaded after the page, see
+    # hosts.scan_visualizers.lazy_components
+    lazy: bool = False
 
     def __init__(self, artefact_data: T, scan_date: datetime):
         self.artefact_data = artefact_data
@@ -33,6 +36,18 @@ class ArtefactVisualizer:
     def render(self) -> str | None:
         return render_to_string(self.template, context=self.get_context())
 
+    @classmethod
+    def render_for(cls, artefact_data: T, scan_date: datetime) -> str | None:
+        """Renders the visualizer for the given data, or None if it isn't shown"""
+        if not artefact_data:
+            return None
+
+        visualizer = cls(artefact_data, scan_date)
+        if not visualizer.show():
+            return None
+
+        return visualizer.render()
+
 
 class ItemizedArtefactVisualizer(ArtefactVisualizer):
     template = "hosts/scan_visualizer/components/itemized_component.html"
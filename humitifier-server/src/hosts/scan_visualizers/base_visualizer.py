@@ -1,7 +1,15 @@
+from urllib.parse import urlencode
+
 from django.template.loader import render_to_string
+from django.urls import reverse
 
 from hosts.models import Host, ScanData
 from hosts.scan_visualizers.base_components import ArtefactVisualizer
+from hosts.scan_visualizers.fragment_cache import (
+    HIDDEN_FRAGMENT,
+    get_fragments,
+    set_fragments,
+)
 from humitifier_common.artefacts.registry.registry import ArtefactType
 
 
@@ -56,16 +64,61 @@ class ComponentScanVisualizer(ScanVisualizer):
         else:
             return self.scan_data.parsed_data.metrics.get(artefact_name, None)
 
+    def render_component(self, component: type[ArtefactVisualizer]) -> str | None:
+        data = self.get_artefact_data(component.artefact)
+        return component.render_for(data, self.scan_data.scan_date)
+
+    def render_lazy_component(self, component: type[ArtefactVisualizer]) -> str:
+        """
+        Renders a placeholder, which loads the component after the page. See
+        hosts.scan_visualizers.lazy_components
+        """
+        url = reverse(
+            "hosts:component",
+            kwargs={"fqdn": self.host.fqdn, "visualizer": component.__name__},
+        )
+        if "current_scan" in self.provided_context:
+            url += "?" + urlencode({"scan": self.provided_context["current_scan"]})
+
+        return render_to_string(
+            "hosts/scan_visualizer/components/lazy_component.html",
+            context={
+                "title": component.title,
+                "is_metric": component.artefact.__artefact_type__
+                == ArtefactType.METRIC,
+                "alpinejs_settings": {},
+                "url": url,
+            },
+        )
+
     def render_components(
         self, components: list[type[ArtefactVisualizer]]
     ) -> dict[str, str]:
+        scan_date = self.scan_data.scan_date
+        # Scans never change, so components are only rendered once per scan. See
+        # hosts.scan_visualizers.fragment_cache
+        fragments = get_fragments(self.host, scan_date, components) if scan_date else {}
+        rendered = {}
+        # The lazy components with data, if they were left out of the scan data
+        lazy_components = self.provided_context.get("lazy_components")
+
         output = {}
         for component in components:
-            data = self.get_artefact_data(component.artefact)
-            if data:
-                cmp = component(data, self.scan_data.scan_date)
-                if cmp.show():
-                    output[component.title] = cmp.render()
+            fragment = fragments.get(component)
+            if fragment is None and component.lazy and lazy_components is not None:
+                if component in lazy_components:
+                    output[component.title] = self.render_lazy_component(component)
+                continue
+
+            if fragment is None:
+                fragment = self.render_component(component) or HIDDEN_FRAGMENT
+                rendered[component] = fragment
+
+            if fragment != HIDDEN_FRAGMENT:
+                output[component.title] = fragment
+
+        if scan_date:
+            set_fragments(self.host, scan_date, rendered)
 
         return output
 
@@ -0,0 +1,82 @@
+"""
+Cache of rendered scan visualizer components.
+
+Scans never change once saved, so the components rendered for a scan only change
+when the visualizers or their templates do. Rendering large artefacts, like the
+packages or systemd units of a host, takes long, so the rendered fragments are
+cached per scan and visualizer, and the host detail page is assembled from them.
+
+Fragments are keyed by the host, the date of the scan, the visualizer and the
+Humitifier version, as a new version can change the templates. They are stored in
+the cache configured by SCAN_VISUALIZER_CACHE.
+"""
+
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import caches
+
+from hosts.models import Host
+from hosts.scan_visualizers.base_components import ArtefactVisualizer
+
+# Stored for components that are not shown, as a missing fragment can't be told
+# apart from a cache miss
+HIDDEN_FRAGMENT = ""
+
+
+def _get_cache():
+    return caches[settings.SCAN_VISUALIZER_CACHE]
+
+
+def _get_fragment_key(
+    host: Host, scan_date: datetime, visualizer: type[ArtefactVisualizer]
+) -> str:
+    return ":".join(
+        [
+            "hosts:scan_fragment",
+            settings.HUMITIFIER_VERSION,
+            str(host.pk),
+            scan_date.isoformat(),
+            f"{visualizer.__module__}.{visualizer.__qualname__}",
+        ]
+    )
+
+
+def get_fragments(
+    host: Host, scan_date: datetime, visualizers: list[type[ArtefactVisualizer]]
+) -> dict[type[ArtefactVisualizer], str]:
+    """
+    Gets the cached fragments of a scan.
+
+    :param host: The host that was scanned.
+    :param scan_date: The date of the scan.
+    :param visualizers: The visualizers to get the fragments of.
+    :return: The cached fragments by visualizer. Visualizers without a cached
+             fragment are left out; HIDDEN_FRAGMENT means the visualizer isn't
+             shown for this scan.
+    """
+    keys = {
+        _get_fragment_key(host, scan_date, visualizer): visualizer
+        for visualizer in visualizers
+    }
+    fragments = _get_cache().get_many(keys.keys())
+
+    return {keys[key]: fragment for key, fragment in fragments.items()}
+
+
+def set_fragments(
+    host: Host, scan_date: datetime, fragments: dict[type[ArtefactVisualizer], str]
+):
+    """
+    Caches the rendered fragments of a scan, see get_fragments.
+    """
+    if not fragments:
+        return
+
+    _get_cache().set_many(
+        {
+            _get_fragment_key(host, scan_date, visualizer): fragment
+            for visualizer, fragment in fragments.items()
+        },
+        settings.SCAN_VISUALIZER_CACHE_TIMEOUT,
+    )
@@ -0,0 +1,206 @@
+"""
+Lazily loaded components of the host detail page.
+
+Some artefacts, like the installed packages or the systemd units of a host, are
+much larger than the rest of a scan. Visualizers of these artefacts are marked as
+lazy (see ArtefactVisualizer.lazy): the host detail page selects the scan without
+their data, and only shows a placeholder for them. The placeholders load the
+components through HostComponentView, which only selects and validates the data
+of its own artefact.
+"""
+
+from datetime import datetime
+
+from django.contrib.postgres.fields import ArrayField
+from django.db.models import (
+    BooleanField,
+    Case,
+    ExpressionWrapper,
+    F,
+    Func,
+    Q,
+    QuerySet,
+    TextField,
+    Value,
+    When,
+)
+from django.db.models.fields.json import JSONField, KeyTextTransform, KeyTransform
+
+from hosts.json import HostJSONDecoder
+from hosts.models import Host, parse_artefact
+from hosts.scan_visualizers.base_components import ArtefactVisualizer
+from hosts.scan_visualizers.fragment_cache import (
+    HIDDEN_FRAGMENT,
+    get_fragments,
+    set_fragments,
+)
+from humitifier_common.artefacts.registry.registry import ArtefactType
+
+_SECTIONS = {
+    ArtefactType.FACT: "facts",
+    ArtefactType.METRIC: "metrics",
+}
+
+
+def _get_artefact_path(visualizer: type[ArtefactVisualizer]) -> tuple[str, str]:
+    artefact = visualizer.artefact
+    return _SECTIONS[artefact.__artefact_type__], artefact.__artefact_name__
+
+
+def _get_presence_alias(visualizer: type[ArtefactVisualizer]) -> str:
+    return f"_has_{visualizer.__name__}"
+
+
+def _without_keys(field: str, section: str, keys: list[str]):
+    """
+    Selects a scan without the given keys in one of its sections:
+    jsonb_set(scan, '{section}', scan->'section' - keys)
+    """
+    return Func(
+        F(field),
+        Value([section], output_field=ArrayField(TextField())),
+        Func(
+            KeyTransform(section, field),
+            Value(keys, output_field=ArrayField(TextField())),
+            template="(%(expressions)s)",
+            arg_joiner=" - ",
+            output_field=JSONField(),
+        ),
+        function="jsonb_set",
+        output_field=JSONField(decoder=HostJSONDecoder),
+    )
+
+
+def with_scan_summary(
+    queryset: QuerySet, field: str, visualizers: list[type[ArtefactVisualizer]]
+) -> QuerySet:
+    """
+    Annotates the scan in `field` without the data of the lazy visualizers, as
+    _scan_summary, and whether the scan has the artefact of each lazy visualizer.
+    Use get_scan_summary to get these from the results.
+
+    :param queryset: A queryset of hosts or scans.
+    :param field: The field containing the scan, e.g. "last_scan_cache".
+    :param visualizers: The visualizers of the page; only lazy ones are left out.
+    """
+    lazy_visualizers = [visualizer for visualizer in visualizers if visualizer.lazy]
+
+    keys_by_section: dict[str, list[str]] = {}
+    for visualizer in lazy_visualizers:
+        section, key = _get_artefact_path(visualizer)
+        keys_by_section.setdefault(section, []).append(key)
+
+    summary = F(field)
+    for section, keys in keys_by_section.items():
+        # Only objects can have keys removed; other scans are left as is
+        summary = Case(
+            When(
+                **{f"{field}__{section}__has_any_keys": keys},
+                then=_without_keys(field, section, keys),
+            ),
+            default=summary,
+        )
+
+    return queryset.defer(field).annotate(
+        _scan_summary=summary,
+        **{
+            _get_presence_alias(visualizer): ExpressionWrapper(
+                Q(**{f"{field}__{section}__has_key": key}),
+                output_field=BooleanField(),
+            )
+            for visualizer in lazy_visualizers
+            for section, key in [_get_artefact_path(visualizer)]
+        },
+    )
+
+
+def get_scan_summary(
+    obj, visualizers: list[type[ArtefactVisualizer]]
+) -> tuple[dict | None, list[type[ArtefactVisualizer]]]:
+    """
+    Gets the scan selected by with_scan_summary.
+
+    :return: The scan without the data of the lazy visualizers, and the lazy
+             visualizers whose artefact is in the scan.
+    """
+    lazy_visualizers = [
+        visualizer
+        for visualizer in visualizers
+        if visualizer.lazy and getattr(obj, _get_presence_alias(visualizer))
+    ]
+
+    return obj._scan_summary, lazy_visualizers
+
+
+def get_scan_date(queryset: QuerySet, field: str, date_field: str) -> datetime | None:
+    """
+    Selects the date of a scan, without the scan itself.
+
+    :param queryset: A queryset of the host or scan.
+    :param field: The field containing the scan, e.g. "last_scan_cache".
+    :param date_field: The field containing the date of the scan, used when the
+                       scan doesn't contain its date. See ScanData.
+    :return: The date of the scan, or None if there is no such scan.
+    """
+    row = queryset.values_list(KeyTextTransform("scan_date", field), date_field).first()
+    if row is None:
+        return None
+
+    scan_date, created = row
+    if scan_date:
+        # Always prefer the recorded time in the scan, like ScanData
+        return datetime.fromisoformat(scan_date)
+
+    return created
+
+
+def get_artefact_data(
+    queryset: QuerySet, field: str, visualizer: type[ArtefactVisualizer]
+) -> dict | list | None:
+    """
+    Selects only the raw data of a visualizer's artefact from a scan.
+
+    :param queryset: A queryset of the host or scan.
+    :param field: The field containing the scan, e.g. "last_scan_cache".
+    :param visualizer: The visualizer to get the data for.
+    """
+    section, key = _get_artefact_path(visualizer)
+
+    return queryset.values_list(
+        KeyTransform(key, KeyTransform(section, field)), flat=True
+    ).first()
+
+
+def render_lazy_component(
+    host: Host,
+    queryset: QuerySet,
+    field: str,
+    date_field: str,
+    visualizer: type[ArtefactVisualizer],
+) -> str | None:
+    """
+    Renders a lazy component, only selecting and validating the data of its own
+    artefact. The rendered component is cached like the other components, see
+    hosts.scan_visualizers.fragment_cache.
+
+    :param host: The host of the scan.
+    :param queryset: A queryset of the host or scan, see get_scan_date.
+    :param field: The field containing the scan, e.g. "last_scan_cache".
+    :param date_field: The field containing the date of the scan.
+    :param visualizer: The visualizer to render.
+    :return: The rendered component, HIDDEN_FRAGMENT if the component isn't shown,
+             or None if there is no such scan.
+    """
+    scan_date = get_scan_date(queryset, field, date_field)
+    if scan_date is None:
+        return None
+
+    fragment = get_fragments(host, scan_date, [visualizer]).get(visualizer)
+    if fragment is None:
+        data = parse_artefact(
+            visualizer.artefact, get_artefact_data(queryset, field, visualizer)
+        )
+        fragment = visualizer.render_for(data, scan_date) or HIDDEN_FRAGMENT
+        set_fragments(host, scan_date, {visualizer: fragment})
+
+    return fragment
@@ -131,6 +131,7 @@ class HostMetaVHostsVisualizer(SearchableCardsVisualizer):
 class WebserverVisualizer(SearchableCardsVisualizer):
     artefact = Webserver
     title = "Webserver"
+    lazy = True
 
     def show(self):
         if self.artefact_data.hosts:
@@ -292,6 +293,7 @@ class UsersVisualizer(SearchableCardsVisualizer):
     title = "Users"
     artefact = Users
     search_placeholder = "Search groups"
+    lazy = True
 
     def get_items(self) -> list[Card]:
         output = []
@@ -318,6 +320,7 @@ class GroupsVisualizer(SearchableCardsVisualizer):
     title = "Groups"
     artefact = Groups
     search_placeholder = "Search groups"
+    lazy = True
 
     def get_items(self) -> list[Card]:
         output = []
@@ -338,6 +341,7 @@ class PackageListVisualizer(SearchableCardsVisualizer):
     title = "Packages"
     artefact = PackageList
     search_placeholder = "Search packages"
+    lazy = True
 
     def get_items(self) -> list[Card]:
         output = []
@@ -518,6 +522,7 @@ class SELinuxVisualizer(ItemizedArtefactVisualizer):
 class SystemdUnitsVisualizer(SearchableCardsVisualizer):
     artefact = Systemd
     title = "Systemd Units"
+    lazy = True
 
     def get_items(self) -> list[Card]:
         items = []
@@ -4,8 +4,9 @@ This module provides the ability to discover searchable fields from registered
 artefacts and build complex queries to filter hosts based on their scan data.
 """
 
-from .field_discovery import get_searchable_fields
-from .query_builder import search_hosts_by_scan_fields
+from .field_discovery import get_searchable_fields, get_searchable_fields_by_id
+from .plan import QueryPlan, compile_query
+from .query_builder import build_query_condition, search_hosts_by_scan_fields
 from .query_parser import parse_query
 from .types import (
     ComparisonOperator,
@@ -14,18 +15,26 @@ from .types import (
     SearchableField,
 )
 from .value_extraction import (
+    get_scan_field_projections,
     get_scan_field_value_for_object,
     get_scan_field_values,
+    iter_scan_field_values,
 )
 
 __all__ = [
     "ComparisonOperator",
     "ComplexQuery",
+    "QueryPlan",
     "SearchCriterion",
     "SearchableField",
+    "build_query_condition",
+    "compile_query",
+    "get_scan_field_projections",
     "get_scan_field_value_for_object",
     "get_scan_field_values",
     "get_searchable_fields",
+    "get_searchable_fields_by_id",
+    "iter_scan_field_values",
     "search_hosts_by_scan_fields",
     "parse_query",
 ]
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+from functools import cache
 from types import UnionType
 from typing import Any, Iterable, get_args, get_origin
 
@@ -571,6 +572,25 @@ def get_searchable_fields() -> list[SearchableField]:
         - "facts.generic.Hardware.memory[].size" (array)
         - "metrics.DiskUsage.partitions[].mountpoint" (array)
     """
+    return list(get_searchable_fields_by_id().values())
+
+
+@cache
+def get_searchable_fields_by_id() -> dict[str, SearchableField]:
+    """Get the searchable fields, keyed by their id.
+
+    The fields only depend on the Host model and the registered artefacts, which
+    don't change at runtime, so they are discovered once per process. The returned
+    dict is shared; don't modify it.
+    """
+    return {field.id: field for field in _discover_searchable_fields()}
+
+
+def _discover_searchable_fields() -> list[SearchableField]:
+    """Introspect the Host model and the registered artefacts for searchable fields.
+
+    See get_searchable_fields.
+    """
     fields: list[SearchableField] = []
 
     # Add meta fields from Host model
@@ -0,0 +1,95 @@
+"""Keyset pagination for host search results.
+
+Pages continue from the last host of the previous page, using the (fqdn, pk)
+ordering of hosts, instead of from an offset. Pages stay stable when hosts are
+added or removed while paging, and every page costs the same, regardless of its
+position or the size of the fleet.
+
+Cursors are opaque strings encoding the (fqdn, pk) of a host.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class KeysetPage:
+    """A page of host search results.
+
+    pks: the pks of the hosts on this page, in (fqdn, pk) order.
+    next_cursor: cursor to pass as `after` to get the next page, if any.
+    previous_cursor: cursor to pass as `before` to get the previous page, if any.
+    """
+
+    pks: list[int]
+    next_cursor: str | None
+    previous_cursor: str | None
+
+
+def encode_cursor(fqdn: str, pk: int) -> str:
+    """Encode the position of a host as a cursor.
+
+    Example:
+        >>> decode_cursor(encode_cursor("web01.example.com", 1))
+        ("web01.example.com", 1)
+    """
+    return base64.urlsafe_b64encode(json.dumps([fqdn, pk]).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[str, int] | None:
+    """Decode a cursor created by encode_cursor.
+
+    Returns:
+        The (fqdn, pk) of the cursor, or None if the cursor is invalid.
+    """
+    try:
+        fqdn, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, UnicodeError, ValueError, TypeError):
+        return None
+
+    if not isinstance(fqdn, str) or not isinstance(pk, int):
+        return None
+
+    return fqdn, pk
+
+
+def paginate_results(
+    results: list[tuple[str, int]],
+    page_size: int,
+    after: str | None = None,
+    before: str | None = None,
+) -> KeysetPage:
+    """Get a page of search results.
+
+    Args:
+        results: The (fqdn, pk) of the matching hosts, ordered by (fqdn, pk). See
+                 result_cache.get_search_results.
+        page_size: The maximum number of hosts on a page.
+        after: Get the page after this cursor. Takes precedence over `before`.
+        before: Get the page before this cursor.
+
+    Returns:
+        The requested page. Invalid cursors give the first page.
+    """
+    after_key = decode_cursor(after) if after else None
+    before_key = None if after_key else decode_cursor(before or "")
+
+    if before_key:
+        end = bisect_left(results, before_key)
+        start = max(end - page_size, 0)
+    else:
+        start = bisect_right(results, after_key) if after_key else 0
+        end = start + page_size
+
+    rows = results[start:end]
+
+    return KeysetPage(
+        pks=[pk for _, pk in rows],
+        next_cursor=encode_cursor(*rows[-1]) if rows and end < len(results) else None,
+        previous_cursor=encode_cursor(*rows[0]) if rows and start > 0 else None,
+    )
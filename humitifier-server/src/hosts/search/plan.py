@@ -0,0 +1,62 @@
+"""Compiled query plans for host searches.
+
+Compiling a query string means tokenizing and parsing it, validating its fields and
+building the SQL conditions of its criteria. The result only depends on the query
+string, so it is cached per process and shared between requests and users. Access
+filtering is applied separately, by passing the hosts the user may see to
+QueryPlan.apply.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import lru_cache
+
+from django.db.models import Q, QuerySet
+
+from ..models import Host
+from .query_builder import build_query_condition
+from .query_parser import parse_query
+from .types import ComplexQuery
+
+# The number of compiled query strings kept per process
+PLAN_CACHE_SIZE = 256
+
+
+@dataclass(frozen=True)
+class QueryPlan:
+    """A compiled search query.
+
+    query: the parsed query.
+    condition: the condition matching the hosts that satisfy the query.
+    """
+
+    query: ComplexQuery
+    condition: Q
+
+    def apply(self, queryset: QuerySet[Host]) -> QuerySet[Host]:
+        """Filter a Host queryset to the hosts matching the query."""
+        return queryset.filter(self.condition)
+
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def compile_query(query_string: str) -> QueryPlan:
+    """Compile a query string into a reusable query plan.
+
+    Args:
+        query_string: The query to compile, see parse_query for the syntax.
+
+    Returns:
+        The compiled query. Compiling the same string again returns the same plan.
+
+    Raises:
+        ValueError: If the query is invalid, see parse_query and
+                    build_query_condition. Errors are not cached.
+
+    Example:
+        plan = compile_query("facts.generic.HostnameCtl.os contains 'Ubuntu'")
+        hosts = plan.apply(Host.objects.get_for_user(user))
+    """
+    query = parse_query(query_string)
+
+    return QueryPlan(query=query, condition=build_query_condition(query))
@@ -2,13 +2,15 @@
 
 from __future__ import annotations
 
-from typing import Any
+from functools import reduce
+from operator import and_
+from typing import Any, Iterable
 
-from django.db.models import Q, QuerySet
+from django.db.models import BooleanField, Q, QuerySet
 from django.db.models.expressions import RawSQL
 
 from ..models import Host
-from .field_discovery import get_searchable_fields
+from .field_discovery import get_searchable_fields_by_id
 from .types import AggregationFunction, ComplexQuery, ComparisonOperator, SearchableField, SearchCriterion
 
 
@@ -84,94 +86,90 @@ def _build_json_lookup_path(descriptor: SearchableField) -> str:
     return "__".join(json_path_components)
 
 
-def _apply_meta_filter(
-    queryset: QuerySet[Host],
+def _build_meta_condition(
     criterion: SearchCriterion,
     descriptor: SearchableField,
     parsed_value: Any,
-) -> QuerySet[Host]:
+) -> Q:
     """
-    Apply a filter for meta fields (direct Host model fields).
+    Build the condition for meta fields (direct Host model fields).
 
     Args:
-        queryset: The Django QuerySet to filter.
         criterion: The search criterion containing the operator.
         descriptor: The searchable field descriptor for a meta field.
         parsed_value: The value to filter by, already parsed to the correct type.
 
     Returns:
-        Filtered QuerySet.
+        Q object matching the hosts that satisfy the criterion.
     """
     # Meta fields are directly on the Host model
     field_name = descriptor.field_path[0] if descriptor.field_path else None
     if not field_name:
-        return queryset
+        return Q()
 
     is_string_field = descriptor.value_type == "string"
 
     if criterion.operator == "eq":
         lookup_suffix = "__iexact" if is_string_field else ""
-        return queryset.filter(**{f"{field_name}{lookup_suffix}": parsed_value})
+        return Q(**{f"{field_name}{lookup_suffix}": parsed_value})
     elif criterion.operator == "contains":
         if is_string_field:
-            return queryset.filter(**{f"{field_name}__icontains": parsed_value})
+            return Q(**{f"{field_name}__icontains": parsed_value})
         else:
             # Contains doesn't make sense for non-strings, treat as exact match
-            return queryset.filter(**{field_name: parsed_value})
+            return Q(**{field_name: parsed_value})
     elif criterion.operator == "gt":
-        return queryset.filter(**{f"{field_name}__gt": parsed_value})
+        return Q(**{f"{field_name}__gt": parsed_value})
     elif criterion.operator == "gte":
-        return queryset.filter(**{f"{field_name}__gte": parsed_value})
+        return Q(**{f"{field_name}__gte": parsed_value})
     elif criterion.operator == "lt":
-        return queryset.filter(**{f"{field_name}__lt": parsed_value})
+        return Q(**{f"{field_name}__lt": parsed_value})
     elif criterion.operator == "lte":
-        return queryset.filter(**{f"{field_name}__lte": parsed_value})
+        return Q(**{f"{field_name}__lte": parsed_value})
     else:
         # Unknown operator, treat as exact match
-        return queryset.filter(**{field_name: parsed_value})
+        return Q(**{field_name: parsed_value})
 
 
-def _apply_scalar_filter(
-    queryset: QuerySet[Host],
+def _build_scalar_condition(
     criterion: SearchCriterion,
     descriptor: SearchableField,
     parsed_value: Any,
-) -> QuerySet[Host]:
+) -> Q:
     """
-    Apply a filter for scalar (non-array) fields using Django ORM lookups.
+    Build the condition for scalar (non-array) fields using Django ORM lookups.
 
     Args:
-        queryset: The Django QuerySet to filter.
         criterion: The search criterion containing the operator.
         descriptor: The searchable field descriptor.
         parsed_value: The value to filter by, already parsed to the correct type.
 
     Returns:
-        Filtered QuerySet.
+        Q object matching the hosts that satisfy the criterion.
     """
     lookup_path = _build_json_lookup_path(descriptor)
     is_string_field = descriptor.value_type == "string"
 
     if criterion.operator == "eq":
         lookup_suffix = "__iexact" if is_string_field else ""
-        return queryset.filter(**{f"{lookup_path}{lookup_suffix}": parsed_value})
+        return Q(**{f"{lookup_path}{lookup_suffix}": parsed_value})
     elif criterion.operator == "contains":
         if is_string_field:
-            return queryset.filter(**{f"{lookup_path}__icontains": parsed_value})
+            return Q(**{f"{lookup_path}__icontains": parsed_value})
         else:
             # Contains doesn't make sense for non-strings, treat as exact match
-            return queryset.filter(**{lookup_path: parsed_value})
+            return Q(**{lookup_path: parsed_value})
     elif criterion.operator == "gt":
-        return queryset.filter(**{f"{lookup_path}__gt": parsed_value})
+        return Q(**{f"{lookup_path}__gt": parsed_value})
     elif criterion.operator == "gte":
-        return queryset.filter(**{f"{lookup_path}__gte": parsed_value})
+        return Q(**{f"{lookup_path}__gte": parsed_value})
     elif criterion.operator == "lt":
-        return queryset.filter(**{f"{lookup_path}__lt": parsed_value})
+        return Q(**{f"{lookup_path}__lt": parsed_value})
     elif criterion.operator == "lte":
-        return queryset.filter(**{f"{lookup_path}__lte": parsed_value})
+        return Q(**{f"{lookup_path}__lte": parsed_value})
     else:
         # Unknown operator, treat as exact match
-        return queryset.filter(**{lookup_path: parsed_value})
+        return Q(**{lookup_path: parsed_value})
 
 
 def _build_array_expansion_clauses(
@@ -304,8 +302,8 @@ def _build_array_where_clause(
 
     # Add filter pattern clause if provided
     if criterion.filter_pattern:
-        sql_params.append(criterion.filter_pattern)
-        where_clauses.append(f"{text_expression} ~ %s")
+        sql_params.append(str(criterion.filter_pattern))
+        where_clauses.append(f"{text_expression} ~ %s::text")
 
         # If we're using the filter, we'll use text_expression again in the comparison below
         # So we need to add its parameters again
@@ -424,26 +422,40 @@ def _build_aggregation_expression(
         raise ValueError(f"Unknown aggregation function: {aggregation}")
 
 
-def _apply_array_aggregation_filter(
-    queryset: QuerySet[Host],
+def _build_exists_condition(subquery: str, params: list[Any]) -> Q:
+    """
+    Build a condition matching the hosts for which a raw SQL subquery has rows.
+
+    Args:
+        subquery: SQL subquery, which may refer to the "hosts_host" row being matched.
+        params: The parameters of the subquery.
+
+    Returns:
+        Q object that can be combined with other conditions using & and |.
+    """
+    return Q(
+        RawSQL(f"EXISTS ({subquery})", tuple(params), output_field=BooleanField())
+    )
+
+
+def _build_array_aggregation_condition(
     criterion: SearchCriterion,
     descriptor: SearchableField,
     parsed_value: Any,
-) -> QuerySet[Host]:
+) -> Q:
     """
-    Apply a filter for array fields with aggregation functions using raw SQL.
+    Build the condition for array fields with aggregation functions using raw SQL.
 
     This function handles aggregations like min(), max(), sum(), concat(), count()
     on array fields by constructing a subquery with appropriate aggregation.
 
     Args:
-        queryset: The Django QuerySet to filter.
         criterion: The search criterion containing the operator and aggregation.
         descriptor: The searchable field descriptor for an array field.
         parsed_value: The value to filter by, already parsed to the correct type.
 
     Returns:
-        Filtered QuerySet using a RawSQL annotation.
+        Q object using an EXISTS subquery.
     """
     section_name = descriptor.section
     artefact_name = descriptor.artefact_key
@@ -452,7 +464,7 @@ def _apply_array_aggregation_filter(
     aggregation = criterion.aggregation
 
     if not aggregation:
-        raise ValueError("_apply_array_aggregation_filter called without aggregation")
+        raise ValueError("_build_array_aggregation_condition called without aggregation")
 
     # Initialize SQL parameters with section and artefact
     sql_params: list[Any] = [section_name, artefact_name]
@@ -473,9 +485,9 @@ def _apply_array_aggregation_filter(
         # Build text expression for filtering (this adds params to a temp list)
         temp_params: list[Any] = []
         text_expr_for_filter = _build_element_field_expression(element_expr, element_field_path, temp_params)
-        where_clauses.append(f"{text_expr_for_filter} ~ %s")
+        where_clauses.append(f"{text_expr_for_filter} ~ %s::text")
         where_params.extend(temp_params)
-        where_params.append(criterion.filter_pattern)
+        where_params.append(str(criterion.filter_pattern))
 
     # Build the aggregation expression (this also adds params to a temp list)
     agg_params: list[Any] = []
@@ -507,57 +519,35 @@ def _apply_array_aggregation_filter(
     from_sql = " CROSS JOIN LATERAL ".join(from_clauses)
     if where_clauses:
         where_sql = " AND ".join(where_clauses)
-        subquery = f"SELECT 1 FROM {from_sql} WHERE {where_sql} GROUP BY \"hosts_host\".\"id\" HAVING {having_clause} LIMIT 1"
+        subquery = f"SELECT 1 FROM {from_sql} WHERE {where_sql} GROUP BY \"hosts_host\".\"id\" HAVING {having_clause}"
     else:
-        subquery = f"SELECT 1 FROM {from_sql} GROUP BY \"hosts_host\".\"id\" HAVING {having_clause} LIMIT 1"
+        subquery = f"SELECT 1 FROM {from_sql} GROUP BY \"hosts_host\".\"id\" HAVING {having_clause}"
 
-    return queryset.annotate(_match=RawSQL(subquery, final_params)).filter(_match__isnull=False)
+    return _build_exists_condition(subquery, final_params)
 
 
-def _apply_array_filter(
-    queryset: QuerySet[Host],
+def _build_array_element_clause(
     criterion: SearchCriterion,
     descriptor: SearchableField,
     parsed_value: Any,
-) -> QuerySet[Host]:
+    element_expr: str,
+    where_params: list[Any],
+) -> str:
     """
-    Apply a filter for array fields using raw SQL with LATERAL joins.
-
-    This function handles searching within JSON arrays, including nested arrays,
-    by constructing a subquery with appropriate LATERAL joins and WHERE conditions.
-    If the criterion includes an aggregation, it delegates to _apply_array_aggregation_filter.
+    Build the WHERE clause matching a single array element against a criterion.
 
     Args:
-        queryset: The Django QuerySet to filter.
         criterion: The search criterion containing the operator.
         descriptor: The searchable field descriptor for an array field.
         parsed_value: The value to filter by, already parsed to the correct type.
+        element_expr: The SQL expression for the expanded array element.
+        where_params: List to append parameter values to for the SQL query.
 
     Returns:
-        Filtered QuerySet using a RawSQL annotation.
+        SQL WHERE clause string.
     """
-    # Check if this is an aggregation query
-    if criterion.aggregation:
-        return _apply_array_aggregation_filter(queryset, criterion, descriptor, parsed_value)
-
-    section_name = descriptor.section
-    artefact_name = descriptor.artefact_key
-    array_path = descriptor.array_path or ("[]",)
     element_field_path = descriptor.element_field_path or ()
 
-    # Initialize SQL parameters with section and artefact
-    sql_params: list[Any] = [section_name, artefact_name]
-
-    # Build the LATERAL join clauses for array expansion
-    from_clauses, element_expr, _, type_check, type_check_params = _build_array_expansion_clauses(array_path, sql_params)
-
-    # Prepare list to collect WHERE clause params in order
-    where_params: list[Any] = []
-
-    # Add type check params first if needed
-    if type_check:
-        where_params.extend(type_check_params)
-
     # Build expression to access the target field within array elements
     # Pass where_params so text_expr params get added directly
     text_expr = _build_element_field_expression(element_expr, element_field_path, where_params)
@@ -565,7 +555,7 @@ def _apply_array_filter(
     # Build the WHERE clause based on the operator and value type
     # Note: where_clause may use text_expr multiple times (for filter AND for comparison)
     # so we need to track how many times it's used and duplicate the parameters
-    where_clause = _build_array_where_clause(
+    return _build_array_where_clause(
         criterion,
         descriptor,
         text_expr,
@@ -576,6 +566,51 @@ def _apply_array_filter(
         element_field_path,  # Pass this so we can rebuild the expression params if needed
     )
 
+
+def _build_array_elements_condition(
+    element_criteria: list[tuple[SearchCriterion, SearchableField, Any]],
+) -> Q:
+    """
+    Build the condition for one or more criteria on the elements of the same array.
+
+    The array is expanded once, using LATERAL joins, and a host matches if a single
+    element satisfies all the criteria. E.g. a package named "openssl" with a version
+    containing "3.0", rather than any package named "openssl" and any package with
+    such a version.
+
+    Args:
+        element_criteria: Tuples of (criterion, descriptor, parsed value). The
+                          descriptors must share their section, artefact and
+                          array path. See _get_element_group_key.
+
+    Returns:
+        Q object using an EXISTS subquery.
+    """
+    descriptor = element_criteria[0][1]
+    array_path = descriptor.array_path or ("[]",)
+
+    # Initialize SQL parameters with section and artefact
+    sql_params: list[Any] = [descriptor.section, descriptor.artefact_key]
+
+    # Build the LATERAL join clauses for array expansion
+    from_clauses, element_expr, _, type_check, type_check_params = _build_array_expansion_clauses(array_path, sql_params)
+
+    # Prepare list to collect WHERE clause params in order
+    where_params: list[Any] = []
+
+    # Add type check params first if needed
+    if type_check:
+        where_params.extend(type_check_params)
+
+    # Every criterion has to match the same element
+    element_clauses = []
+    for criterion, element_descriptor, parsed_value in element_criteria:
+        element_clause = _build_array_element_clause(
+            criterion, element_descriptor, parsed_value, element_expr, where_params
+        )
+        element_clauses.append(f"({element_clause})")
+    where_clause = " AND ".join(element_clauses)
+
     # Combine params: FROM params, WHERE params (which includes type check + text expr + where clause params)
     final_params = sql_params + where_params
 
@@ -585,29 +620,54 @@ def _apply_array_filter(
 
     # Construct the complete SQL subquery
     from_sql = " CROSS JOIN LATERAL ".join(from_clauses)
-    subquery = f"SELECT 1 FROM {from_sql} WHERE {where_clause} LIMIT 1"
+    subquery = f"SELECT 1 FROM {from_sql} WHERE {where_clause}"
 
-    return queryset.annotate(_match=RawSQL(subquery, final_params)).filter(_match__isnull=False)
+    return _build_exists_condition(subquery, final_params)
 
 
-def _apply_criterion_to_queryset(
-    queryset: QuerySet[Host],
+def _build_array_condition(
+    criterion: SearchCriterion,
+    descriptor: SearchableField,
+    parsed_value: Any,
+) -> Q:
+    """
+    Build the condition for array fields using raw SQL with LATERAL joins.
+
+    This function handles searching within JSON arrays, including nested arrays,
+    by constructing a subquery with appropriate LATERAL joins and WHERE conditions.
+    If the criterion includes an aggregation, it delegates to _build_array_aggregation_condition.
+
+    Args:
+        criterion: The search criterion containing the operator.
+        descriptor: The searchable field descriptor for an array field.
+        parsed_value: The value to filter by, already parsed to the correct type.
+
+    Returns:
+        Q object using an EXISTS subquery.
+    """
+    # Check if this is an aggregation query
+    if criterion.aggregation:
+        return _build_array_aggregation_condition(criterion, descriptor, parsed_value)
+
+    return _build_array_elements_condition([(criterion, descriptor, parsed_value)])
+
+
+def _build_criterion_condition(
     criterion: SearchCriterion,
     descriptor: SearchableField,
-) -> QuerySet[Host]:
+) -> Q:
     """
-    Apply a single search criterion to a QuerySet, supporting meta fields, scalar, and array fields.
+    Build the condition for a single search criterion, supporting meta fields, scalar, and array fields.
 
-    This function routes to the appropriate filter implementation based on whether
+    This function routes to the appropriate implementation based on whether
     the field is a meta field (direct Host model field), a scalar JSON field, or an array field.
 
     Args:
-        queryset: The Django QuerySet to filter.
         criterion: The search criterion containing field_id, operator, and value.
         descriptor: The searchable field descriptor containing field metadata.
 
     Returns:
-        Filtered QuerySet with the criterion applied.
+        Q object matching the hosts that satisfy the criterion.
     """
     # Validate aggregation usage
     if criterion.aggregation and descriptor.kind != "array":
@@ -620,12 +680,12 @@ def _apply_criterion_to_queryset(
 
     # Handle meta fields (direct Host model fields)
     if descriptor.section == "meta":
-        return _apply_meta_filter(queryset, criterion, descriptor, parsed_value)
+        return _build_meta_condition(criterion, descriptor, parsed_value)
     # Handle scan cache fields
     elif descriptor.kind == "scalar":
-        return _apply_scalar_filter(queryset, criterion, descriptor, parsed_value)
+        return _build_scalar_condition(criterion, descriptor, parsed_value)
     else:
-        return _apply_array_filter(queryset, criterion, descriptor, parsed_value)
+        return _build_array_condition(criterion, descriptor, parsed_value)
 
 
 def _combine_q_objects_with_or(q_objects: list[Q]) -> Q:
@@ -647,105 +707,153 @@ def _combine_q_objects_with_or(q_objects: list[Q]) -> Q:
     return combined_q
 
 
-def _apply_or_query(
-    queryset: QuerySet[Host],
+def _build_or_condition(
     query: ComplexQuery,
     fields_by_id: dict[str, SearchableField],
-) -> QuerySet[Host]:
+) -> Q:
     """
-    Apply an OR query by evaluating each child query and combining results.
-
-    This function evaluates each child query independently to get matching host IDs,
-    then combines them using OR logic (union of results).
+    Build the condition for an OR query, matching hosts that match any child query.
 
     Args:
-        queryset: The Django QuerySet to filter.
         query: The ComplexQuery object with type="or".
         fields_by_id: Mapping of field IDs to their descriptors.
 
     Returns:
-        Filtered QuerySet containing hosts that match any of the child queries.
+        Q object combining the conditions of the child queries.
     """
     if not query.children:
-        return queryset
+        return Q()
 
-    q_objects = []
-    for child_query in query.children:
-        # Evaluate each child query independently to get matching IDs
-        child_queryset = _apply_complex_query_to_queryset(
-            Host.objects.all(), child_query, fields_by_id
-        )
-        matching_ids = list(child_queryset.values_list('id', flat=True))
-        if matching_ids:
-            q_objects.append(Q(id__in=matching_ids))
+    q_objects = [
+        _build_query_condition(child_query, fields_by_id)
+        for child_query in query.children
+    ]
 
-    if q_objects:
-        combined_q = _combine_q_objects_with_or(q_objects)
-        return queryset.filter(combined_q)
+    # An empty condition matches all hosts, and so does the whole OR
+    if not all(q_objects):
+        return Q()
 
-    return queryset.none()
+    return _combine_q_objects_with_or(q_objects)
 
 
-def _apply_and_query(
-    queryset: QuerySet[Host],
+def _get_element_group_key(
     query: ComplexQuery,
     fields_by_id: dict[str, SearchableField],
-) -> QuerySet[Host]:
+) -> tuple[str, str, tuple[str, ...]] | None:
     """
-    Apply an AND query by evaluating each child query sequentially.
+    Get the array a query matches elements of, if it can be merged with other criteria.
+
+    Args:
+        query: A child query of an AND query.
+        fields_by_id: Mapping of field IDs to their descriptors.
+
+    Returns:
+        The (section, artefact key, array path) of the array for criteria on array
+        elements without aggregation, or None for all other queries.
+    """
+    if query.type != "criterion" or query.criterion is None:
+        return None
+
+    if query.criterion.aggregation:
+        return None
+
+    descriptor = fields_by_id.get(query.criterion.field_id)
+    if descriptor is None or descriptor.section == "meta" or descriptor.kind != "array":
+        return None
 
-    Each child query filters the queryset further, ensuring all conditions are met.
+    return descriptor.section, descriptor.artefact_key, descriptor.array_path or ("[]",)
+
+
+def _iter_and_children(query: ComplexQuery) -> Iterable[ComplexQuery]:
+    """Yield the children of an AND query, including those of nested AND queries."""
+    for child_query in query.children or []:
+        if child_query.type == "and":
+            yield from _iter_and_children(child_query)
+        else:
+            yield child_query
+
+
+def _build_and_condition(
+    query: ComplexQuery,
+    fields_by_id: dict[str, SearchableField],
+) -> Q:
+    """
+    Build the condition for an AND query, matching hosts that match all child queries.
+
+    Criteria on the elements of the same array are merged into a single condition,
+    which requires one element to match all of them. See _build_array_elements_condition.
 
     Args:
-        queryset: The Django QuerySet to filter.
         query: The ComplexQuery object with type="and".
         fields_by_id: Mapping of field IDs to their descriptors.
 
     Returns:
-        Filtered QuerySet containing hosts that match all child queries.
-    """
-    if not query.children:
-        return queryset
+        Q object combining the conditions of the child queries.
+    """
+    # Either conditions, or the key of a group of array element criteria
+    parts: list[Q | tuple[str, str, tuple[str, ...]]] = []
+    element_groups: dict[tuple[str, str, tuple[str, ...]], list] = {}
+
+    for child_query in _iter_and_children(query):
+        group_key = _get_element_group_key(child_query, fields_by_id)
+        if group_key is None:
+            parts.append(_build_query_condition(child_query, fields_by_id))
+            continue
+
+        if group_key not in element_groups:
+            element_groups[group_key] = []
+            parts.append(group_key)
+
+        descriptor = fields_by_id[child_query.criterion.field_id]
+        element_groups[group_key].append(
+            (
+                child_query.criterion,
+                descriptor,
+                _parse_value(child_query.criterion.value, descriptor.value_type),
+            )
+        )
 
-    for child_query in query.children:
-        queryset = _apply_complex_query_to_queryset(queryset, child_query, fields_by_id)
+    if not parts:
+        return Q()
 
-    return queryset
+    conditions = [
+        part if isinstance(part, Q) else _build_array_elements_condition(element_groups[part])
+        for part in parts
+    ]
 
+    return reduce(and_, conditions)
 
-def _apply_criterion_query(
-    queryset: QuerySet[Host],
+
+def _build_criterion_query_condition(
     query: ComplexQuery,
     fields_by_id: dict[str, SearchableField],
-) -> QuerySet[Host]:
+) -> Q:
     """
-    Apply a criterion query (leaf node in the query tree).
+    Build the condition for a criterion query (leaf node in the query tree).
 
     Args:
-        queryset: The Django QuerySet to filter.
         query: The ComplexQuery object with type="criterion".
         fields_by_id: Mapping of field IDs to their descriptors.
 
     Returns:
-        Filtered QuerySet with the criterion applied, or the original queryset if invalid.
+        Q object for the criterion, or an empty Q object (matching all hosts) if invalid.
     """
     if query.criterion is None:
-        return queryset
+        return Q()
 
     field_descriptor = fields_by_id.get(query.criterion.field_id)
     if field_descriptor is None:
-        return queryset
+        return Q()
 
-    return _apply_criterion_to_queryset(queryset, query.criterion, field_descriptor)
+    return _build_criterion_condition(query.criterion, field_descriptor)
 
 
-def _apply_complex_query_to_queryset(
-    queryset: QuerySet[Host],
+def _build_query_condition(
     query: ComplexQuery,
     fields_by_id: dict[str, SearchableField],
-) -> QuerySet[Host]:
+) -> Q:
     """
-    Recursively apply a complex query structure to a QuerySet.
+    Recursively build the condition for a complex query structure.
 
     This function handles the three types of query nodes:
     - "criterion": A single search condition (leaf node)
@@ -753,21 +861,39 @@ def _apply_complex_query_to_queryset(
     - "or": Logical OR of multiple child queries
 
     Args:
-        queryset: The Django QuerySet to filter.
         query: The ComplexQuery object representing the query structure.
         fields_by_id: Mapping of field IDs to their searchable field descriptors.
 
     Returns:
-        Filtered QuerySet matching the complex query criteria.
+        Q object matching the hosts that satisfy the query.
     """
     if query.type == "criterion":
-        return _apply_criterion_query(queryset, query, fields_by_id)
+        return _build_criterion_query_condition(query, fields_by_id)
     elif query.type == "and":
-        return _apply_and_query(queryset, query, fields_by_id)
+        return _build_and_condition(query, fields_by_id)
     elif query.type == "or":
-        return _apply_or_query(queryset, query, fields_by_id)
+        return _build_or_condition(query, fields_by_id)
     else:
-        return queryset
+        return Q()
+
+
+def build_query_condition(criteria: ComplexQuery) -> Q:
+    """
+    Build a single Q object for a query, which can be used to filter any Host queryset.
+
+    The condition only depends on the query, so it can be reused across requests
+    and users. See plan.compile_query.
+
+    Args:
+        criteria: The search criteria as a ComplexQuery object.
+
+    Returns:
+        Q object matching the hosts that satisfy the query.
+
+    Raises:
+        ValueError: If the query uses an aggregation that is not supported for its field.
+    """
+    return _build_query_condition(criteria, get_searchable_fields_by_id())
 
 
 def search_hosts_by_scan_fields(
@@ -798,7 +924,4 @@ def search_hosts_by_scan_fields(
     if criteria is None:
         return queryset
 
-    # Build a mapping from field ID to descriptor for efficient lookup
-    fields_by_id = {field.id: field for field in get_searchable_fields()}
-
-    return _apply_complex_query_to_queryset(queryset, criteria, fields_by_id)
+    return queryset.filter(build_query_condition(criteria))
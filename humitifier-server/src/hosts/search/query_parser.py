@@ -2,9 +2,9 @@
 
 from __future__ import annotations
 
-from typing import Any
+from typing import AbstractSet, Any
 
-from .field_discovery import get_searchable_fields
+from .field_discovery import get_searchable_fields_by_id
 from .types import AggregationFunction, ComplexQuery, ComparisonOperator, SearchCriterion
 
 
@@ -21,6 +21,7 @@ def parse_query(query_string: str) -> ComplexQuery:
     - Unquoted values for numbers and booleans: 42, true, false
     - Aggregations for array fields: min(field[]), max(field[]), sum(field[]), concat(field[]), count(field[])
     - Filters for array fields: filter(field[], "pattern")
+    - Criteria on the same array combined with AND must match the same element
 
     Examples:
         - 'facts.cpu.count = 4'
@@ -31,6 +32,7 @@ def parse_query(query_string: str) -> ComplexQuery:
         - 'max(facts.memory[].size) >= 8192'
         - 'filter(facts.packages[].name, "^lib") contains "ssl"'
         - 'count(filter(facts.services[].name, "ssh")) > 0'
+        - 'facts.packages[].name = "openssl" AND facts.packages[].version contains "3."'
 
     Args:
         query_string: The query string to parse.
@@ -42,7 +44,7 @@ def parse_query(query_string: str) -> ComplexQuery:
         ValueError: If the query string is invalid, cannot be parsed, or contains invalid field IDs.
     """
     # Get allowed field IDs
-    allowed_fields = {field.id for field in get_searchable_fields()}
+    allowed_fields = get_searchable_fields_by_id().keys()
 
     tokens = _tokenize(query_string)
     parser = _QueryParser(tokens, allowed_fields)
@@ -133,7 +135,7 @@ class _QueryParser:
         operator := "=" | ">" | ">=" | "<" | "<=" | "contains"
     """
 
-    def __init__(self, tokens: list[str], allowed_fields: set[str]) -> None:
+    def __init__(self, tokens: list[str], allowed_fields: AbstractSet[str]) -> None:
         self.tokens = tokens
         self.pos = 0
         self.allowed_fields = allowed_fields
@@ -238,9 +240,8 @@ class _QueryParser:
                     raise ValueError("Expected ',' after field in filter")
                 self._consume_token()  # Consume ','
 
-                # Parse pattern (must be a string)
-                pattern_token = self._consume_token()
-                filter_pattern = self._parse_literal_value(pattern_token)
+                # Parse pattern (always a string, even if it looks like a number)
+                filter_pattern = self._consume_token()
 
                 # Expect closing parenthesis for filter
                 if self._current_token() != ')':
@@ -280,9 +281,8 @@ class _QueryParser:
                 raise ValueError("Expected ',' after field in filter")
             self._consume_token()  # Consume ','
 
-            # Parse pattern (must be a string)
-            pattern_token = self._consume_token()
-            filter_pattern = self._parse_literal_value(pattern_token)
+            # Parse pattern (always a string, even if it looks like a number)
+            filter_pattern = self._consume_token()
 
             # Expect closing parenthesis
             if self._current_token() != ')':
@@ -0,0 +1,252 @@
+"""Result cache for advanced searches.
+
+Running a search over the scan data of the whole fleet is expensive, while the
+results rarely change: most facts stay the same between scans. Search results
+are therefore cached, keyed by the normalized query, the hosts the user has
+access to, and the versions of the data the query depends on:
+
+- The host version, bumped whenever a host is changed outside of scanning. Every
+  search depends on it, as it covers access and archiving.
+- A version per artefact, bumped when a scan changes the artefact for any host.
+  A search only depends on the artefacts it queries.
+
+So a search on e.g. the installed packages is only recomputed after a scan
+changed the packages of some host, not after every scan.
+
+Versions are random tokens in the cache; bumping one replaces the token. This only
+reaches other processes if a shared cache is configured. Scans are processed by the
+Celery workers, so without a shared cache the web processes would keep showing
+outdated results. The result cache is therefore disabled by default without a
+shared cache, see SEARCH_RESULT_CACHE_TIMEOUT.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import uuid
+
+import sentry_sdk
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import QuerySet
+
+from api.models import OAuth2Application
+from humitifier_server.logger import logger
+from main.models import User
+
+from ..models import Host
+from .field_discovery import get_searchable_fields_by_id
+from .plan import QueryPlan
+from .types import ComplexQuery
+
+HOST_VERSION = "hosts"
+
+# Host fields that are only changed by scanning. Saving just these fields does not
+# change search results, or does so through an artefact version.
+SCAN_STATE_FIELDS = frozenset(
+    {
+        "last_scan_cache",
+        "last_scan_date",
+        "last_scan_scheduled",
+        "consecutive_scan_failures",
+        "scan_backoff_until",
+        "scan_statistics",
+        "next_scan_at",
+        "scan_lease_token",
+        "scan_lease_until",
+    }
+)
+
+# Meta fields generated from scan data, see Host
+_GENERATED_META_FIELDS = {
+    "os": "facts:generic.HostnameCtl",
+    "hypervisor": "facts:generic.HostnameCtl",
+}
+
+
+def _get_version_key(name: str) -> str:
+    return f"hosts:search_version:{name}"
+
+
+def get_data_versions(names: list[str]) -> list[str]:
+    """Get the current version tokens of the given data, creating missing ones."""
+    keys = [_get_version_key(name) for name in names]
+    versions = cache.get_many(keys)
+
+    for key in keys:
+        if key not in versions:
+            versions[key] = cache.get_or_set(key, lambda: uuid.uuid4().hex, None)
+
+    return [versions[key] for key in keys]
+
+
+def bump_data_versions(names: list[str]):
+    """Invalidate all cached results that depend on the given data.
+
+    This is done both right away and after the current transaction commits, as a
+    search run in between would be cached with the old data.
+    """
+
+    def _bump():
+        cache.set_many(
+            {_get_version_key(name): uuid.uuid4().hex for name in names}, None
+        )
+
+    if names:
+        _bump()
+        transaction.on_commit(_bump)
+
+
+def get_changed_artefacts(previous_scan: dict | None, scan: dict) -> list[str]:
+    """Get the artefacts whose data differs between two scans.
+
+    Returns:
+        The version names of the changed artefacts, e.g. "facts:generic.Users".
+    """
+    previous_scan = previous_scan or {}
+    changed = []
+
+    for section in ["facts", "metrics"]:
+        previous_data = previous_scan.get(section) or {}
+        data = scan.get(section) or {}
+
+        for artefact_key in previous_data.keys() | data.keys():
+            if previous_data.get(artefact_key) != data.get(artefact_key):
+                changed.append(f"{section}:{artefact_key}")
+
+    return sorted(changed)
+
+
+def _get_dependencies(query: ComplexQuery | None) -> list[str]:
+    """Get the names of the data versions a query depends on."""
+    dependencies = {HOST_VERSION}
+    fields_by_id = get_searchable_fields_by_id()
+
+    def _collect(node: ComplexQuery):
+        if node.criterion is not None:
+            field = fields_by_id.get(node.criterion.field_id)
+            if field is None:
+                return
+            if field.section == "meta":
+                field_name = field.field_path[0] if field.field_path else None
+                if field_name in _GENERATED_META_FIELDS:
+                    dependencies.add(_GENERATED_META_FIELDS[field_name])
+            else:
+                dependencies.add(f"{field.section}:{field.artefact_key}")
+
+        for child in node.children or []:
+            _collect(child)
+
+    if query is not None:
+        _collect(query)
+
+    return sorted(dependencies)
+
+
+def normalize_query(query: ComplexQuery | None) -> str:
+    """Get a canonical representation of a query.
+
+    Nested groups of the same type are flattened, and the children of a group are
+    sorted, so equivalent queries written differently share a cache entry.
+
+    Example:
+        "a = 1 AND {c = 3 AND b = 2}" and "b = 2 AND a = 1 AND c = 3" have the same
+        normalized form.
+    """
+    if query is None:
+        return ""
+
+    if query.type == "criterion":
+        return repr(query.criterion)
+
+    def _flatten(node: ComplexQuery):
+        for child in node.children or []:
+            if child.type == query.type:
+                yield from _flatten(child)
+            else:
+                yield child
+
+    children = list(_flatten(query))
+    if len(children) == 1:
+        return normalize_query(children[0])
+
+    normalized_children = sorted(normalize_query(child) for child in children)
+
+    return f"{query.type}({', '.join(normalized_children)})"
+
+
+def get_access_scope(user: User) -> str:
+    """Get a string identifying the hosts a user has access to."""
+    if user.is_anonymous:
+        return "none"
+
+    if user.is_superuser:
+        return "all"
+
+    return "customers:" + ",".join(sorted(user.customers_for_filter))
+
+
+def get_application_access_scope(application: OAuth2Application) -> str:
+    """Get a string identifying the hosts an API application has access to."""
+    if application.access_profile is None:
+        return "none"
+
+    customers = application.access_profile.customers_for_filter
+    return "customers:" + ",".join(sorted(customers))
+
+
+def get_search_results(
+    hosts: QuerySet[Host],
+    plan: QueryPlan | None,
+    *,
+    scope: str,
+) -> list[tuple[str, int]]:
+    """Get the hosts matching a query, from the cache if possible.
+
+    Args:
+        hosts: QuerySet of the hosts to search in.
+        plan: The compiled query to search for, or None for all hosts. See
+              plan.compile_query.
+        scope: A string identifying the hosts queryset, e.g. the access scope of
+               the user (see get_access_scope). Searches on the same query and
+               scope share cached results.
+
+    Returns:
+        The (fqdn, pk) of the matching hosts, ordered by (fqdn, pk).
+    """
+    query = plan.query if plan else None
+
+    if not settings.SEARCH_RESULT_CACHE_TIMEOUT:
+        return _run_search(hosts, plan)
+
+    dependencies = _get_dependencies(query)
+    versions = get_data_versions(dependencies)
+
+    key = hashlib.sha256(
+        "|".join([normalize_query(query), scope, *versions]).encode()
+    ).hexdigest()
+    key = f"hosts:search_results:{key}"
+
+    results = cache.get(key)
+    hit = results is not None
+
+    logger.debug(f"Search result cache {'hit' if hit else 'miss'} for {key}")
+    span = sentry_sdk.get_current_span()
+    if span:
+        span.set_data("hosts.search_result_cache.hit", hit)
+
+    if not hit:
+        results = _run_search(hosts, plan)
+        cache.set(key, results, settings.SEARCH_RESULT_CACHE_TIMEOUT)
+
+    return results
+
+
+def _run_search(hosts: QuerySet[Host], plan: QueryPlan | None) -> list[tuple[str, int]]:
+    if plan:
+        hosts = plan.apply(hosts)
+
+    # Sorted in Python, as the collation of the database may order the hostnames
+    # differently, which would break pagination
+    return sorted(hosts.order_by().values_list("fqdn", "pk"))
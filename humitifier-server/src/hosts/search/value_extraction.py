@@ -6,6 +6,8 @@ fields (lists of values), with flexible path navigation through nested data stru
 
 Main public functions:
     - get_scan_field_values: Extract multiple fields from multiple hosts (batch operation)
+    - iter_scan_field_values: Like get_scan_field_values, but streams plain values
+      from the database without loading Host objects
     - get_scan_field_value_for_object: Extract a single field from one host (convenience)
 
 The extraction process uses SearchableField descriptors that define:
@@ -31,12 +33,14 @@ Example cache structure:
 
 from __future__ import annotations
 
-from typing import Any, Iterable
+from typing import Any, Iterable, Iterator
 
-from django.db.models import QuerySet
+from django.db.models import Expression, Func, IntegerField, JSONField, QuerySet, Value
+from django.db.models.fields.json import KeyTransform
 
+from ..json import HostJSONDecoder
 from ..models import Host
-from .field_discovery import get_searchable_fields
+from .field_discovery import get_searchable_fields_by_id
 from .types import SearchableField
 
 
@@ -278,7 +282,7 @@ def _build_field_descriptor_map(
         Dictionary mapping each valid field ID to its descriptor.
         Invalid field IDs are silently omitted.
     """
-    all_searchable_fields = {field.id: field for field in get_searchable_fields()}
+    all_searchable_fields = get_searchable_fields_by_id()
     return {
         field_id: all_searchable_fields[field_id]
         for field_id in field_ids
@@ -325,20 +329,205 @@ def _extract_field_values_for_host(
     return host_data
 
 
+class JSONBPathQueryArray(Func):
+    """Selects all items matched by a SQL/JSON path as a JSON array.
+
+    Usage: JSONBPathQueryArray(json_expression, Value("$.items[*].name"))
+    """
+
+    function = "jsonb_path_query_array"
+    template = "%(function)s(%(expressions)s::jsonpath)"
+    output_field = JSONField(decoder=HostJSONDecoder)
+
+
+def _quote_json_path_key(key: str) -> str:
+    """Quote a key for use in a SQL/JSON path.
+
+    Example:
+        _quote_json_path_key('my "key"') -> '."my \\"key\\""'
+    """
+    escaped_key = key.replace("\\", "\\\\").replace('"', '\\"')
+    return f'."{escaped_key}"'
+
+
+def _build_array_json_path(
+    array_path: tuple[str, ...] | None,
+    element_field_path: tuple[str, ...] | None,
+) -> str:
+    """Build the SQL/JSON path that selects the values of an array field.
+
+    Args:
+        array_path: Path describing how to navigate to array elements.
+                   None defaults to ("[]",) for top-level array expansion.
+        element_field_path: Path to extract from each element.
+
+    Returns:
+        A SQL/JSON path, relative to the artefact data. Null values are skipped.
+
+    Example:
+        _build_array_json_path(("memory", "[]"), ("size",))
+            -> '$."memory"[*]."size" ? (@.type() != "null")'
+    """
+    json_path = "$"
+
+    for token in (array_path or ("[]",)) + (element_field_path or ()):
+        json_path += "[*]" if token == "[]" else _quote_json_path_key(token)
+
+    # type() is used, as comparing objects or arrays to null is never true
+    return json_path + ' ? (@.type() != "null")'
+
+
+def _build_field_projection(
+    descriptor: SearchableField, array_counts: bool = False
+) -> Expression:
+    """Build an expression that selects the value of a field in the database.
+
+    Scalar fields select their JSON path with key transforms (-> and #>). Array
+    fields collect the values of all elements with jsonb_path_query_array, in lax
+    mode, so missing keys are skipped.
+
+    Note: This should only be called for facts/metrics sections, not meta.
+
+    Args:
+        descriptor: Field descriptor of a facts/metrics field.
+        array_counts: Select the number of values of array fields, instead of
+                      the values themselves.
+
+    Returns:
+        An expression selecting the JSON value of the field, or NULL if the
+        artefact does not exist.
+    """
+    expression = KeyTransform(
+        descriptor.artefact_key, KeyTransform(descriptor.section, "last_scan_cache")
+    )
+
+    if descriptor.kind == "scalar":
+        for key in descriptor.field_path:
+            expression = KeyTransform(key, expression)
+
+        return expression
+
+    expression = JSONBPathQueryArray(
+        expression,
+        Value(
+            _build_array_json_path(descriptor.array_path, descriptor.element_field_path)
+        ),
+    )
+
+    if array_counts:
+        return Func(
+            expression, function="jsonb_array_length", output_field=IntegerField()
+        )
+
+    return expression
+
+
+def _build_field_projections(
+    field_descriptors: dict[str, SearchableField],
+    array_counts: bool = False,
+) -> tuple[dict[str, str], dict[str, Expression]]:
+    """Build the projections needed to select the given fields in the database.
+
+    Fields that select the same data share a projection.
+
+    Args:
+        field_descriptors: Mapping of field IDs to their descriptors.
+        array_counts: See _build_field_projection.
+
+    Returns:
+        Tuple of (aliases, projections):
+        - aliases: Mapping of each facts/metrics field ID to its projection alias.
+        - projections: Mapping of projection aliases to their expressions.
+    """
+    aliases: dict[str, str] = {}
+    projections: dict[str, Expression] = {}
+
+    for field_id, field_descriptor in field_descriptors.items():
+        if field_descriptor.section == "meta":
+            continue
+
+        expression = _build_field_projection(field_descriptor, array_counts)
+        for alias, existing_expression in projections.items():
+            if existing_expression == expression:
+                break
+        else:
+            alias = f"_scan_value_{len(projections)}"
+            projections[alias] = expression
+
+        aliases[field_id] = alias
+
+    return aliases, projections
+
+
+def _get_projected_value(
+    value: Any, descriptor: SearchableField, array_counts: bool = False
+) -> Any:
+    """Convert a value selected by _build_field_projection to an extracted value.
+
+    Returns:
+        - For scalar fields: the value itself
+        - For array fields: list of values (non-None only, never None), or the
+          number of values if array_counts is set
+    """
+    if descriptor.kind == "scalar":
+        return value
+
+    if array_counts:
+        return value or 0
+
+    if not isinstance(value, list):
+        return []
+
+    return [item for item in value if item is not None]
+
+
+def _get_meta_field_name(descriptor: SearchableField) -> str | None:
+    return descriptor.field_path[0] if descriptor.field_path else None
+
+
+def get_scan_field_projections(
+    field_ids: Iterable[str],
+    *,
+    array_counts: bool = False,
+) -> dict[str, Expression]:
+    """Get the database expressions get_scan_field_values selects for a QuerySet.
+
+    Fields that select the same data share an expression, and meta fields are
+    selected as regular columns, so they are left out.
+
+    Args:
+        field_ids: Collection of field identifiers to select.
+        array_counts: See get_scan_field_values.
+
+    Returns:
+        Dictionary mapping the alias of each expression to the expression, which
+        can be used to annotate a QuerySet of hosts.
+    """
+    field_descriptors = _build_field_descriptor_map(field_ids)
+    _, projections = _build_field_projections(field_descriptors, array_counts)
+
+    return projections
+
+
 def get_scan_field_values(
     hosts: Iterable[Host] | QuerySet[Host],
     field_ids: Iterable[str],
+    *,
+    array_counts: bool = False,
 ) -> list[dict[str, Any]]:
     """Collect field values for multiple host objects from their scan caches.
 
-    This function efficiently extracts multiple field values from each host's
-    last_scan_cache data. Field descriptors are looked up once and reused for
-    all hosts.
+    For a QuerySet, the values are selected by the database: only the requested
+    JSON paths are returned, and last_scan_cache itself is deferred. For other
+    collections, the values are extracted from each host's last_scan_cache.
+    Field descriptors are looked up once and reused for all hosts.
 
     Args:
         hosts: Collection of Host objects to extract field values from.
         field_ids: Collection of field identifiers to extract (e.g.,
                   "facts.generic.HostnameCtl.os" or "facts.generic.PackageList[]->name").
+        array_counts: Only get the number of values of array fields, which can be
+                      much smaller than the values. QuerySets only.
 
     Returns:
         List of dictionaries, one per host. Each dictionary contains:
@@ -362,14 +551,89 @@ def get_scan_field_values(
     """
     field_descriptors = _build_field_descriptor_map(field_ids)
 
+    if not isinstance(hosts, QuerySet):
+        return [
+            _extract_field_values_for_host(host, field_descriptors) for host in hosts
+        ]
+
+    aliases, projections = _build_field_projections(field_descriptors, array_counts)
+    hosts = hosts.defer("last_scan_cache").annotate(**projections)
+
     results: list[dict[str, Any]] = []
     for host in hosts:
-        host_field_data = _extract_field_values_for_host(host, field_descriptors)
-        results.append(host_field_data)
+        fields: dict[str, Any] = {}
+
+        for field_id, field_descriptor in field_descriptors.items():
+            if field_descriptor.section == "meta":
+                field_name = _get_meta_field_name(field_descriptor)
+                fields[field_id] = getattr(host, field_name) if field_name else None
+            else:
+                fields[field_id] = _get_projected_value(
+                    getattr(host, aliases[field_id]), field_descriptor, array_counts
+                )
+
+        results.append({"object": host, "fields": fields})
 
     return results
 
 
+def iter_scan_field_values(
+    hosts: QuerySet[Host],
+    field_ids: Iterable[str],
+    *,
+    chunk_size: int = 500,
+) -> Iterator[dict[str, Any]]:
+    """Stream field values for the hosts in a queryset.
+
+    Unlike get_scan_field_values, this does not load Host objects at all. The
+    database only returns the requested values, in chunks, so memory use does not
+    grow with the number of hosts.
+
+    Args:
+        hosts: QuerySet of the hosts to extract field values from.
+        field_ids: Collection of field identifiers to extract.
+        chunk_size: The number of hosts to fetch from the database at once.
+
+    Yields:
+        One dictionary per host, with the same field values as
+        get_scan_field_values. As there are no Host objects, the dictionary
+        contains the FQDN of the host instead:
+        {"fqdn": "server01.example.com", "fields": {field_id: value, ...}}
+
+    Example:
+        >>> for row in iter_scan_field_values(hosts, ["facts.generic.HostnameCtl.os"]):
+        ...     print(row["fqdn"], row["fields"]["facts.generic.HostnameCtl.os"])
+    """
+    field_descriptors = _build_field_descriptor_map(field_ids)
+    aliases, projections = _build_field_projections(field_descriptors)
+
+    meta_fields = {
+        _get_meta_field_name(field_descriptor)
+        for field_descriptor in field_descriptors.values()
+        if field_descriptor.section == "meta"
+    }
+    meta_fields.discard(None)
+    meta_fields.discard("fqdn")
+
+    rows = hosts.values("fqdn", *sorted(meta_fields), **projections).iterator(
+        chunk_size=chunk_size
+    )
+
+    for row in rows:
+        fields: dict[str, Any] = {}
+
+        for field_id, field_descriptor in field_descriptors.items():
+            if field_descriptor.section == "meta":
+                field_name = _get_meta_field_name(field_descriptor)
+                fields[field_id] = row[field_name] if field_name else None
+            else:
+                fields[field_id] = _get_projected_value(
+                    row[aliases[field_id]], field_descriptor
+                )
+
+        yield {"fqdn": row["fqdn"], "fields": fields}
+
+
 def get_scan_field_value_for_object(
     host: Host, field_id: str
 ) -> Any:
@@ -396,7 +660,7 @@ def get_scan_field_value_for_object(
         "server01.example.com"
     """
     # Look up field descriptor
-    field_map = {field.id: field for field in get_searchable_fields()}
+    field_map = get_searchable_fields_by_id()
     field_descriptor = field_map.get(field_id)
 
     if field_descriptor is None:
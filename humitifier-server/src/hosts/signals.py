@@ -0,0 +1,29 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import Host, HostPackage, update_package_counts
+from .search.result_cache import HOST_VERSION, SCAN_STATE_FIELDS, bump_data_versions
+
+
+@receiver(post_save, sender=Host)
+@receiver(post_delete, sender=Host)
+def on_host_changed(sender, update_fields=None, **kwargs):
+    """
+    Signal triggered when a host is changed, as this may change the results of any
+    search. Saving scan results is handled by scanning.tasks.save_scan, which only
+    invalidates the searches on the artefacts that changed.
+    """
+    if update_fields and set(update_fields) <= SCAN_STATE_FIELDS:
+        return
+
+    bump_data_versions([HOST_VERSION])
+
+
+@receiver(pre_delete, sender=Host)
+def on_host_deleted(sender, instance: Host, **kwargs):
+    """
+    Signal triggered before a host is deleted, to remove its packages from the
+    package counts. Archived hosts are not counted.
+    """
+    if not instance.archived:
+        update_package_counts(HostPackage.objects.get_for_host(instance), set())
@@ -1,15 +1,32 @@
 """Test cases for the advanced search feature."""
 
+import copy
 from datetime import datetime
+from io import StringIO
 from unittest import mock
 
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
 from django.utils import timezone
 
 from hosts.models import Host, Scan
 from hosts.search.query_builder import search_hosts_by_scan_fields
+from hosts.search.pagination import decode_cursor, paginate_results
+from hosts.search.plan import compile_query
 from hosts.search.query_parser import parse_query
+from hosts.search.result_cache import (
+    bump_data_versions,
+    get_changed_artefacts,
+    get_search_results,
+)
 from hosts.search.types import ComplexQuery, SearchCriterion
+from hosts.search.value_extraction import (
+    get_scan_field_values,
+    iter_scan_field_values,
+)
+from main.models import User
 
 
 class AdvancedSearchTestCase(TestCase):
@@ -1049,6 +1066,71 @@ class ArrayFieldSearchTests(AdvancedSearchTestCase):
         result = search_hosts_by_scan_fields(Host.objects.all(), parsed_query)
         self.assertEqual(result.count(), 2)
 
+    def test_same_element(self):
+        """Test that criteria on the same array must match the same element."""
+        query_string = (
+            "facts.generic.PackageList[].name = 'openssh-server' AND "
+            "facts.generic.PackageList[].version contains '9.2p1'"
+        )
+        parsed_query = parse_query(query_string)
+        result = search_hosts_by_scan_fields(Host.objects.all(), parsed_query)
+        self.assertEqual(
+            list(result.values_list("fqdn", flat=True)), ["db01.example.com"]
+        )
+
+    def test_same_element_no_match(self):
+        """Test that criteria matching different elements don't match the host."""
+        # web01 has openssh-server, and vim with a version containing 8.2
+        query_string = (
+            "facts.generic.PackageList[].name = 'openssh-server' AND "
+            "facts.generic.PackageList[].version contains '8.2'"
+        )
+        parsed_query = parse_query(query_string)
+        result = search_hosts_by_scan_fields(Host.objects.all(), parsed_query)
+        self.assertEqual(result.count(), 0)
+
+    def test_same_element_in_nested_and(self):
+        """Test that nested AND queries also match the same element."""
+        query_string = (
+            "facts.generic.PackageList[].name = 'openssh-server' AND "
+            "{facts.generic.PackageList[].version contains '8.2' AND "
+            "meta.department = 'Engineering'}"
+        )
+        parsed_query = parse_query(query_string)
+        result = search_hosts_by_scan_fields(Host.objects.all(), parsed_query)
+        self.assertEqual(result.count(), 0)
+
+    def test_same_array_expanded_once(self):
+        """Test that criteria on the same array share a single expansion."""
+        query_string = (
+            "facts.generic.PackageList[].name contains 'ssh' AND "
+            "facts.generic.PackageList[].version contains 'ubuntu' AND "
+            "facts.generic.Users[].name = 'root'"
+        )
+        parsed_query = parse_query(query_string)
+        result = search_hosts_by_scan_fields(Host.objects.all(), parsed_query)
+
+        self.assertEqual(str(result.query).count("jsonb_array_elements"), 2)
+        self.assertEqual(
+            set(result.values_list("fqdn", flat=True)),
+            {"web01.example.com", "storage01.example.com"},
+        )
+
+    def test_any_element_with_aggregation(self):
+        """Test that an aggregation still matches any element of the array."""
+        query_string = (
+            "facts.generic.PackageList[].name = 'openssh-server' AND "
+            "count(filter(facts.generic.PackageList[].version, '8\\.2')) > 0"
+        )
+        parsed_query = parse_query(query_string)
+        # Filter patterns are regular expressions, so the dot is escaped
+        self.assertEqual(parsed_query.children[1].criterion.filter_pattern, "8\\.2")
+
+        result = search_hosts_by_scan_fields(Host.objects.all(), parsed_query)
+        self.assertEqual(
+            list(result.values_list("fqdn", flat=True)), ["web01.example.com"]
+        )
+
 
 class EdgeCaseTests(AdvancedSearchTestCase):
     """Test edge cases and error conditions."""
@@ -1098,3 +1180,298 @@ class EdgeCaseTests(AdvancedSearchTestCase):
         """Test that malformed queries raise ValueError."""
         with self.assertRaises(ValueError):
             parse_query("meta.fqdn = ")
+
+
+class ValueExtractionTests(AdvancedSearchTestCase):
+    """Test cases for extracting field values for display and export."""
+
+    field_ids = [
+        "meta.fqdn",
+        "meta.department",
+        "facts.generic.HostnameCtl.os",
+        "facts.generic.Hardware.num_cpus",
+        "facts.generic.Users[].name",
+        "facts.generic.Groups[].name",
+        "facts.generic.Hardware.block_devices[].name",
+    ]
+
+    def test_projected_values_match_extracted_values(self):
+        """Test that values selected by the database match extracting them in Python."""
+        hosts = Host.objects.order_by("fqdn")
+
+        expected = get_scan_field_values(list(hosts), self.field_ids)
+        projected = get_scan_field_values(hosts, self.field_ids)
+
+        self.assertEqual(
+            [(item["object"], item["fields"]) for item in projected],
+            [(item["object"], item["fields"]) for item in expected],
+        )
+        self.assertTrue(
+            any(item["fields"]["facts.generic.Users[].name"] for item in projected)
+        )
+        self.assertIn("last_scan_cache", projected[0]["object"].get_deferred_fields())
+
+    def test_array_counts(self):
+        """Test that array fields can be loaded as the number of values."""
+        hosts = Host.objects.order_by("fqdn")
+
+        values = get_scan_field_values(hosts, self.field_ids)
+        counts = get_scan_field_values(hosts, self.field_ids, array_counts=True)
+
+        for value, count in zip(values, counts):
+            self.assertEqual(
+                count["fields"]["facts.generic.Users[].name"],
+                len(value["fields"]["facts.generic.Users[].name"]),
+            )
+            self.assertEqual(
+                count["fields"]["facts.generic.HostnameCtl.os"],
+                value["fields"]["facts.generic.HostnameCtl.os"],
+            )
+
+    def test_streamed_values_match_extracted_values(self):
+        """Test that streaming values gives the same values as loading the hosts."""
+        hosts = Host.objects.order_by("fqdn")
+
+        expected = [
+            {"fqdn": item["object"].fqdn, "fields": item["fields"]}
+            for item in get_scan_field_values(list(hosts), self.field_ids)
+        ]
+        streamed = list(iter_scan_field_values(hosts, self.field_ids, chunk_size=1))
+
+        self.assertEqual(streamed, expected)
+
+    def test_streamed_values_without_scan(self):
+        """Test that hosts without scan data get empty values."""
+        Host.objects.create(fqdn="new.example.com")
+
+        row = next(
+            iter_scan_field_values(
+                Host.objects.filter(fqdn="new.example.com"), self.field_ids
+            )
+        )
+
+        self.assertEqual(row["fields"]["facts.generic.HostnameCtl.os"], None)
+        self.assertEqual(row["fields"]["facts.generic.Users[].name"], [])
+
+
+class AdvancedSearchCellTests(AdvancedSearchTestCase):
+    """Test cases for loading the values of array fields on request."""
+
+    field_id = "facts.generic.Users[].name"
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="testuser", is_superuser=True)
+        self.client.force_login(self.user)
+
+    def _get_values(self, host, **params):
+        return self.client.get(
+            reverse("hosts:advanced_search_cell"),
+            {"host": host.pk, "field": self.field_id, **params},
+        )
+
+    def test_values_of_host(self):
+        """Test that the values of the requested host are returned, not those of
+        another host with the same FQDN."""
+        expected = get_scan_field_values([self.host1], [self.field_id])[0]["fields"]
+        Host.objects.create(fqdn=self.host1.fqdn, archived=True)
+
+        response = self._get_values(self.host1)
+
+        self.assertEqual(response.json(), {"values": expected[self.field_id]})
+
+    def test_archived_hosts(self):
+        """Test that archived hosts are only shown when they are included."""
+        Host.objects.filter(pk=self.host1.pk).update(archived=True)
+
+        self.assertEqual(self._get_values(self.host1).status_code, 404)
+        self.assertEqual(
+            self._get_values(self.host1, **{"include-archived": ""}).status_code,
+            200,
+        )
+
+    def test_invalid_host(self):
+        """Test that an invalid host gives a 404."""
+        response = self.client.get(
+            reverse("hosts:advanced_search_cell"),
+            {"host": "web01.example.com", "field": self.field_id},
+        )
+
+        self.assertEqual(response.status_code, 404)
+
+
+class PaginationTests(TestCase):
+    """Test cases for keyset pagination of search results."""
+
+    results = [(f"host{i}.example.com", i) for i in range(5)]
+
+    def test_paging_forwards_and_backwards(self):
+        """Test that paging through all results visits every host once, in order."""
+        pages = [paginate_results(self.results, 2)]
+        while pages[-1].next_cursor:
+            pages.append(paginate_results(self.results, 2, after=pages[-1].next_cursor))
+
+        self.assertEqual([page.pks for page in pages], [[0, 1], [2, 3], [4]])
+        self.assertIsNone(pages[0].previous_cursor)
+
+        # Going back from the last page visits the same pages in reverse
+        page = pages[-1]
+        for previous_page in reversed(pages[:-1]):
+            page = paginate_results(self.results, 2, before=page.previous_cursor)
+            self.assertEqual(page.pks, previous_page.pks)
+
+        self.assertIsNone(page.previous_cursor)
+
+    def test_cursor_of_removed_host(self):
+        """Test that paging continues after the position of a host that is gone."""
+        cursor = paginate_results(self.results, 2).next_cursor
+        results = [row for row in self.results if row[1] != 1]
+
+        self.assertEqual(paginate_results(results, 2, after=cursor).pks, [2, 3])
+
+    def test_invalid_cursor(self):
+        """Test that invalid cursors give the first page."""
+        self.assertIsNone(decode_cursor("not a cursor"))
+
+        page = paginate_results(self.results, 2, after="not a cursor")
+
+        self.assertEqual(page.pks, [0, 1])
+
+
+@override_settings(SEARCH_RESULT_CACHE_TIMEOUT=3600)
+class ResultCacheTests(AdvancedSearchTestCase):
+    """Test cases for caching search results."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def _search(self, query_string):
+        return get_search_results(
+            Host.objects.all(), compile_query(query_string), scope="all"
+        )
+
+    def test_results_are_cached(self):
+        """Test that searching again uses the cache, also for equivalent queries."""
+        results = self._search(
+            "meta.department = 'Engineering' AND meta.billable = true"
+        )
+
+        with self.assertNumQueries(0):
+            cached_results = self._search(
+                "meta.billable = true AND {meta.department = 'Engineering'}"
+            )
+
+        self.assertEqual(cached_results, results)
+        self.assertIn((self.host1.fqdn, self.host1.pk), results)
+
+    def test_host_changes_invalidate_results(self):
+        """Test that editing a host invalidates all results."""
+        query_string = "meta.department = 'Engineering'"
+        self._search(query_string)
+
+        self.host1.department = "Sales"
+        self.host1.save()
+
+        results = self._search(query_string)
+        self.assertNotIn((self.host1.fqdn, self.host1.pk), results)
+
+    def test_scans_only_invalidate_affected_results(self):
+        """Test that a scan only invalidates the results of the artefacts it changed."""
+        self._search("facts.generic.HostnameCtl.os contains 'Ubuntu'")
+        self._search("count(facts.generic.Users[].name) >= 2")
+
+        previous_scan = self.host1.last_scan_cache
+        scan = copy.deepcopy(previous_scan)
+        scan["facts"]["generic.HostnameCtl"]["os"] = "Debian 12"
+        self.host1.add_scan(scan)
+
+        changed = get_changed_artefacts(previous_scan, scan)
+        self.assertEqual(changed, ["facts:generic.HostnameCtl"])
+        bump_data_versions(changed)
+
+        with self.assertNumQueries(0):
+            self._search("count(facts.generic.Users[].name) >= 2")
+
+        results = self._search("facts.generic.HostnameCtl.os contains 'Ubuntu'")
+        self.assertNotIn((self.host1.fqdn, self.host1.pk), results)
+
+    @override_settings(SEARCH_RESULT_CACHE_TIMEOUT=0)
+    def test_cache_disabled(self):
+        """Test that results are not cached when the cache is disabled, as is the
+        default without a shared cache."""
+        query_string = "meta.department = 'Engineering'"
+        self._search(query_string)
+
+        with self.assertNumQueries(1):
+            self._search(query_string)
+
+
+class QueryPlanTests(AdvancedSearchTestCase):
+    """Test cases for compiled query plans."""
+
+    def setUp(self):
+        super().setUp()
+        compile_query.cache_clear()
+
+    def test_plans_are_cached(self):
+        """Test that compiling the same query string returns the same plan."""
+        query_string = "meta.department = 'Engineering'"
+
+        self.assertIs(compile_query(query_string), compile_query(query_string))
+        self.assertEqual(compile_query.cache_info().hits, 1)
+
+    def test_plan_matches_search(self):
+        """Test that a plan finds the same hosts as searching the parsed query."""
+        query_string = (
+            "{facts.generic.HostnameCtl.os contains 'Ubuntu' OR "
+            "count(facts.generic.Users[].name) >= 2} AND meta.billable = true"
+        )
+
+        plan = compile_query(query_string)
+        expected = search_hosts_by_scan_fields(
+            Host.objects.all(), parse_query(query_string)
+        )
+
+        self.assertEqual(plan.query, parse_query(query_string))
+        self.assertQuerySetEqual(
+            plan.apply(Host.objects.all()), expected, ordered=False
+        )
+
+    def test_or_query_is_a_single_query(self):
+        """Test that OR queries don't run a query per branch."""
+        plan = compile_query(
+            "facts.generic.HostnameCtl.os contains 'Ubuntu' OR "
+            "count(facts.generic.Users[].name) >= 2"
+        )
+
+        with self.assertNumQueries(1):
+            list(plan.apply(Host.objects.all()))
+
+    def test_plan_is_applied_to_given_hosts(self):
+        """Test that a shared plan only returns hosts from the given queryset."""
+        plan = compile_query("meta.department = 'Engineering'")
+
+        results = plan.apply(Host.objects.exclude(pk=self.host1.pk))
+
+        self.assertTrue(results.exists())
+        self.assertNotIn(self.host1, results)
+
+    def test_invalid_query(self):
+        """Test that invalid queries raise a ValueError."""
+        with self.assertRaises(ValueError):
+            compile_query("count(meta.fqdn) > 1")
+
+    def test_explain_search_command(self):
+        """Test that explain_search prints the SQL and the executed plan."""
+        stdout = StringIO()
+
+        call_command(
+            "explain_search",
+            "count(facts.generic.Users[].name) >= 2",
+            stdout=stdout,
+        )
+
+        output = stdout.getvalue()
+        self.assertIn("jsonb_array_elements", output)
+        self.assertIn("EXPLAIN ANALYZE:", output)
@@ -0,0 +1,54 @@
+"""Test cases for listing hosts without fetching their last scan."""
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from hosts.models import Host
+from main.models import User
+
+
+class HostListTests(TestCase):
+    """Test cases for the host list and export pages."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", is_superuser=True)
+        self.client.force_login(self.user)
+
+        for i in range(3):
+            host = Host.objects.create(fqdn=f"web0{i}.example.com")
+            host.add_scan({"facts": {"generic.HostnameCtl": {"os": "Ubuntu"}}})
+
+    def assertLastScanNotFetched(self, queries):
+        for query in queries:
+            self.assertNotIn("last_scan_cache", query["sql"])
+
+    def test_list_does_not_fetch_last_scan(self):
+        """Test that the host list never fetches the last scan of hosts."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("hosts:list"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "web01.example.com")
+        self.assertLastScanNotFetched(queries)
+
+    def test_export_does_not_fetch_last_scan(self):
+        """Test that exporting hosts never fetches the last scan of hosts."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse("hosts:export"), {"csv": "1"})
+            content = b"".join(response.streaming_content)
+
+        self.assertIn(b"web01.example.com", content)
+        self.assertLastScanNotFetched(queries)
+
+    def test_light_defers_last_scan(self):
+        """Test that the last scan is still available when accessed."""
+        host = Host.objects.light().get(fqdn="web01.example.com")
+
+        self.assertEqual(
+            host.get_deferred_fields(), {"last_scan_cache", "scan_statistics"}
+        )
+        self.assertEqual(
+            host.last_scan_cache["facts"]["generic.HostnameCtl"]["os"], "Ubuntu"
+        )
@@ -0,0 +1,247 @@
+"""Test cases for the package index, the package filter and the inventory."""
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from hosts.filters import HostFilters
+from hosts.models import Host, HostPackage, HostPackageChange, rebuild_package_counts
+from hosts.packages import (
+    get_package_changes,
+    get_package_num_hosts,
+    get_package_summaries,
+    get_package_versions,
+)
+from hosts.search.result_cache import bump_data_versions, get_changed_artefacts
+
+
+def _scan(*packages):
+    return {
+        "facts": {
+            "generic.PackageList": [
+                {"name": name, "version": version} for name, version in packages
+            ]
+        }
+    }
+
+
+class HostPackageTests(TestCase):
+    """Test cases for keeping the package index up to date."""
+
+    def setUp(self):
+        self.host = Host.objects.create(fqdn="web01.example.com")
+
+    def _get_packages(self):
+        return set(self.host.packages.values_list("name", "version"))
+
+    def test_scan_adds_packages(self):
+        """Test that a scan adds the packages of the host."""
+        self.host.add_scan(_scan(("openssl", "3.0.2"), ("vim", "9.0")))
+
+        self.assertEqual(self._get_packages(), {("openssl", "3.0.2"), ("vim", "9.0")})
+
+    def test_scan_updates_changed_packages(self):
+        """Test that a scan only replaces the packages that changed."""
+        self.host.add_scan(_scan(("openssl", "3.0.2"), ("vim", "9.0")))
+        vim = HostPackage.objects.get(host=self.host, name="vim")
+
+        self.host.add_scan(_scan(("openssl", "3.0.13"), ("vim", "9.0")))
+
+        self.assertEqual(self._get_packages(), {("openssl", "3.0.13"), ("vim", "9.0")})
+        self.assertTrue(HostPackage.objects.filter(pk=vim.pk).exists())
+
+    def test_unchanged_packages_are_not_queried(self):
+        """Test that the index is left alone if the packages didn't change."""
+        self.host.add_scan(_scan(("openssl", "3.0.2")))
+
+        with CaptureQueriesContext(connection) as queries:
+            self.host.add_scan(_scan(("openssl", "3.0.2")))
+
+        self.assertFalse(any("hosts_hostpackage" in query["sql"] for query in queries))
+
+    def test_scan_without_packages(self):
+        """Test that a scan without a package list removes the packages."""
+        self.host.add_scan(_scan(("openssl", "3.0.2")))
+
+        self.host.add_scan({"facts": {}})
+
+        self.assertEqual(self._get_packages(), set())
+
+
+class PackageFilterTests(TestCase):
+    """Test cases for filtering hosts on their packages."""
+
+    def setUp(self):
+        self.host1 = Host.objects.create(fqdn="web01.example.com")
+        self.host1.add_scan(_scan(("openssl", "3.0.2-0ubuntu1.10"), ("vim", "9.0")))
+
+        self.host2 = Host.objects.create(fqdn="db01.example.com")
+        self.host2.add_scan(_scan(("openssl", "1.1.1w"), ("libssl3", "3.0.11")))
+
+    def _filter(self, value):
+        filters = HostFilters(data={"package": value}, queryset=Host.objects.all())
+        return set(filters.qs.values_list("fqdn", flat=True))
+
+    def test_filter_package(self):
+        """Test filtering on a part of the package name."""
+        self.assertEqual(self._filter("ssl"), {"web01.example.com", "db01.example.com"})
+        self.assertEqual(self._filter("vim"), {"web01.example.com"})
+
+    def test_filter_package_exact_version(self):
+        """Test filtering on a package with an exact version."""
+        self.assertEqual(self._filter("openssl==1.1.1w"), {"db01.example.com"})
+        self.assertEqual(self._filter("openssl==3.0"), set())
+
+    def test_filter_package_version(self):
+        """Test filtering on a package and a part of its version."""
+        self.assertEqual(self._filter("openssl~=3.0"), {"web01.example.com"})
+        self.assertEqual(
+            self._filter("ssl~=3.0"), {"web01.example.com", "db01.example.com"}
+        )
+
+
+class PackageInventoryTests(TestCase):
+    """Test cases for the package inventory."""
+
+    def setUp(self):
+        cache.clear()
+
+        self.host1 = Host.objects.create(fqdn="web01.example.com")
+        self.host1.add_scan(_scan(("openssl", "3.0.2"), ("vim", "9.0")))
+
+        self.host2 = Host.objects.create(fqdn="db01.example.com")
+        self.host2.add_scan(_scan(("openssl", "3.0.2")))
+
+        self.host3 = Host.objects.create(fqdn="legacy01.example.com")
+        self.host3.add_scan(_scan(("openssl", "1.1.1w")))
+
+    def test_first_scan_has_no_changes(self):
+        """Test that indexing the packages of a new host isn't recorded as changes."""
+        self.assertFalse(HostPackageChange.objects.exists())
+
+    def test_package_changes(self):
+        """Test that upgrades, installs and removals are recorded."""
+        self.host1.add_scan(_scan(("openssl", "3.0.13"), ("curl", "8.5")))
+
+        changes = {
+            change.name: (change.old_version, change.new_version)
+            for change in get_package_changes(Host.objects.all(), host=self.host1.fqdn)
+        }
+
+        self.assertEqual(
+            changes,
+            {
+                "openssl": ("3.0.2", "3.0.13"),
+                "curl": (None, "8.5"),
+                "vim": ("9.0", None),
+            },
+        )
+
+    def test_package_summaries(self):
+        """Test counting the hosts and versions of each package."""
+        summaries = get_package_summaries(Host.objects.all(), scope="all")
+
+        self.assertEqual(
+            summaries,
+            [
+                {"name": "openssl", "num_hosts": 3, "num_versions": 2},
+                {"name": "vim", "num_hosts": 1, "num_versions": 1},
+            ],
+        )
+
+    def test_package_versions(self):
+        """Test the version distribution of a package, for the given hosts only."""
+        self.assertEqual(
+            get_package_versions(Host.objects.all(), "openssl", scope="all"),
+            [
+                {"version": "3.0.2", "num_hosts": 2},
+                {"version": "1.1.1w", "num_hosts": 1},
+            ],
+        )
+        self.assertEqual(
+            get_package_versions(
+                Host.objects.exclude(pk=self.host1.pk), "openssl", scope="test"
+            ),
+            [
+                {"version": "1.1.1w", "num_hosts": 1},
+                {"version": "3.0.2", "num_hosts": 1},
+            ],
+        )
+
+    def test_scans_invalidate_cached_versions(self):
+        """Test that package changes from scans are reflected in the inventory."""
+        get_package_versions(Host.objects.all(), "openssl", scope="all")
+
+        scan = _scan(("openssl", "3.0.2"))
+        previous_scan = self.host3.last_scan_cache
+        self.host3.add_scan(scan)
+        bump_data_versions(get_changed_artefacts(previous_scan, scan))
+
+        self.assertEqual(
+            get_package_versions(Host.objects.all(), "openssl", scope="all"),
+            [{"version": "3.0.2", "num_hosts": 3}],
+        )
+
+    def test_package_num_hosts(self):
+        """Test that hosts with several versions of a package are counted once."""
+        host4 = Host.objects.create(fqdn="build01.example.com")
+        host4.add_scan(_scan(("openssl", "3.0.2"), ("openssl", "1.1.1w")))
+
+        for hosts in [None, Host.objects.all()]:
+            self.assertEqual(get_package_num_hosts(hosts, "openssl", scope="all"), 4)
+        self.assertEqual(get_package_num_hosts(None, "unknown", scope="all"), 0)
+
+    def _assert_counts_match_hosts(self):
+        hosts = Host.objects.exclude(archived=True)
+        cache.clear()
+
+        self.assertEqual(
+            list(get_package_summaries(None, scope="all")),
+            get_package_summaries(hosts, scope="test"),
+        )
+        for name in ["openssl", "vim", "curl"]:
+            self.assertEqual(
+                get_package_versions(None, name, scope="all"),
+                get_package_versions(hosts, name, scope="test"),
+            )
+
+    def test_fleet_counts(self):
+        """Test that the package counts follow scans, archiving and deletion."""
+        self._assert_counts_match_hosts()
+
+        self.host1.add_scan(_scan(("openssl", "3.0.13"), ("curl", "8.5")))
+        self._assert_counts_match_hosts()
+
+        self.host2.archive()
+        self._assert_counts_match_hosts()
+
+        self.host3.delete()
+        self._assert_counts_match_hosts()
+
+        self.host2.unarchive()
+        self._assert_counts_match_hosts()
+
+        self.host1.add_scan({"facts": {}})
+        self._assert_counts_match_hosts()
+
+    def test_rebuild_fleet_counts(self):
+        """Test that rebuilding the package counts doesn't change them."""
+        summaries = list(get_package_summaries(None, scope="all"))
+
+        rebuild_package_counts()
+
+        self.assertEqual(list(get_package_summaries(None, scope="all")), summaries)
+
+    def test_fleet_queries_are_bounded(self):
+        """
+        Test that the inventory of the whole fleet doesn't group the package
+        index, so it doesn't get slower with the number of hosts.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            list(get_package_summaries(None, scope="all"))
+            get_package_versions(None, "openssl", scope="all")
+            get_package_num_hosts(None, "openssl", scope="all")
+
+        self.assertEqual(len(queries), 3)
+        self.assertFalse(any("hosts_hostpackage" in query["sql"] for query in queries))
@@ -0,0 +1,64 @@
+"""Test cases for validating scans lazily."""
+
+from datetime import datetime, timezone
+
+from django.test import SimpleTestCase
+from pydantic import ValidationError
+
+from hosts.models import ScanData
+from humitifier_common.artefacts import PackageList, Users
+from humitifier_common.scan_data import ScanInput, ScanOutput
+
+
+class LazyScanOutputTests(SimpleTestCase):
+    """Test cases for validating the artefacts of a scan on access."""
+
+    def setUp(self):
+        raw_scan = ScanOutput(
+            original_input=ScanInput(hostname="web01.example.com", artefacts={}),
+            scan_date="2011-11-10T00:00:00Z",
+            hostname="web01.example.com",
+            facts={
+                "generic.PackageList": [{"name": "openssl", "version": "3.0.2"}],
+                "generic.Users": None,
+            },
+            metrics={},
+            errors=[],
+        ).model_dump(mode="json")
+        # Invalid, but never used
+        raw_scan["facts"]["generic.HostnameCtl"] = {"hostname": 1}
+        # Unknown artefacts are ignored, like ScanOutput does
+        raw_scan["facts"]["generic.Unknown"] = {}
+
+        self.raw_scan = raw_scan
+        self.scan = ScanData.from_raw_scan(raw_scan, None).parsed_data
+
+    def test_scan_fields(self):
+        """Test the fields of the scan besides the artefacts."""
+        self.assertEqual(self.scan.hostname, "web01.example.com")
+        self.assertEqual(
+            self.scan.scan_date, datetime(2011, 11, 10, tzinfo=timezone.utc)
+        )
+        self.assertEqual(self.scan.errors, [])
+
+    def test_artefacts(self):
+        """Test that artefacts are validated on access only."""
+        packages = self.scan.facts[PackageList.__artefact_name__]
+
+        self.assertEqual(packages[0].name, "openssl")
+        self.assertIsNone(self.scan.get_artefact_data(Users))
+        self.assertIn("generic.HostnameCtl", self.scan.facts)
+        self.assertNotIn("generic.Unknown", self.scan.facts)
+
+        with self.assertRaises(ValidationError):
+            self.scan.facts["generic.HostnameCtl"]
+
+    def test_to_scan_output(self):
+        """Test that the whole scan is validated when needed."""
+        with self.assertRaises(ValidationError):
+            self.scan.to_scan_output()
+
+        del self.raw_scan["facts"]["generic.HostnameCtl"]
+        scan = ScanData.from_raw_scan(self.raw_scan, None).parsed_data
+
+        self.assertEqual(scan.to_scan_output(), ScanOutput(**self.raw_scan))
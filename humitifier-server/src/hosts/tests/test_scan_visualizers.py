@@ -0,0 +1,153 @@
+"""Test cases for rendering the components of scan visualizers."""
+
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from hosts.models import Host
+from hosts.scan_visualizers import get_scan_visualizer
+from hosts.scan_visualizers.v2.artefact_visualizers import (
+    PackageListVisualizer,
+    UsersVisualizer,
+)
+from humitifier_common.scan_data import ScanInput, ScanOutput
+from main.models import User
+
+
+@override_settings(SCAN_VISUALIZER_CACHE_TIMEOUT=60)
+class FragmentCacheTests(TestCase):
+    """Test cases for rendering components once per scan."""
+
+    def setUp(self):
+        cache.clear()
+
+        self.host = Host.objects.create(fqdn="web01.example.com")
+        self.host.add_scan(self._scan("2011-11-10T00:00:00Z", [("openssl", "3.0.2")]))
+
+    def _scan(self, scan_date, packages):
+        return ScanOutput(
+            original_input=ScanInput(hostname=self.host.fqdn, artefacts={}),
+            scan_date=scan_date,
+            hostname=self.host.fqdn,
+            facts={
+                "generic.PackageList": [
+                    {"name": name, "version": version} for name, version in packages
+                ]
+            },
+            metrics={},
+            errors=[],
+        ).model_dump(mode="json")
+
+    def _render(self):
+        visualizer = get_scan_visualizer(self.host, self.host.get_scan_object(), {})
+        return visualizer.render_components([PackageListVisualizer, UsersVisualizer])
+
+    def test_components_are_cached(self):
+        """Test that components are only rendered once, without parsing the scan."""
+        output = self._render()
+
+        with mock.patch(
+            "hosts.models.ScanData.parsed_data", new_callable=mock.PropertyMock
+        ) as parsed_data:
+            self.assertEqual(self._render(), output)
+
+        parsed_data.assert_not_called()
+
+    def test_hidden_components(self):
+        """Test that components without data stay hidden when cached."""
+        self._render()
+
+        self.assertEqual(list(self._render().keys()), [PackageListVisualizer.title])
+
+    def test_new_scan(self):
+        """Test that the components of a new scan are rendered."""
+        self._render()
+
+        self.host.add_scan(self._scan("2011-11-11T00:00:00Z", [("vim", "9.0")]))
+
+        self.assertIn("vim", self._render()[PackageListVisualizer.title])
+
+
+class LazyComponentTests(TestCase):
+    """Test cases for loading large components after the host detail page."""
+
+    def setUp(self):
+        cache.clear()
+
+        self.user = User.objects.create_user(username="testuser", is_superuser=True)
+        self.client.force_login(self.user)
+
+        self.host = Host.objects.create(fqdn="web01.example.com")
+        self.host.add_scan(
+            ScanOutput(
+                original_input=ScanInput(hostname=self.host.fqdn, artefacts={}),
+                scan_date="2011-11-10T00:00:00Z",
+                hostname=self.host.fqdn,
+                facts={
+                    "generic.PackageList": [{"name": "openssl", "version": "3.0.2"}],
+                },
+                metrics={},
+                errors=[],
+            ).model_dump(mode="json")
+        )
+
+    def _get_component_url(self, visualizer):
+        return reverse(
+            "hosts:component",
+            kwargs={"fqdn": self.host.fqdn, "visualizer": visualizer.__name__},
+        )
+
+    def test_detail_page_leaves_out_lazy_components(self):
+        """Test that lazy components are loaded separately, if the scan has them."""
+        response = self.client.get(
+            reverse("hosts:detail", kwargs={"fqdn": self.host.fqdn})
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, self._get_component_url(PackageListVisualizer))
+        self.assertNotContains(response, self._get_component_url(UsersVisualizer))
+        self.assertNotContains(response, "openssl")
+
+    def test_component(self):
+        """Test rendering a lazy component."""
+        response = self.client.get(self._get_component_url(PackageListVisualizer))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "openssl")
+
+    def test_component_without_data(self):
+        """Test that components without data in the scan are empty."""
+        response = self.client.get(self._get_component_url(UsersVisualizer))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b"")
+
+    def test_component_with_malformed_data(self):
+        """Test that components with malformed data in the scan aren't found."""
+        scan = {**self.host.last_scan_cache, "facts": {"generic.PackageList": "foo"}}
+        Host.objects.filter(pk=self.host.pk).update(last_scan_cache=scan)
+
+        response = self.client.get(self._get_component_url(PackageListVisualizer))
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_component_with_invalid_scan_date(self):
+        """Test that components of invalid scan dates aren't found."""
+        response = self.client.get(
+            self._get_component_url(PackageListVisualizer), {"scan": "foo"}
+        )
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_unknown_component(self):
+        """Test that only lazy components can be loaded."""
+        response = self.client.get(
+            reverse(
+                "hosts:component",
+                kwargs={"fqdn": self.host.fqdn, "visualizer": "HardwareVisualizer"},
+            )
+        )
+
+        self.assertEqual(response.status_code, 404)
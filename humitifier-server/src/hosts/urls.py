@@ -5,11 +5,15 @@ from .views import (
     DataSourceCreateView,
     DataSourceEditView,
     DataSourcesView,
+    HostComponentView,
     HostCreateView, HostDetailView,
     HostExportView,
     HostScanSpecUpdateView, HostUpdateView, HostsListView,
     HostsRawDownloadView,
+    PackageDetailView,
+    PackageListView,
     AdvancedSearchView,
+    AdvancedSearchCellView,
     SavedSearchListView,
     SavedSearchCreateView,
     SavedSearchUpdateView,
@@ -23,6 +27,7 @@ urlpatterns = [
     path("", HostsListView.as_view(), name="list"),
     path("export/", HostExportView.as_view(), name="export"),
     path("advanced_search/", AdvancedSearchView.as_view(), name="advanced_search"),
+    path("advanced_search/cell/", AdvancedSearchCellView.as_view(), name="advanced_search_cell"),
     path("saved_searches/", SavedSearchListView.as_view(), name="saved_searches"),
     path("saved_searches/create/", SavedSearchCreateView.as_view(), name="saved_search_create"),
     path("saved_searches/<int:pk>/edit/", SavedSearchUpdateView.as_view(), name="saved_search_edit"),
@@ -31,9 +36,16 @@ urlpatterns = [
     path("host/new/", HostCreateView.as_view(), name="create"),
     path("host/<fqdn>/", HostDetailView.as_view(), name="detail"),
     path("host/<fqdn>/raw/", HostsRawDownloadView.as_view(), name="download_raw"),
+    path(
+        "host/<fqdn>/components/<str:visualizer>/",
+        HostComponentView.as_view(),
+        name="component",
+    ),
     path("host/<fqdn>/edit/", HostUpdateView.as_view(), name="edit"),
     path("host/<fqdn>/change-scan-spec/", HostScanSpecUpdateView.as_view(), name="change-scan-spec"),
     path("host/<fqdn>/archive/", ArchiveHostView.as_view(), name="archive"),
+    path("packages/", PackageListView.as_view(), name="packages"),
+    path("packages/<str:name>/", PackageDetailView.as_view(), name="package_detail"),
     path("data-sources/", DataSourcesView.as_view(), name="data_sources"),
     path(
         "data-sources/create/",
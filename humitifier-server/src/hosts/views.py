@@ -1,7 +1,5 @@
-import csv
 import json
 from datetime import datetime
-from io import StringIO
 
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
@@ -9,25 +7,52 @@ from django.contrib.messages.views import SuccessMessageMixin
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.db.models import Q
 from django.forms import Form
-from django.http import HttpResponse, HttpResponseForbidden, HttpResponseRedirect
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseForbidden,
+    HttpResponseRedirect,
+    JsonResponse,
+)
 from django.urls import reverse
 from django.views import View
-from django.views.generic import TemplateView, UpdateView
+from django.views.generic import ListView, TemplateView, UpdateView
 from django.views.generic.detail import (
     BaseDetailView,
     SingleObjectTemplateResponseMixin,
 )
 from django.views.generic.edit import CreateView, FormMixin
+from pydantic import ValidationError as PydanticValidationError
 from rest_framework.reverse import reverse_lazy
 
 from main.views import FilteredListView, SuperuserRequiredMixin, TableMixin
 
+from .exports import (
+    EXPORT_CHUNK_SIZE,
+    stream_csv,
+    stream_json_list,
+    stream_lines,
+    streaming_export_response,
+)
 from .filters import DataSourceFilters, HostFilters, SavedSearchFilters
 from .forms import DataSourceForm, HostForm, HostScanSpecForm, SavedSearchForm
-from .models import DataSource, Host, SavedSearch
-from .scan_visualizers import get_scan_visualizer
-from .search import get_searchable_fields, search_hosts_by_scan_fields, \
-    get_scan_field_values, parse_query
+from .models import DataSource, Host, SavedSearch, ScanData
+from .packages import (
+    get_package_changes,
+    get_package_num_hosts,
+    get_package_summaries,
+    get_package_versions,
+)
+from .scan_visualizers import V2ScanVisualizer, get_scan_visualizer
+from .scan_visualizers.lazy_components import (
+    get_scan_summary,
+    render_lazy_component,
+    with_scan_summary,
+)
+from .search import get_searchable_fields, get_searchable_fields_by_id, \
+    get_scan_field_values, iter_scan_field_values, compile_query
+from .search.pagination import paginate_results
+from .search.result_cache import get_access_scope, get_search_results
 from .tables import DataSourcesTable, HostsTable, SavedSearchesTable
 
 ##
@@ -52,7 +77,8 @@ class HostsListView(LoginRequiredMixin, TableMixin, FilteredListView):
     }
 
     def get_queryset(self):
-        queryset = Host.objects.get_for_user(self.request.user)
+        # The table doesn't show anything from the last scan, so don't fetch it
+        queryset = Host.objects.get_for_user(self.request.user).light()
 
         ordering = self.get_ordering()
         if ordering:
@@ -63,9 +89,9 @@ class HostsListView(LoginRequiredMixin, TableMixin, FilteredListView):
         self.filterset = self.filterset_class(self.request.GET, queryset=queryset)
 
         filtered_qs = self.filterset.qs
-        # We're going to need the data for the alerts in the template
-        # So, let's prefetch it here for _performance_
-        filtered_qs = filtered_qs.prefetch_related("alerts", "alert_acknowledgements")
+        # We're going to need the alert counts in the template
+        # So, let's annotate them here for _performance_
+        filtered_qs = filtered_qs.with_alert_counts()
 
         return filtered_qs.distinct()
 
@@ -76,7 +102,7 @@ class HostExportView(LoginRequiredMixin, FilteredListView):
     template_name = "hosts/host_export.html"
 
     def get_queryset(self):
-        queryset = Host.objects.get_for_user(self.request.user)
+        queryset = Host.objects.get_for_user(self.request.user).light()
 
         data = self.request.GET.copy()
         data.update(self.request.POST)
@@ -86,68 +112,49 @@ class HostExportView(LoginRequiredMixin, FilteredListView):
         return self.filterset.qs.distinct()
 
     def post(self, request, *args, **kwargs):
-        content = ""
-        content_type = "text/plain"
         file_name = datetime.now().isoformat()
         file_name = f"humitifier_export_{file_name}"
 
         if "csv" in request.POST:
-            content = self._get_csv()
-            content_type = "text/csv"
-            file_name = f"{file_name}.csv"
-        elif "host-list" in request.POST:
-            content = self._get_host_list()
-            file_name = f"{file_name}.txt"
-
-        headers = {
-            "Content-Disposition": f'attachment; filename="{file_name}"',
-        }
+            return streaming_export_response(
+                self._get_csv(), "text/csv", f"{file_name}.csv"
+            )
 
-        return HttpResponse(content, content_type=content_type, headers=headers)
+        if "host-list" in request.POST:
+            return streaming_export_response(
+                self._get_host_list(), "text/plain", f"{file_name}.txt"
+            )
+
+        return streaming_export_response(iter([]), "text/plain", file_name)
 
     def _get_csv(self):
-        buffer = StringIO()
-
-        csv_file = csv.DictWriter(
-            f=buffer,
-            fieldnames={
-                "fqdn": "Hostname",
-                "os": "Operating System",
-                "department": "Department",
-                "customer": "Customer",
-                "contact": "Contact",
-                "created_at": "Created At",
-                "archived": "Archived",
-                "archival_date": "Archival Date",
-                "last_scan_date": "Last Scan Date",
-            },
+        fieldnames = [
+            "fqdn",
+            "os",
+            "department",
+            "customer",
+            "contact",
+            "created_at",
+            "archived",
+            "archival_date",
+            "last_scan_date",
+        ]
+        rows = (
+            self.get_queryset()
+            .values(*fieldnames)
+            .iterator(chunk_size=EXPORT_CHUNK_SIZE)
         )
-        csv_file.writeheader()
-
-        for host in self.get_queryset():
-            csv_file.writerow(
-                {
-                    "fqdn": host.fqdn,
-                    "os": host.os,
-                    "department": host.department,
-                    "customer": host.customer,
-                    "contact": host.contact,
-                    "created_at": host.created_at,
-                    "archived": host.archived,
-                    "archival_date": host.archival_date,
-                    "last_scan_date": host.last_scan_date,
-                }
-            )
 
-        return buffer.getvalue()
+        return stream_csv(rows, fieldnames)
 
     def _get_host_list(self):
-        buffer = StringIO()
-
-        for host in self.get_queryset():
-            buffer.write(f"{host.fqdn}\n")
+        fqdns = (
+            self.get_queryset()
+            .values_list("fqdn", flat=True)
+            .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        )
 
-        return buffer.getvalue()
+        return stream_lines(fqdns)
 
 
 class HostDetailView(LoginRequiredMixin, TemplateView):
@@ -161,16 +168,27 @@ class HostDetailView(LoginRequiredMixin, TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        host = Host.objects.get_for_user(self.request.user).get(fqdn=kwargs["fqdn"])
-        scan_data = host.get_scan_object()
+        # Large artefacts are left out of the scan, and loaded after the page by
+        # HostComponentView
+        visualizers = V2ScanVisualizer.visualizers
+        hosts = with_scan_summary(
+            Host.objects.get_for_user(self.request.user).light(),
+            "last_scan_cache",
+            visualizers,
+        )
+        host = hosts.get(fqdn=kwargs["fqdn"])
+        raw_scan, lazy_components = get_scan_summary(host, visualizers)
+        scan_data = ScanData.from_raw_scan(raw_scan, host.last_scan_date)
         current_scan = self.get_current_scan()
         current_scan_date = host.last_scan_date
         scan = None
 
         try:
             if current_scan != self.LATEST_KEY:
-                scan = host.scans.get(created_at=current_scan)
-                scan_data = scan.get_scan_object()
+                scans = with_scan_summary(host.scans.all(), "data", visualizers)
+                scan = scans.get(created_at=current_scan)
+                raw_scan, lazy_components = get_scan_summary(scan, visualizers)
+                scan_data = ScanData.from_raw_scan(raw_scan, scan.created_at)
                 current_scan_date = scan.created_at
         except (ValidationError, ObjectDoesNotExist):
             current_scan = self.LATEST_KEY
@@ -185,6 +203,7 @@ class HostDetailView(LoginRequiredMixin, TemplateView):
             "all_scans": host.scans.values_list("created_at", flat=True),
             "is_latest_scan": is_latest_scan,
             "alerts": host.alerts.filter(acknowledgement=None).order_by("severity"),
+            "lazy_components": lazy_components,
         }
 
         visualizer = get_scan_visualizer(host, scan_data, visualizer_context)
@@ -196,6 +215,51 @@ class HostDetailView(LoginRequiredMixin, TemplateView):
         return context
 
 
+class HostComponentView(LoginRequiredMixin, View):
+    """
+    Renders a single component of the host detail page, for the large artefacts
+    that are loaded after the page. See hosts.scan_visualizers.lazy_components
+    """
+
+    def get(self, request, fqdn, visualizer):
+        visualizers = {
+            visualizer.__name__: visualizer
+            for visualizer in V2ScanVisualizer.visualizers
+            if visualizer.lazy
+        }
+        if visualizer not in visualizers:
+            raise Http404("Unknown component")
+
+        host = Host.objects.get_for_user(request.user).light().filter(fqdn=fqdn).first()
+        if host is None:
+            raise Http404("Host not found")
+
+        current_scan = request.GET.get("scan", HostDetailView.LATEST_KEY)
+
+        try:
+            if current_scan == HostDetailView.LATEST_KEY:
+                scans = Host.objects.filter(pk=host.pk)
+                field, date_field = "last_scan_cache", "last_scan_date"
+            else:
+                scans = host.scans.filter(created_at=current_scan)
+                field, date_field = "data", "created_at"
+
+            fragment = render_lazy_component(
+                host, scans, field, date_field, visualizers[visualizer]
+            )
+        except ValidationError:
+            # An invalid scan date
+            fragment = None
+        except PydanticValidationError:
+            # The artefact data in the scan is malformed
+            fragment = None
+
+        if fragment is None:
+            raise Http404("Scan not found")
+
+        return HttpResponse(fragment)
+
+
 class HostsRawDownloadView(LoginRequiredMixin, SuperuserRequiredMixin, View):
 
     def get(self, request, fqdn):
@@ -308,6 +372,7 @@ class HostUpdateView(
 
 class AdvancedSearchView(LoginRequiredMixin, SuperuserRequiredMixin, TemplateView):
     template_name = 'hosts/host_advanced_search.html'
+    paginate_by = 50
 
     def get(self, request, *args, **kwargs):
         # Check if we're loading a saved search
@@ -338,63 +403,52 @@ class AdvancedSearchView(LoginRequiredMixin, SuperuserRequiredMixin, TemplateVie
             # Regular search submit
             return super().get(*args, **kwargs)
 
-        # Build context to get the data to export
-        context = self.get_context_data()
-        data = context.get("data", [])
-        requested_columns = context.get("requested_columns", [])
-
-        # Helper to normalize dict rows for export (CSV/JSON)
-        def iter_rows():
-            for item in data:
-                obj = item.get("object")
-                fields = dict(item.get("fields", {}))
-                fields["FQDN"] = getattr(obj, "fqdn", "")
-                yield fields
+        search_string = post.get('search-string', '')
+        requested_columns = self._parse_requested_columns(
+            get_searchable_fields()
+        )
+        qs = self._get_queryset(search_string)
 
         # Build filename timestamp
         ts = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+        file_name = f"humitifier-advanced-export-{ts}.{export_type}"
 
         if export_type == "txt":
             # Only hostnames, one per line
-            lines = []
+            fqdns = qs.values_list("fqdn", flat=True).iterator(
+                chunk_size=EXPORT_CHUNK_SIZE
+            )
+            return streaming_export_response(
+                stream_lines(fqdns), "text/plain; charset=utf-8", file_name
+            )
+
+        # Normalize rows for export (CSV/JSON)
+        def iter_rows(normalize_lists=False):
+            data = iter_scan_field_values(
+                qs, requested_columns, chunk_size=EXPORT_CHUNK_SIZE
+            )
             for item in data:
-                obj = item.get("object")
-                fqdn = getattr(obj, "fqdn", "")
-                if fqdn:
-                    lines.append(fqdn)
-            body = "\n".join(lines)
-            resp = HttpResponse(body, content_type="text/plain; charset=utf-8")
-            resp["Content-Disposition"] = f"attachment; filename=humitifier-advanced-export-{ts}.txt"
-            return resp
+                fields = dict(item["fields"])
+                if normalize_lists:
+                    # Convert list values to comma-separated strings for CSV
+                    for k, v in fields.items():
+                        if isinstance(v, list):
+                            fields[k] = ", ".join(str(x) for x in v)
+                fields["FQDN"] = item["fqdn"]
+                yield fields
 
         if export_type == "json":
-            rows = list(iter_rows())
-            body = json.dumps(rows, indent=2, default=str)
-            resp = HttpResponse(body, content_type="application/json")
-            resp["Content-Disposition"] = f"attachment; filename=humitifier-advanced-export-{ts}.json"
-            return resp
-
-        if export_type == "csv":
-            # Header: FQDN + requested field ids (in chosen order)
-            headers = ["FQDN"] + list(requested_columns)
-            sio = StringIO()
-            writer = csv.DictWriter(sio, fieldnames=headers, extrasaction="ignore")
-            writer.writeheader()
-            for row in iter_rows():
-                # Convert list values to comma-separated strings for CSV
-                normalized = {}
-                for k, v in row.items():
-                    if isinstance(v, list):
-                        normalized[k] = ", ".join(str(x) for x in v)
-                    else:
-                        normalized[k] = v
-                writer.writerow(normalized)
-            resp = HttpResponse(sio.getvalue(), content_type="text/csv; charset=utf-8")
-            resp["Content-Disposition"] = f"attachment; filename=humitifier-advanced-export-{ts}.csv"
-            return resp
-
-        # Fallback to normal rendering
-        return super().get(*args, **kwargs)
+            return streaming_export_response(
+                stream_json_list(iter_rows()), "application/json", file_name
+            )
+
+        # Header: FQDN + requested field ids (in chosen order)
+        headers = ["FQDN"] + list(requested_columns)
+        return streaming_export_response(
+            stream_csv(iter_rows(normalize_lists=True), headers),
+            "text/csv; charset=utf-8",
+            file_name,
+        )
 
     def _include_archived(self):
         if not self.request.POST:
@@ -421,12 +475,24 @@ class AdvancedSearchView(LoginRequiredMixin, SuperuserRequiredMixin, TemplateVie
                 search_string = self.request.POST.get('search-string', '')
                 context['search_string'] = search_string
 
+        results = self._get_results(search_string)
+        page = paginate_results(
+            results,
+            self.paginate_by,
+            after=self.request.POST.get('after'),
+            before=self.request.POST.get('before'),
+        )
+
         context['searchable_fields'] = searchable_fields
         context['requested_columns'] = requested_columns
-        context['data'] = self._get_data(
-            search_string,
-            searchable_fields,
-            requested_columns)
+        context['array_columns'] = [
+            field.id for field in searchable_fields
+            if field.kind == "array" and field.id in requested_columns
+        ]
+        context['data'] = self._get_data(page, requested_columns)
+        context['next_cursor'] = page.next_cursor
+        context['previous_cursor'] = page.previous_cursor
+        context['result_count'] = len(results)
         context['include_archived'] = self._include_archived()
 
         # Check for query parse error message
@@ -435,23 +501,52 @@ class AdvancedSearchView(LoginRequiredMixin, SuperuserRequiredMixin, TemplateVie
 
         return context
 
-    def _get_data(self, search_string, searchable_fields, requested_columns):
+    def _get_data(self, page, requested_columns):
+        # Array fields can contain many values, so only their counts are
+        # loaded here. The values are loaded on request, see
+        # AdvancedSearchCellView
+        data = get_scan_field_values(
+            Host.objects.filter(pk__in=page.pks),
+            requested_columns,
+            array_counts=True,
+        )
+        positions = {pk: i for i, pk in enumerate(page.pks)}
+
+        return sorted(data, key=lambda item: positions[item["object"].pk])
+
+    def _get_results(self, search_string):
+        plan = self._parse_search_string(search_string)
+        if search_string and plan is None:
+            return []
+
+        # Results are cached, so loading a (saved) search or paging through
+        # its results doesn't run the search again
+        return get_search_results(
+            self._get_base_queryset(),
+            plan,
+            scope=f"{get_access_scope(self.request.user)}"
+            f"|archived={self._include_archived()}",
+        )
+
+    def _get_base_queryset(self):
         qs = Host.objects.get_for_user(self.request.user)
 
         if not self._include_archived():
             qs = qs.exclude(archived=True)
 
+        return qs
+
+    def _get_queryset(self, search_string):
+        qs = self._get_base_queryset()
+
         if search_string:
-            search_query = self._parse_search_string(search_string)
-            if search_query is not None:
-                try:
-                    qs = search_hosts_by_scan_fields(qs, search_query)
-                except ValueError as e:
-                    # Store the error message to display to the user
-                    self._query_parse_error = str(e)
-                    return Host.objects.none()
+            plan = self._parse_search_string(search_string)
+            if plan is None:
+                return Host.objects.none()
+
+            qs = plan.apply(qs)
 
-        return get_scan_field_values(qs, requested_columns)
+        return qs
 
     def _parse_requested_columns(self, searchable_fields):
         if not self.request.POST:
@@ -468,23 +563,111 @@ class AdvancedSearchView(LoginRequiredMixin, SuperuserRequiredMixin, TemplateVie
 
 
     def _parse_search_string(self, search_string):
-        """Parse the search string using the ComplexQuery parser.
+        """Compile the search string into a query plan.
 
         Returns:
-            ComplexQuery object or None if there's no search string or parsing fails.
-            Sets self._query_parse_error if parsing fails.
+            QueryPlan object or None if there's no search string or compiling fails.
+            Sets self._query_parse_error if compiling fails.
         """
         if not search_string:
             return None
 
         try:
-            # Use the new query parser to create a ComplexQuery object
-            return parse_query(search_string)
+            # Compiled plans are cached, and shared between users
+            return compile_query(search_string)
         except ValueError as e:
             # Store the error message to display to the user
             self._query_parse_error = str(e)
             return None
 
+
+class AdvancedSearchCellView(LoginRequiredMixin, SuperuserRequiredMixin, View):
+    """Returns the values of an array field of a host, for the advanced search"""
+
+    def get(self, request, *args, **kwargs):
+        field_id = request.GET.get('field', '')
+        if field_id not in get_searchable_fields_by_id():
+            raise Http404("Unknown field")
+
+        try:
+            pk = int(request.GET.get('host', ''))
+        except ValueError:
+            raise Http404("Host not found")
+
+        # Use the same hosts as the results table
+        hosts = Host.objects.get_for_user(request.user).filter(pk=pk)
+        if 'include-archived' not in request.GET:
+            hosts = hosts.exclude(archived=True)
+
+        data = get_scan_field_values(hosts, [field_id])
+        if not data:
+            raise Http404("Host not found")
+
+        return JsonResponse({"values": data[0]["fields"][field_id]})
+
+##
+## Package views
+##
+
+
+class PackageListView(LoginRequiredMixin, ListView):
+    template_name = "hosts/package_list.html"
+    paginate_by = 100
+
+    def get_queryset(self):
+        return get_package_summaries(
+            _get_package_hosts(self.request.user),
+            scope=get_access_scope(self.request.user),
+            search=self.request.GET.get("search", "").strip(),
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["search"] = self.request.GET.get("search", "")
+        return context
+
+
+class PackageDetailView(LoginRequiredMixin, TemplateView):
+    template_name = "hosts/package_detail.html"
+
+    # The number of changes shown
+    num_changes = 50
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+
+        hosts = _get_package_hosts(self.request.user)
+        scope = get_access_scope(self.request.user)
+        versions = get_package_versions(hosts, kwargs["name"], scope=scope)
+        if not versions:
+            raise Http404("Package not found")
+
+        host_filter = self.request.GET.get("host", "").strip()
+
+        context["name"] = kwargs["name"]
+        context["versions"] = versions
+        context["num_hosts"] = get_package_num_hosts(
+            hosts, kwargs["name"], scope=scope
+        )
+        context["host_filter"] = host_filter
+        context["changes"] = get_package_changes(
+            hosts, name=kwargs["name"], host=host_filter
+        )[: self.num_changes]
+
+        return context
+
+
+def _get_package_hosts(user):
+    # Superusers see the whole fleet, which is read from the package counts (see
+    # hosts.packages)
+    if user.is_superuser:
+        return None
+
+    # Archived hosts are no longer maintained, so they are left out of the
+    # inventory
+    return Host.objects.get_for_user(user).exclude(archived=True)
+
+
 ##
 ## Data source views
 ##
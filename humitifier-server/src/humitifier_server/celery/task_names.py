@@ -17,3 +17,6 @@ SCANNING_FULL_SCAN_SCHEDULER = (
 
 ALERTING_GENERATE_ALERTS = f"{SERVER_QUEUE_PREFIX}.internal.alerting.generate_alerts"
 ALERTING_SAVE_ALERTS = f"{SERVER_QUEUE_PREFIX}.internal.alerting.save_alerts"
+ALERTING_DISPATCH_NOTIFICATIONS = (
+    f"{SERVER_QUEUE_PREFIX}.internal.alerting.dispatch_notifications"
+)
@@ -144,6 +144,25 @@ DATABASES = {
     }
 }
 
+# Cache
+# Cached data is invalidated across processes only when a shared cache is used,
+# so production deployments should configure a Redis cache. Without one, every
+# process uses its own local memory cache.
+
+_cache_redis_url = env.get("CACHE_REDIS_URL", default=None)
+if _cache_redis_url:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": _cache_redis_url,
+        }
+    }
+
+# Whether all processes share the default cache. Caches that are invalidated by
+# other processes, like the Celery workers processing scans, are only enabled by
+# default with a shared cache.
+SHARED_CACHE = bool(_cache_redis_url)
+
 # Authentication
 
 LOGIN_URL = reverse_lazy("main:login")
@@ -415,3 +434,125 @@ CELERY_BROKER_CONNECTION_RETRY_ON_STARTUP = True
 ### Result backend
 CELERY_RESULT_BACKEND = "django-db"
 CELERY_RESULT_EXTENDED = True
+
+## Scanning
+
+# The maximum number of scans the scheduler keeps in flight on the scanner queue.
+# Leave empty for no limit.
+_max_concurrent_scans = env.get("SCANNING_MAX_CONCURRENT_SCANS", default=None)
+SCANNING_MAX_CONCURRENT_SCANS = (
+    int(_max_concurrent_scans) if _max_concurrent_scans else None
+)
+# The maximum number of scans waiting on the scanner queue of the broker; the
+# scheduler pauses while the queue is longer. Leave empty for no limit.
+_max_queue_depth = env.get("SCANNING_MAX_QUEUE_DEPTH", default="500")
+SCANNING_MAX_QUEUE_DEPTH = int(_max_queue_depth) if _max_queue_depth else None
+# How often the scan scheduler runs, in seconds. Only used if its periodic task
+# doesn't run at a fixed interval (e.g. a crontab schedule); otherwise the interval
+# of the periodic task is used.
+SCANNING_SCHEDULER_RUN_INTERVAL_SECONDS = int(
+    env.get("SCANNING_SCHEDULER_RUN_INTERVAL_SECONDS", default="60")
+)
+# How long a scheduled scan without results is considered to be in flight. Scans
+# that have not started within this time after their scheduled time expire.
+SCANNING_IN_FLIGHT_TIMEOUT_MINUTES = int(
+    env.get("SCANNING_IN_FLIGHT_TIMEOUT_MINUTES", default="30")
+)
+# Hosts whose scans fail this many times in a row are scanned less often, starting
+# at SCANNING_BACKOFF_BASE_MINUTES and doubling with every failure up to
+# SCANNING_BACKOFF_MAX_HOURS
+SCANNING_BACKOFF_THRESHOLD = int(env.get("SCANNING_BACKOFF_THRESHOLD", default="3"))
+SCANNING_BACKOFF_BASE_MINUTES = int(
+    env.get("SCANNING_BACKOFF_BASE_MINUTES", default="60")
+)
+SCANNING_BACKOFF_MAX_HOURS = int(env.get("SCANNING_BACKOFF_MAX_HOURS", default="24"))
+# Default scan cadence for scan specs that don't configure their own. Facts are
+# scanned somewhere between the minimum and maximum interval, depending on how
+# often they change. See scanning.cadence
+SCANNING_METRIC_SCAN_INTERVAL_MINUTES = int(
+    env.get("SCANNING_METRIC_SCAN_INTERVAL_MINUTES", default="60")
+)
+SCANNING_MIN_FACT_SCAN_INTERVAL_MINUTES = int(
+    env.get("SCANNING_MIN_FACT_SCAN_INTERVAL_MINUTES", default="60")
+)
+SCANNING_MAX_FACT_SCAN_INTERVAL_MINUTES = int(
+    env.get("SCANNING_MAX_FACT_SCAN_INTERVAL_MINUTES", default="60")
+)
+# How long resolved scan specs are cached, in seconds. Changes to scan specs
+# invalidate the cache right away when a shared cache is configured; otherwise,
+# this is how long other processes may use an outdated spec.
+SCANNING_SCAN_SPEC_CACHE_TIMEOUT = int(
+    env.get("SCANNING_SCAN_SPEC_CACHE_TIMEOUT", default="300")
+)
+
+## Hosts
+
+# The cache the rendered components of host detail pages are stored in, by its
+# alias in CACHES. See hosts.scan_visualizers.fragment_cache
+SCAN_VISUALIZER_CACHE = env.get("SCAN_VISUALIZER_CACHE", default="default")
+# How long rendered components are cached, in seconds. Scans never change, so this
+# can be long; a new Humitifier version uses new cache entries. During development,
+# templates change without a new version, so nothing is cached by default.
+SCAN_VISUALIZER_CACHE_TIMEOUT = int(
+    env.get("SCAN_VISUALIZER_CACHE_TIMEOUT", default="0" if DEBUG else "604800")
+)
+
+## Search
+
+# How long advanced search results are cached, in seconds. Scans and host changes
+# invalidate the affected results, but this only reaches other processes with a
+# shared cache (CACHE_REDIS_URL); otherwise this is how long a process may show
+# outdated results. Results are therefore only cached by default with a shared
+# cache. 0 disables the cache.
+SEARCH_RESULT_CACHE_TIMEOUT = int(
+    env.get("SEARCH_RESULT_CACHE_TIMEOUT", default="3600" if SHARED_CACHE else "0")
+)
+
+## Alerting
+
+# The executor used to run alert generators. The thread pool executor runs
+# generators concurrently; the serial executor runs them one by one.
+ALERTING_GENERATOR_EXECUTOR = env.get(
+    "ALERTING_GENERATOR_EXECUTOR",
+    default="alerting.backend.executor.ThreadPoolGeneratorExecutor",
+)
+ALERTING_GENERATOR_MAX_WORKERS = int(
+    env.get("ALERTING_GENERATOR_MAX_WORKERS", default="4")
+)
+# Time budget for a single alert generator, in seconds
+ALERTING_GENERATOR_TIMEOUT = float(env.get("ALERTING_GENERATOR_TIMEOUT", default="10"))
+
+### Notifications
+
+# The backend used to send alert digests. Options are:
+# - alerting.notifications.EmailNotificationBackend (uses the email settings below)
+# - alerting.notifications.WebhookNotificationBackend
+# - alerting.notifications.FileNotificationBackend
+# - alerting.notifications.ConsoleNotificationBackend
+ALERTING_NOTIFICATION_BACKEND = env.get(
+    "ALERTING_NOTIFICATION_BACKEND",
+    default="alerting.notifications.ConsoleNotificationBackend",
+)
+# Recipients of all digests, in addition to the contact of a host
+ALERTING_NOTIFICATION_RECIPIENTS = [
+    recipient.strip()
+    for recipient in env.get("ALERTING_NOTIFICATION_RECIPIENTS", default="").split(",")
+    if recipient.strip()
+]
+ALERTING_NOTIFICATION_FROM_EMAIL = env.get(
+    "ALERTING_NOTIFICATION_FROM_EMAIL", default="humitifier@localhost"
+)
+ALERTING_NOTIFICATION_WEBHOOK_URL = env.get(
+    "ALERTING_NOTIFICATION_WEBHOOK_URL", default=None
+)
+ALERTING_NOTIFICATION_FILE_PATH = env.get(
+    "ALERTING_NOTIFICATION_FILE_PATH", default="/tmp/humitifier-notifications.log"
+)
+
+# Email
+
+EMAIL_HOST = env.get("EMAIL_HOST", default="localhost")
+EMAIL_PORT = int(env.get("EMAIL_PORT", default="25"))
+EMAIL_HOST_USER = env.get("EMAIL_HOST_USER", default="")
+EMAIL_HOST_PASSWORD = env.get("EMAIL_HOST_PASSWORD", default="")
+EMAIL_USE_TLS = env.get_boolean("EMAIL_USE_TLS", default=False)
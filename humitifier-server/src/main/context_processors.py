@@ -15,7 +15,9 @@ def layout_context(request):
     user = request.user
 
     hosts = Host.objects.get_for_user(user).exclude(archived=True)
-    all_alerts = Alert.objects.get_for_user(user).filter(acknowledgement=None)
+    alert_counts = (
+        Alert.objects.get_for_user(user).unacknowledged().count_by_severity()
+    )
 
     tag_line = "HumITS CMDB"
 
@@ -139,13 +141,9 @@ def layout_context(request):
     return {
         "layout": {
             "num_hosts": hosts.count(),
-            "num_info_alerts": all_alerts.filter(severity=AlertSeverity.INFO).count(),
-            "num_warning_alerts": all_alerts.filter(
-                severity=AlertSeverity.WARNING
-            ).count(),
-            "num_critical_alerts": all_alerts.filter(
-                severity=AlertSeverity.CRITICAL
-            ).count(),
+            "num_info_alerts": alert_counts[AlertSeverity.INFO],
+            "num_warning_alerts": alert_counts[AlertSeverity.WARNING],
+            "num_critical_alerts": alert_counts[AlertSeverity.CRITICAL],
             "oidc_enabled": oidc_enabled,
             "wild_wasteland": wild_wasteland,
             "gitlab_gag": gitlab_gag,
@@ -0,0 +1,97 @@
+from statistics import median
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Func, IntegerField, Sum
+
+from hosts.models import Host
+from hosts.search import (
+    compile_query,
+    get_scan_field_projections,
+    get_scan_field_values,
+)
+
+DEFAULT_COLUMNS = [
+    "meta.fqdn",
+    "facts.generic.HostnameCtl.os",
+    "facts.generic.Hardware.num_cpus",
+    "facts.generic.PackageList[].name",
+]
+
+
+class _TextSize(Func):
+    """The size of the text representation of a value, as sent to the client"""
+
+    template = "octet_length(%(expressions)s::text)"
+    output_field = IntegerField()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares extracting advanced search columns in Python with selecting them "
+        "in the database. Use fake_hosts to generate a fleet to benchmark on."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--columns",
+            default=",".join(DEFAULT_COLUMNS),
+            help="Comma separated field ids to extract",
+        )
+        parser.add_argument("--query", help="Only use the hosts matching this query")
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="The number of times to run each method",
+        )
+
+    def handle(self, *args, **options):
+        columns = [column for column in options["columns"].split(",") if column]
+        hosts = Host.objects.all()
+
+        if options["query"]:
+            try:
+                hosts = compile_query(options["query"]).apply(hosts)
+            except ValueError as e:
+                raise CommandError(f"Invalid query: {e}")
+
+        num_hosts = hosts.count()
+        if not num_hosts:
+            raise CommandError("No hosts found, create some using fake_hosts")
+
+        self.stdout.write(f"Extracting {len(columns)} column(s) for {num_hosts} hosts")
+
+        projections = get_scan_field_projections(columns)
+
+        python_size = hosts.aggregate(size=Sum(_TextSize("last_scan_cache")))["size"]
+        database_size = sum(
+            hosts.aggregate(size=Sum(_TextSize(expression)))["size"] or 0
+            for expression in projections.values()
+        )
+
+        self._report(
+            "Python",
+            python_size,
+            lambda: get_scan_field_values(list(hosts), columns),
+            options["repeat"],
+        )
+        self._report(
+            "Database",
+            database_size,
+            lambda: get_scan_field_values(hosts, columns),
+            options["repeat"],
+        )
+
+    def _report(self, name, size, run, repeat):
+        timings = []
+        for _ in range(max(repeat, 1)):
+            start = perf_counter()
+            run()
+            timings.append(perf_counter() - start)
+
+        self.stdout.write(
+            f"{name}: {(size or 0) / 1024:.0f} KiB of scan data, "
+            f"median {median(timings) * 1000:.0f} ms, "
+            f"best {min(timings) * 1000:.0f} ms"
+        )
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from hosts.models import Host
+from hosts.search import compile_query
+
+
+class Command(BaseCommand):
+    help = (
+        "Prints the SQL generated for an advanced search query, and how the "
+        "database executes it. Use this to diagnose slow searches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "query",
+            help="The search query, e.g. "
+            "\"facts.generic.HostnameCtl.os contains 'Ubuntu'\"",
+        )
+        parser.add_argument(
+            "--include-archived",
+            action="store_true",
+            help="Also search archived hosts, like the advanced search option",
+        )
+        parser.add_argument(
+            "--no-analyze",
+            action="store_true",
+            help="Only show the plan, without running the query",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            plan = compile_query(options["query"])
+        except ValueError as e:
+            raise CommandError(f"Invalid query: {e}")
+
+        hosts = Host.objects.all()
+        if not options["include_archived"]:
+            hosts = hosts.exclude(archived=True)
+
+        # The same query the advanced search runs, see get_search_results
+        queryset = plan.apply(hosts).order_by().values_list("fqdn", "pk")
+        sql, params = queryset.query.sql_with_params()
+
+        self.stdout.write("SQL:")
+        self.stdout.write(sql)
+        self.stdout.write("")
+        self.stdout.write("Parameters:")
+        for i, param in enumerate(params, start=1):
+            self.stdout.write(f"  {i}: {param!r}")
+        self.stdout.write("")
+
+        if options["no_analyze"]:
+            self.stdout.write("EXPLAIN:")
+            self.stdout.write(queryset.explain())
+        else:
+            self.stdout.write("EXPLAIN ANALYZE:")
+            self.stdout.write(queryset.explain(analyze=True, buffers=True))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from hosts.models import PackageCount, rebuild_package_counts
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the package counts of the inventory from the packages of all "
+        "hosts. The counts are kept up to date with the scans, so this is only "
+        "needed if they ever drift."
+    )
+
+    def handle(self, *args, **options):
+        rebuild_package_counts()
+
+        self.stdout.write(f"Counted {PackageCount.objects.count()} packages")
@@ -228,7 +228,7 @@ class DashboardView(LoginRequiredMixin, FilteredListView):
         filtered_qs = self.filterset.qs
         # We're going to need the data for the alerts in the template
         # So, let's prefetch it here for _performance_
-        filtered_qs = filtered_qs.select_related("host")
+        filtered_qs = filtered_qs.select_related("host").with_acknowledgement()
 
         return filtered_qs.distinct()
 
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ScanningConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "scanning"
+
+    def ready(self):
+        import scanning.signals  # NoQA
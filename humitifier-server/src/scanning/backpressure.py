@@ -0,0 +1,30 @@
+from celery import current_app
+
+from humitifier_common.celery.task_routes import SCANNER_QUEUE
+from humitifier_server.logger import logger
+
+
+def get_queue_depth(queue: str = SCANNER_QUEUE) -> int | None:
+    """
+    Returns the number of messages waiting in a broker queue. Messages that were
+    already delivered to a worker (including scans waiting for their ETA) are not
+    included; those are covered by the in-flight count of the scheduler.
+
+    :param queue: The name of the queue
+    :return: The number of waiting messages, or None if the broker could not be
+        queried.
+    """
+    try:
+        with current_app.connection_for_read() as connection:
+            try:
+                result = connection.default_channel.queue_declare(
+                    queue=queue, passive=True
+                )
+            except connection.channel_errors:
+                # The queue does not exist (yet), so nothing is waiting
+                return 0
+
+            return result.message_count
+    except Exception as e:
+        logger.warning(f"Could not determine the depth of queue {queue}: {e}")
+        return None
@@ -0,0 +1,320 @@
+"""
+Adaptive scan cadence.
+
+Instead of collecting every artefact of a host on every scan, we keep track of when
+every artefact was last collected and how often it changes. Metrics are collected
+at a fixed interval, while facts are collected less often the more stable they
+turn out to be. Scheduled scans only request the artefacts that are due; their
+results are merged with the previous scan of the host, so the rest of the
+application always sees a complete scan.
+
+The statistics are stored on the host, in the following format::
+
+    {
+        "<artefact name>": {
+            "last_collected": "<ISO datetime>",
+            "change_rate": <float between 0 and 1>,
+        },
+    }
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Iterable
+
+from django.conf import settings
+from django.utils import timezone
+from pydantic import ValidationError
+
+from humitifier_common.artefacts import registry
+from humitifier_common.artefacts.registry.registry import ArtefactType
+from humitifier_common.scan_data import ScanInput, ScanOutput
+from humitifier_server.logger import logger
+
+if TYPE_CHECKING:
+    from hosts.models import Host
+
+# The weight of the latest observation in the change rate of an artefact. Higher
+# values adapt faster to changed behaviour, but are more sensitive to noise.
+CHANGE_RATE_SMOOTHING = 0.25
+
+# Artefacts that will become due within this share of their interval are collected
+# together with the artefacts that are due, to prevent a separate scan for them.
+DUE_TOLERANCE = 0.25
+
+
+@dataclass(frozen=True)
+class ScanCadence:
+    """
+    How often the artefacts of a host should be collected.
+
+    Metrics are collected every `metric_interval`. Facts are collected somewhere
+    between `min_fact_interval` and `max_fact_interval`, depending on how often
+    they changed in previous scans; a fact that changes on every scan is collected
+    every `min_fact_interval`, a fact that never changes every `max_fact_interval`.
+    Artefacts in `artefact_intervals` are always collected at their given interval.
+    """
+
+    metric_interval: timedelta
+    min_fact_interval: timedelta
+    max_fact_interval: timedelta
+    artefact_intervals: dict[str, timedelta] = field(default_factory=dict)
+
+    @classmethod
+    def default(cls) -> "ScanCadence":
+        return cls(
+            metric_interval=timedelta(
+                minutes=settings.SCANNING_METRIC_SCAN_INTERVAL_MINUTES
+            ),
+            min_fact_interval=timedelta(
+                minutes=settings.SCANNING_MIN_FACT_SCAN_INTERVAL_MINUTES
+            ),
+            max_fact_interval=timedelta(
+                minutes=settings.SCANNING_MAX_FACT_SCAN_INTERVAL_MINUTES
+            ),
+        )
+
+    def get_interval(self, artefact_name: str, statistics: dict) -> timedelta:
+        if artefact_name in self.artefact_intervals:
+            return self.artefact_intervals[artefact_name]
+
+        artefact = registry.get(artefact_name)
+        if artefact is not None and artefact.__artefact_type__ == ArtefactType.METRIC:
+            return self.metric_interval
+
+        # Artefacts we know nothing about yet are considered volatile
+        change_rate = statistics.get(artefact_name, {}).get("change_rate", 1.0)
+        max_interval = max(self.max_fact_interval, self.min_fact_interval)
+
+        return max_interval - (max_interval - self.min_fact_interval) * change_rate
+
+
+def _get_last_collected(statistics: dict, artefact_name: str) -> datetime | None:
+    last_collected = statistics.get(artefact_name, {}).get("last_collected")
+    if last_collected is None:
+        return None
+
+    return datetime.fromisoformat(last_collected)
+
+
+def get_due_at(
+    artefact_name: str, cadence: ScanCadence, statistics: dict
+) -> datetime | None:
+    """
+    Returns when an artefact should be collected again, or None if it was never
+    collected.
+    """
+    last_collected = _get_last_collected(statistics, artefact_name)
+    if last_collected is None:
+        return None
+
+    return last_collected + cadence.get_interval(artefact_name, statistics)
+
+
+def get_due_artefacts(
+    artefact_names: Iterable[str],
+    cadence: ScanCadence,
+    statistics: dict,
+    now: datetime | None = None,
+) -> list[str]:
+    """
+    Returns the artefacts that are due for collection, including the ones that will
+    become due soon (see DUE_TOLERANCE).
+    """
+    now = now or timezone.now()
+    due = []
+
+    for artefact_name in artefact_names:
+        last_collected = _get_last_collected(statistics, artefact_name)
+        if last_collected is None:
+            due.append(artefact_name)
+            continue
+
+        interval = cadence.get_interval(artefact_name, statistics)
+        if last_collected + interval * (1 - DUE_TOLERANCE) <= now:
+            due.append(artefact_name)
+
+    return due
+
+
+def get_next_scan_at(
+    artefact_names: Iterable[str],
+    cadence: ScanCadence,
+    statistics: dict,
+    now: datetime | None = None,
+) -> datetime:
+    """
+    Returns when the first of the given artefacts will be due for collection.
+    """
+    now = now or timezone.now()
+    due_dates = [
+        get_due_at(artefact_name, cadence, statistics) or now
+        for artefact_name in artefact_names
+    ]
+
+    return min(due_dates, default=now + cadence.max_fact_interval)
+
+
+def build_partial_scan_input(
+    scan_input: ScanInput,
+    cadence: ScanCadence,
+    statistics: dict,
+    now: datetime | None = None,
+) -> ScanInput:
+    """
+    Reduces a scan input to the artefacts that are due. If all artefacts are due,
+    or none are, the full scan input is returned.
+
+    The other artefacts are passed as available artefacts, so the scanner can still
+    collect the ones that are required by a due artefact.
+    """
+    due = get_due_artefacts(scan_input.artefacts, cadence, statistics, now)
+    if not due or len(due) == len(scan_input.artefacts):
+        return scan_input
+
+    return ScanInput(
+        hostname=scan_input.hostname,
+        artefacts={
+            name: options
+            for name, options in scan_input.artefacts.items()
+            if name in due
+        },
+        partial=True,
+        available_artefacts={
+            name: options
+            for name, options in scan_input.artefacts.items()
+            if name not in due
+        },
+    )
+
+
+def update_statistics(
+    statistics: dict,
+    scan_output: ScanOutput,
+    previous_scan: dict | None,
+) -> dict:
+    """
+    Updates the statistics with the artefacts collected in a scan. The change rate
+    of every artefact is an exponentially weighted moving average of whether it
+    changed compared to the previous scan.
+
+    :param statistics: The current statistics of the host
+    :param scan_output: The new scan
+    :param previous_scan: The (JSON) data of the previous scan, if any
+    :return: The updated statistics
+    """
+    statistics = dict(statistics or {})
+    previous_scan = previous_scan or {}
+    scan_data = scan_output.model_dump(mode="json", include={"facts", "metrics"})
+    failed_artefacts = {error.artefact for error in scan_output.errors}
+
+    for artefact_name in scan_output.original_input.artefacts:
+        # Artefacts that failed count as collected, so they are not retried on
+        # every scheduler run. We just don't learn anything from them.
+        artefact_statistics = {
+            **statistics.get(artefact_name, {}),
+            "last_collected": scan_output.scan_date.isoformat(),
+        }
+        statistics[artefact_name] = artefact_statistics
+
+        if artefact_name in failed_artefacts:
+            continue
+
+        for kind in ["facts", "metrics"]:
+            if artefact_name in scan_data[kind]:
+                value = scan_data[kind][artefact_name]
+                previous_value = (previous_scan.get(kind) or {}).get(artefact_name)
+                break
+        else:
+            continue
+
+        changed = 1.0 if previous_value is None or value != previous_value else 0.0
+        change_rate = artefact_statistics.get("change_rate", 1.0)
+        artefact_statistics["change_rate"] = change_rate + CHANGE_RATE_SMOOTHING * (
+            changed - change_rate
+        )
+
+    return statistics
+
+
+def merge_partial_scan(
+    scan_output: ScanOutput,
+    previous_scan: dict | None,
+    configured_artefacts: Iterable[str],
+) -> ScanOutput:
+    """
+    Completes a partial scan with the artefacts of the previous scan that were not
+    requested this time. Only artefacts that are still configured for the host are
+    carried over. Merging an already merged scan is a no-op.
+
+    :param scan_output: The (partial) scan output
+    :param previous_scan: The (JSON) data of the previous scan, if any
+    :param configured_artefacts: The artefacts configured for the host
+    :return: The merged scan output
+    """
+    if not scan_output.original_input.partial or not previous_scan:
+        return scan_output
+
+    # Version 1 scans can't be merged with the current format
+    if previous_scan.get("version", 1) < 2:
+        return scan_output
+
+    requested = set(scan_output.original_input.artefacts)
+    configured = set(configured_artefacts)
+    data = scan_output.model_dump(mode="json")
+
+    for kind in ["facts", "metrics"]:
+        for artefact_name, value in (previous_scan.get(kind) or {}).items():
+            if artefact_name in requested or artefact_name in data[kind]:
+                continue
+            if artefact_name not in configured:
+                continue
+
+            data[kind][artefact_name] = value
+
+    try:
+        return ScanOutput.model_validate(data)
+    except ValidationError:
+        logger.warning(
+            f"Could not merge partial scan of {scan_output.hostname} with the "
+            f"previous scan; using the partial scan as is"
+        )
+        return scan_output
+
+
+##
+## Host helpers
+##
+
+
+def merge_host_scan(host: "Host", scan_output: ScanOutput) -> ScanOutput:
+    """Merges a partial scan with the last scan of the host"""
+    if not scan_output.original_input.partial:
+        return scan_output
+
+    scan_spec = host.get_resolved_scan_spec()
+    configured_artefacts = scan_spec.artefacts if scan_spec else []
+
+    return merge_partial_scan(scan_output, host.last_scan_cache, configured_artefacts)
+
+
+def update_host_cadence(host: "Host", scan_output: ScanOutput):
+    """
+    Updates the scan statistics and next scan date of a host with a new scan. The
+    host is not saved.
+    """
+    host.scan_statistics = update_statistics(
+        host.scan_statistics, scan_output, host.last_scan_cache
+    )
+
+    scan_spec = host.get_resolved_scan_spec()
+    if scan_spec is None:
+        host.next_scan_at = None
+        return
+
+    host.next_scan_at = get_next_scan_at(
+        scan_spec.artefacts,
+        scan_spec.cadence,
+        host.scan_statistics,
+        now=scan_output.scan_date,
+    )
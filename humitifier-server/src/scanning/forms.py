@@ -20,6 +20,9 @@ class ScanSpecForm(forms.ModelForm):
             "name",
             "parent",
             "artefact_groups",
+            "metric_scan_interval",
+            "min_fact_scan_interval",
+            "max_fact_scan_interval",
         ]
         widgets = {
             "artefact_groups": forms.CheckboxSelectMultiple,
@@ -34,6 +37,19 @@ class ScanSpecForm(forms.ModelForm):
         ]
         self.fields["artefact_groups"].required = False
 
+    def clean(self):
+        cleaned_data = super().clean()
+
+        min_interval = cleaned_data.get("min_fact_scan_interval")
+        max_interval = cleaned_data.get("max_fact_scan_interval")
+        if min_interval and max_interval and min_interval > max_interval:
+            self.add_error(
+                "max_fact_scan_interval",
+                "The maximum interval must not be shorter than the minimum interval",
+            )
+
+        return cleaned_data
+
 
 class ArtefactSpecForm(forms.ModelForm):
     class Meta:
@@ -41,6 +57,7 @@ class ArtefactSpecForm(forms.ModelForm):
         fields = [
             "artefact_name",
             "knockout",
+            "scan_interval",
             "scan_spec",
         ]
         widgets = {
@@ -1,47 +1,129 @@
+from argparse import ArgumentTypeError
+
 from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
 
 from hosts.models import Host
-from humitifier_server import settings
+from hosts.search import compile_query
+
+
+def _non_negative_int(value: str) -> int:
+    try:
+        number = int(value)
+        if number < 0:
+            raise ValueError
+    except ValueError:
+        raise ArgumentTypeError(f"invalid value {value}, use a non-negative integer")
+
+    return number
+
+
+def _positive_int(value: str) -> int:
+    try:
+        number = int(value)
+        if number < 1:
+            raise ValueError
+    except ValueError:
+        raise ArgumentTypeError(f"invalid value {value}, use a positive integer")
+
+    return number
 
 
 class Command(BaseCommand):
+    help = (
+        "Queues full scans for the selected hosts. Selection options can be "
+        "combined; hosts must match all of them."
+    )
 
     def add_arguments(self, parser):
-        parser.add_argument("--host")
-        parser.add_argument("--force", action="store_true")
-        parser.add_argument("--all", action="store_true")
-        parser.add_argument("--delay")
+        parser.add_argument("--host", help="Scan the host with this FQDN")
+        parser.add_argument("--all", action="store_true", help="Scan all hosts")
+        parser.add_argument(
+            "--query",
+            help="Scan the hosts matching this search query, e.g. "
+            "\"facts.generic.HostnameCtl.os contains 'Ubuntu'\"",
+        )
+        parser.add_argument(
+            "--data-source", help="Scan the hosts of the data source with this name"
+        )
+        parser.add_argument("--customer", help="Scan the hosts of this customer")
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Also scan hosts of data sources that don't allow scheduled scans",
+        )
+        parser.add_argument(
+            "--delay",
+            type=_non_negative_int,
+            default=0,
+            help="Seconds to wait before the first scan starts",
+        )
+        parser.add_argument(
+            "--window",
+            type=_non_negative_int,
+            default=0,
+            help="Seconds to spread the scans over",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=_positive_int,
+            default=500,
+            help="The number of scans to send to the broker at once",
+        )
 
     def handle(self, *args, **options):
-        from scanning.utils import start_full_scan
+        from scanning.utils import start_bulk_scans
 
-        if options["all"]:
-            hosts = Host.objects.all()
-        else:
-            hosts = Host.objects.filter(fqdn=options["host"])
+        hosts = self._get_hosts(options)
 
-        if not hosts:
+        num_hosts = hosts.count()
+        if not num_hosts:
             raise CommandError("No hosts found")
 
-        for host in hosts:
-            if not host.can_schedule_scan:
-                if not settings.DEBUG and not options["force"]:
-                    print(
-                        host.fqdn,
-                        "Cannot queue scans for hosts using non-scheduled scheduling",
-                    )
-
-            delay = None
-            if options["delay"]:
-                try:
-                    delay = int(options["delay"])
-                    if delay < 0:
-                        raise ValueError
-                except ValueError:
-                    raise CommandError(
-                        "Invalid value for delay, please use a positive integer"
-                    )
-
-            task = start_full_scan(host, force=options["force"], delay_seconds=delay)
-
-            print("Queued task: {}".format(task))
+        started = start_bulk_scans(
+            hosts,
+            force=options["force"],
+            delay_seconds=options["delay"],
+            window_seconds=options["window"],
+            chunk_size=options["chunk_size"],
+        )
+
+        self.stdout.write(f"Queued {len(started)} scan(s)")
+        if len(started) < num_hosts:
+            self.stdout.write(
+                f"Skipped {num_hosts - len(started)} host(s) that are archived, "
+                f"offline, already being scanned or not schedulable"
+            )
+
+    def _get_hosts(self, options):
+        if not any(
+            options[option]
+            for option in ["host", "all", "query", "data_source", "customer"]
+        ):
+            raise CommandError(
+                "Select hosts using --host, --all, --query, --data-source or "
+                "--customer"
+            )
+
+        hosts = Host.objects.all()
+
+        if options["host"]:
+            hosts = hosts.filter(fqdn=options["host"])
+
+        if options["data_source"]:
+            hosts = hosts.filter(data_source__name=options["data_source"])
+
+        if options["customer"]:
+            # Customers imported from some sources are quoted
+            customer = options["customer"]
+            hosts = hosts.filter(Q(customer=customer) | Q(customer=f'"{customer}"'))
+
+        if options["query"]:
+            try:
+                plan = compile_query(options["query"])
+            except ValueError as e:
+                raise CommandError(f"Invalid query: {e}")
+
+            hosts = plan.apply(hosts)
+
+        return hosts
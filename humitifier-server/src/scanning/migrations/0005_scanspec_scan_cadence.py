@@ -0,0 +1,43 @@
+# Generated by Django 5.2.9 on 2026-10-19 11:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scanning", "0004_alter_artefactspec_knockout"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="scanspec",
+            name="metric_scan_interval",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="How often metrics are collected. Leave empty to inherit.",
+                null=True,
+                verbose_name="Metric scan interval (minutes)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="scanspec",
+            name="min_fact_scan_interval",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="How often facts that change on every scan are collected. Leave empty to inherit.",
+                null=True,
+                verbose_name="Minimum fact scan interval (minutes)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="scanspec",
+            name="max_fact_scan_interval",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="How often facts that never change are collected. Leave empty to inherit.",
+                null=True,
+                verbose_name="Maximum fact scan interval (minutes)",
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scanning", "0005_scanspec_scan_cadence"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="artefactspec",
+            name="scan_interval",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="If set, this artefact is always collected at this interval, instead of the interval determined by the scan cadence of the spec.",
+                null=True,
+                verbose_name="Scan interval (minutes)",
+            ),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.9 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scanning", "0006_artefactspec_scan_interval"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScanSchedulerState",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("tokens", models.FloatField(default=0)),
+                ("refilled_at", models.DateTimeField(null=True)),
+            ],
+        ),
+    ]
@@ -1,6 +1,8 @@
+from datetime import timedelta
 from pprint import pformat
 from typing import TYPE_CHECKING
 
+from django.conf import settings
 from django.db import models
 from django.contrib.postgres.fields import ArrayField
 from django.utils.functional import cached_property
@@ -11,6 +13,7 @@ if TYPE_CHECKING:
 
 from humitifier_common.artefacts import registry
 from humitifier_common.scan_data import ArtefactScanOptions, ScanInput
+from scanning.cadence import ScanCadence, build_partial_scan_input
 
 
 class ScanSpec(models.Model):
@@ -34,6 +37,35 @@ class ScanSpec(models.Model):
         blank=True,
     )
 
+    ##
+    ## Cadence
+    ## Empty values are inherited from the parent, or from the settings if no
+    ## parent sets them. See scanning.cadence
+    ##
+
+    metric_scan_interval = models.PositiveIntegerField(
+        "Metric scan interval (minutes)",
+        help_text="How often metrics are collected. Leave empty to inherit.",
+        null=True,
+        blank=True,
+    )
+
+    min_fact_scan_interval = models.PositiveIntegerField(
+        "Minimum fact scan interval (minutes)",
+        help_text="How often facts that change on every scan are collected. Leave "
+        "empty to inherit.",
+        null=True,
+        blank=True,
+    )
+
+    max_fact_scan_interval = models.PositiveIntegerField(
+        "Maximum fact scan interval (minutes)",
+        help_text="How often facts that never change are collected. Leave empty to "
+        "inherit.",
+        null=True,
+        blank=True,
+    )
+
     @cached_property
     def inherited_artefact_groups(self):
         if self.parent:
@@ -86,12 +118,66 @@ class ScanSpec(models.Model):
 
         return artefacts
 
-    def build_scan_input(self, host: "Host") -> ScanInput:
-        return ScanInput(
+    def _get_inherited_interval(self, field: str, default: int) -> timedelta:
+        spec = self
+        while spec is not None:
+            if (value := getattr(spec, field)) is not None:
+                return timedelta(minutes=value)
+            spec = spec.parent
+
+        return timedelta(minutes=default)
+
+    def _get_artefact_intervals(self) -> dict[str, timedelta]:
+        intervals = {}
+
+        if self.parent:
+            intervals = self.parent._get_artefact_intervals()
+
+        for artefact in self.artefacts.all():
+            if artefact.scan_interval is not None:
+                intervals[artefact.artefact_name] = timedelta(
+                    minutes=artefact.scan_interval
+                )
+
+        return intervals
+
+    def get_scan_cadence(self) -> ScanCadence:
+        return ScanCadence(
+            metric_interval=self._get_inherited_interval(
+                "metric_scan_interval",
+                settings.SCANNING_METRIC_SCAN_INTERVAL_MINUTES,
+            ),
+            min_fact_interval=self._get_inherited_interval(
+                "min_fact_scan_interval",
+                settings.SCANNING_MIN_FACT_SCAN_INTERVAL_MINUTES,
+            ),
+            max_fact_interval=self._get_inherited_interval(
+                "max_fact_scan_interval",
+                settings.SCANNING_MAX_FACT_SCAN_INTERVAL_MINUTES,
+            ),
+            artefact_intervals=self._get_artefact_intervals(),
+        )
+
+    def build_scan_input(self, host: "Host", *, partial: bool = False) -> ScanInput:
+        """
+        Builds the scan input for a host.
+
+        :param host: The host to scan
+        :param partial: Only request the artefacts that are due according to the
+            scan cadence of this spec and the statistics of the host.
+        """
+        scan_input = ScanInput(
             hostname=host.fqdn,
             artefacts=self._build_artefact_scan_input(),
         )
 
+        if partial:
+            scan_input = build_partial_scan_input(
+                scan_input, self.get_scan_cadence(), host.scan_statistics
+            )
+
+        return scan_input
+
     def preview(self):
         return pformat(
             ScanInput(
@@ -167,6 +253,14 @@ class ArtefactSpec(models.Model):
         default=False,
     )
 
+    scan_interval = models.PositiveIntegerField(
+        "Scan interval (minutes)",
+        help_text="If set, this artefact is always collected at this interval, "
+        "instead of the interval determined by the scan cadence of the spec.",
+        null=True,
+        blank=True,
+    )
+
     scan_spec = models.ForeignKey(
         ScanSpec,
         on_delete=models.CASCADE,
@@ -182,3 +276,14 @@ class ArtefactSpec(models.Model):
         options = self._scan_options if isinstance(self._scan_options, dict) else {}
 
         return ArtefactScanOptions(**options)
+
+
+class ScanSchedulerState(models.Model):
+    """
+    The token bucket of the scan scheduler, see scanning.scheduling. There is only
+    a single row, which also serializes concurrent runs of the scheduler.
+    """
+
+    tokens = models.FloatField(default=0)
+
+    refilled_at = models.DateTimeField(null=True)
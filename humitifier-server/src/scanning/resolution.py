@@ -0,0 +1,98 @@
+"""
+Cached scan spec resolution.
+
+Resolving a scan spec walks its parent chain and queries the artefacts of every
+level. As every scan needs a resolved spec, resolved specs are compiled once and
+cached. All cached specs are invalidated whenever any ScanSpec or ArtefactSpec
+changes (see scanning.signals); changes are rare, and a child spec depends on all
+of its parents.
+
+Invalidation works by replacing a generation token that is part of every cache
+key. This only reaches other processes if a shared cache is configured, so cached
+specs also expire after SCANNING_SCAN_SPEC_CACHE_TIMEOUT seconds.
+"""
+
+import uuid
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from humitifier_common.scan_data import ArtefactScanOptions, ScanInput
+from scanning.cadence import ScanCadence, build_partial_scan_input
+from scanning.models import ScanSpec
+
+if TYPE_CHECKING:
+    from hosts.models import Host
+
+GENERATION_CACHE_KEY = "scanning:scan_spec_generation"
+
+
+@dataclass(frozen=True)
+class ResolvedScanSpec:
+    """A scan spec with everything it inherits flattened in"""
+
+    pk: int
+    name: str
+    artefacts: dict[str, ArtefactScanOptions]
+    cadence: ScanCadence
+
+    @classmethod
+    def from_scan_spec(cls, scan_spec: ScanSpec) -> "ResolvedScanSpec":
+        return cls(
+            pk=scan_spec.pk,
+            name=scan_spec.name,
+            artefacts=scan_spec._build_artefact_scan_input(),
+            cadence=scan_spec.get_scan_cadence(),
+        )
+
+    def build_scan_input(self, host: "Host", *, partial: bool = False) -> ScanInput:
+        """See ScanSpec.build_scan_input"""
+        scan_input = ScanInput(hostname=host.fqdn, artefacts=dict(self.artefacts))
+
+        if partial:
+            scan_input = build_partial_scan_input(
+                scan_input, self.cadence, host.scan_statistics
+            )
+
+        return scan_input
+
+
+def _get_generation() -> str:
+    return cache.get_or_set(GENERATION_CACHE_KEY, lambda: uuid.uuid4().hex, None)
+
+
+def _invalidate():
+    cache.set(GENERATION_CACHE_KEY, uuid.uuid4().hex, None)
+
+
+def invalidate_resolved_scan_specs():
+    """
+    Invalidates all cached scan specs. This is done both right away and after the
+    current transaction commits, as a spec resolved in between would be cached with
+    the old data.
+    """
+    _invalidate()
+    transaction.on_commit(_invalidate)
+
+
+def get_resolved_scan_spec(pk: int) -> ResolvedScanSpec | None:
+    """
+    Returns the resolved scan spec with the given pk from the cache, resolving it
+    if needed.
+    """
+    key = f"scanning:scan_spec:{pk}:{_get_generation()}"
+
+    resolved = cache.get(key)
+    if resolved is None:
+        try:
+            scan_spec = ScanSpec.objects.get(pk=pk)
+        except ScanSpec.DoesNotExist:
+            return None
+
+        resolved = ResolvedScanSpec.from_scan_spec(scan_spec)
+        cache.set(key, resolved, settings.SCANNING_SCAN_SPEC_CACHE_TIMEOUT)
+
+    return resolved
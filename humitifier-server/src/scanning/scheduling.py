@@ -0,0 +1,339 @@
+import math
+import uuid
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q, QuerySet
+from django.utils import timezone
+from django_celery_beat.models import PeriodicTask
+
+from hosts.models import DataSource, Host, ScanScheduling
+from humitifier_server.celery.task_names import SCANNING_FULL_SCAN_SCHEDULER
+from humitifier_server.logger import logger
+from scanning.backpressure import get_queue_depth
+from scanning.models import ScanSchedulerState
+from scanning.utils import _start_scan
+
+
+@dataclass
+class ScheduledScan:
+    host: Host
+    delay_seconds: int
+    lease_token: uuid.UUID | None = None
+
+
+class ScanScheduler:
+    """
+    Schedules scans for all schedulable hosts, spread evenly over the scan interval.
+
+    The scheduler is meant to be run frequently, every `run_interval`. Instead of
+    scheduling every host that is due at once, the scheduler uses a token bucket that
+    refills at `num_hosts / scan_interval`, based on the time that actually passed
+    since the previous run. Tokens that a run could not use (because not enough
+    hosts were due, or because of the concurrency limits) carry over to later runs,
+    up to `max_batch_size`. Within a run, every host gets a fixed slot based on its
+    name, so scans are spread over the run interval as well.
+
+    Hosts are locked using `SELECT ... FOR UPDATE SKIP LOCKED` while being scheduled,
+    so two concurrent runs will never schedule the same host.
+
+    :param scan_interval: How often every host should be scanned. Hosts that have
+        been scanned before are scanned according to their scan cadence instead
+        (see scanning.cadence), in which case this is only used to retry scans
+        that did not return results. Should not be shorter than the shortest scan
+        cadence interval, as it also determines the budget of a run.
+    :param run_interval: How often the scheduler runs, see get_run_interval. The
+        first run fills the token bucket for one run interval.
+    :param max_batch_size: The maximum number of hosts to schedule in a single run,
+        which is also the size of the token bucket
+    :param max_concurrent_scans: The maximum number of scans that may be in flight
+        on the scanner queue at once. None means unlimited.
+    :param in_flight_timeout: How long after being scheduled a scan without results
+        is still considered to be in flight
+    :param max_queue_depth: The maximum number of scans that may be waiting on the
+        scanner queue of the broker. If the scanners can't keep up (or are down),
+        no new scans are dispatched until the queue drains. None means unlimited.
+    :param now: The current time, mainly useful for testing
+    """
+
+    def __init__(
+        self,
+        *,
+        scan_interval: timedelta,
+        run_interval: timedelta,
+        max_batch_size: int,
+        max_concurrent_scans: int | None = None,
+        in_flight_timeout: timedelta | None = None,
+        max_queue_depth: int | None = None,
+        now: datetime | None = None,
+    ):
+        self.scan_interval = scan_interval
+        self.run_interval = run_interval
+        self.max_batch_size = max_batch_size
+        self.max_concurrent_scans = max_concurrent_scans
+        self.in_flight_timeout = in_flight_timeout or timedelta(
+            minutes=settings.SCANNING_IN_FLIGHT_TIMEOUT_MINUTES
+        )
+        self.max_queue_depth = max_queue_depth
+        self.now = now or timezone.now()
+
+    ##
+    ## Querysets
+    ##
+
+    def get_scheduled_hosts(self) -> QuerySet[Host]:
+        """
+        All hosts that are scanned by the scheduler, regardless of when, including
+        the hosts that are being scanned right now
+        """
+        return (
+            Host.objects.filter(
+                # Ignore any host that is not explicitly marked as auto-schedulable
+                data_source__scan_scheduling=ScanScheduling.SCHEDULED,
+                archived=False,
+            )
+            # Offline hosts can't be scanned anyway
+            .online()
+            # Ignore hosts we're backing off from after repeated failures
+            .filter(Q(scan_backoff_until=None) | Q(scan_backoff_until__lte=self.now))
+        )
+
+    def get_schedulable_hosts(self) -> QuerySet[Host]:
+        """All hosts that are scanned by the scheduler, and not being scanned now"""
+        return self.get_scheduled_hosts().filter(
+            Q(scan_lease_until=None) | Q(scan_lease_until__lte=self.now)
+        )
+
+    def get_due_hosts(self) -> QuerySet[Host]:
+        """
+        All schedulable hosts that are due for a scan, the most overdue first.
+
+        Hosts that have been scanned know when their first artefact is due again
+        (see scanning.cadence). Other hosts are due once every scan interval.
+        """
+        threshold = self.now - self.scan_interval
+
+        return (
+            self.get_schedulable_hosts()
+            .filter(
+                Q(next_scan_at__lte=self.now)
+                | Q(
+                    Q(last_scan_scheduled__lte=threshold) | Q(last_scan_scheduled=None),
+                    next_scan_at=None,
+                )
+            )
+            .order_by(
+                F("next_scan_at").asc(nulls_first=True),
+                F("last_scan_scheduled").asc(nulls_first=True),
+                "pk",
+            )
+        )
+
+    def get_in_flight_hosts(self) -> QuerySet[Host]:
+        """
+        All hosts with a scan that was scheduled recently, but for which no results
+        have been received yet.
+        """
+        return Host.objects.filter(
+            last_scan_scheduled__gt=self.now - self.in_flight_timeout,
+        ).filter(
+            Q(last_scan_date=None) | Q(last_scan_date__lt=F("last_scan_scheduled"))
+        )
+
+    ##
+    ## Budget
+    ##
+
+    def refill_bucket(self) -> ScanSchedulerState:
+        """
+        Locks the token bucket, and adds the tokens for the time passed since the
+        previous run. Should be called in a transaction.
+        """
+        state, _ = ScanSchedulerState.objects.select_for_update().get_or_create(pk=1)
+
+        elapsed = self.run_interval
+        if state.refilled_at is not None:
+            elapsed = max(self.now - state.refilled_at, timedelta(0))
+
+        num_hosts = self.get_scheduled_hosts().count()
+        state.tokens = min(
+            state.tokens + num_hosts * (elapsed / self.scan_interval),
+            self.max_batch_size,
+        )
+        state.refilled_at = max(self.now, state.refilled_at or self.now)
+
+        return state
+
+    def get_budget(self, tokens: float) -> int:
+        """
+        The number of hosts this run may schedule; the whole tokens in the bucket,
+        limited by the number of scans in flight and waiting on the broker.
+        """
+        # Tolerate rounding errors, like 1.9999999 tokens
+        budget = math.floor(tokens + 1e-6)
+        if budget <= 0:
+            return 0
+
+        if self.max_concurrent_scans is not None:
+            in_flight = self.get_in_flight_hosts().count()
+            budget = min(budget, max(self.max_concurrent_scans - in_flight, 0))
+
+        if self.max_queue_depth is not None and budget > 0:
+            queue_depth = get_queue_depth()
+            if queue_depth is None:
+                # Sending scans to a broker we can't reach is pointless
+                return 0
+
+            budget = min(budget, max(self.max_queue_depth - queue_depth, 0))
+
+        return budget
+
+    def get_data_source_capacity(self) -> dict[int, int]:
+        """
+        The number of scans that may still be started per data source, for all data
+        sources that limit their number of concurrent scans.
+        """
+        in_flight = {
+            row["data_source"]: row["count"]
+            for row in self.get_in_flight_hosts()
+            .filter(data_source__max_concurrent_scans__isnull=False)
+            .values("data_source")
+            .annotate(count=Count("pk"))
+        }
+
+        return {
+            data_source.pk: max(
+                data_source.max_concurrent_scans - in_flight.get(data_source.pk, 0), 0
+            )
+            for data_source in DataSource.objects.filter(
+                scan_scheduling=ScanScheduling.SCHEDULED,
+                max_concurrent_scans__isnull=False,
+            )
+        }
+
+    ##
+    ## Scheduling
+    ##
+
+    def get_delay(self, host: Host) -> int:
+        """
+        The delay for the scan of a host within the run interval. This is based on
+        the hostname, so a host keeps the same slot between runs.
+        """
+        run_interval_seconds = max(int(self.run_interval.total_seconds()), 1)
+        return zlib.crc32(host.fqdn.encode("utf-8")) % run_interval_seconds
+
+    def select_hosts(self, budget: int) -> list[Host]:
+        """
+        Selects and locks up to `budget` due hosts, respecting the concurrency limits
+        of their data sources. Should be called in a transaction.
+        """
+        capacity = self.get_data_source_capacity()
+        full_data_sources = {pk for pk, free in capacity.items() if free == 0}
+
+        hosts = []
+        while len(hosts) < budget:
+            limit = budget - len(hosts)
+            candidates = list(
+                self.get_due_hosts()
+                .exclude(data_source__in=full_data_sources)
+                .exclude(pk__in=[host.pk for host in hosts])
+                .select_related("data_source")
+                # See start_bulk_scans; the last scan isn't needed to scan a host
+                .defer("last_scan_cache")
+                .select_for_update(skip_locked=True, of=("self",))[:limit]
+            )
+
+            for host in candidates:
+                if host.data_source_id in capacity:
+                    if capacity[host.data_source_id] == 0:
+                        continue
+                    capacity[host.data_source_id] -= 1
+                    if capacity[host.data_source_id] == 0:
+                        full_data_sources.add(host.data_source_id)
+
+                hosts.append(host)
+
+            # Candidates are only skipped once their data source is full, which is
+            # excluded from the next query; otherwise we've run out of due hosts
+            if len(candidates) < limit:
+                break
+
+        return hosts
+
+    def schedule(self) -> list[ScheduledScan]:
+        """
+        Selects the hosts to scan in this run, and marks them as scheduled.
+
+        :return: The scans that should be started. The scans are not started yet;
+            use run() to also start them.
+        """
+        with transaction.atomic():
+            bucket = self.refill_bucket()
+            budget = self.get_budget(bucket.tokens)
+
+            hosts = self.select_hosts(budget) if budget > 0 else []
+
+            bucket.tokens = max(bucket.tokens - len(hosts), 0)
+            bucket.save()
+
+            # The next scan date is updated when the results come in. Until then,
+            # retry after the scan interval in case this scan fails.
+            # All scans of this run share a scan lease, which lasts until the last
+            # possible scan of this run expires.
+            lease_token = uuid.uuid4()
+            Host.objects.filter(pk__in=[host.pk for host in hosts]).update(
+                last_scan_scheduled=self.now,
+                next_scan_at=self.now + self.scan_interval,
+                scan_lease_token=lease_token,
+                scan_lease_until=self.now + self.run_interval + self.in_flight_timeout,
+            )
+
+        return [
+            ScheduledScan(
+                host=host,
+                delay_seconds=self.get_delay(host),
+                lease_token=lease_token,
+            )
+            for host in hosts
+        ]
+
+    def run(self) -> list[ScheduledScan]:
+        """
+        Schedules and starts the scans for this run.
+        """
+        scans = self.schedule()
+
+        for scan in scans:
+            _start_scan(
+                scan.host,
+                delay_seconds=scan.delay_seconds,
+                partial=True,
+                lease_token=scan.lease_token,
+            )
+
+        logger.info(f"Scheduler: scheduled {len(scans)} scans")
+
+        return scans
+
+
+def get_run_interval() -> timedelta:
+    """
+    How often the scheduler runs, according to its periodic task. Falls back to
+    SCANNING_SCHEDULER_RUN_INTERVAL_SECONDS if it doesn't run at a fixed interval.
+    """
+    periodic_task = (
+        PeriodicTask.objects.filter(
+            task=SCANNING_FULL_SCAN_SCHEDULER, enabled=True, interval__isnull=False
+        )
+        .select_related("interval")
+        .first()
+    )
+    if periodic_task is not None:
+        interval = periodic_task.interval
+        return timedelta(**{interval.period: interval.every})
+
+    return timedelta(seconds=settings.SCANNING_SCHEDULER_RUN_INTERVAL_SECONDS)
@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import ArtefactSpec, ScanSpec
+from .resolution import invalidate_resolved_scan_specs
+
+
+@receiver(post_save, sender=ScanSpec)
+@receiver(post_delete, sender=ScanSpec)
+@receiver(post_save, sender=ArtefactSpec)
+@receiver(post_delete, sender=ArtefactSpec)
+def on_scan_spec_changed(sender, **kwargs):
+    """
+    Signal triggered when a scan spec or one of its artefacts is changed, as any
+    resolved spec might depend on it.
+    """
+    invalidate_resolved_scan_specs()
@@ -1,19 +1,28 @@
 from datetime import timedelta
 
 from celery import shared_task
-from django.db.models import Q
-from django.utils import timezone
+from django.conf import settings
 
 from humitifier_common.scan_data import ScanInput, ScanOutput
 
 from humitifier_server.celery.task_names import *
 from humitifier_server.logger import logger
-from hosts.models import Host, ScanScheduling
-from scanning.utils import start_full_scan as queue_full_scan
+from hosts.models import Host
+from hosts.search.result_cache import bump_data_versions, get_changed_artefacts
+from scanning.cadence import merge_host_scan, update_host_cadence
+from scanning.scheduling import ScanScheduler, get_run_interval
+from scanning.utils import get_scan_input
 
 
 @shared_task(name=SCANNING_GET_SCAN_INPUT, pydantic=True)
-def get_scan_input_from_host(fqdn: str, force: bool = False) -> ScanInput:
+def get_scan_input_from_host(
+    fqdn: str, force: bool = False, partial: bool = False
+) -> ScanInput:
+    """
+    Builds the scan input for a host. Scans are started with a pre-built scan input
+    nowadays (see scanning.utils._start_scan); this task is kept for chains that
+    were queued before that change.
+    """
     try:
         # Attempt to fetch the host based on the FQDN. Log an error if the host does not exist.
         host = Host.objects.get(fqdn=fqdn)
@@ -21,21 +30,10 @@ def get_scan_input_from_host(fqdn: str, force: bool = False) -> ScanInput:
         logger.error(f"Start-scan: Host {fqdn} is not found")
         raise e
 
-    # Check if the host's data source allows scheduled scanning, and handle non-schedulable cases unless forced.
-    if (
-        not host.data_source
-        or host.data_source.scan_scheduling != ScanScheduling.SCHEDULED
-    ):
-        if not force:
-            logger.error(f"Start-scan: scan requested for non-schedulable host {fqdn}")
-            raise RuntimeError("Scan requested for non-schedulable host")
-
-    # Prepare the scan input, create a task chain for scanning and processing, and handle potential errors.
-    scan_input = host.get_scan_input()
+    scan_input = get_scan_input(host, force=force, partial=partial)
 
     if not scan_input:
-        logger.error("Start-scan: scan requested for host without scan spec set")
-        raise ValueError("Missing scan spec")
+        raise ValueError(f"Cannot build a scan input for {fqdn}")
 
     return scan_input
 
@@ -52,10 +50,25 @@ def save_scan(scan_output: ScanOutput | None):
         logger.error("Received scan output for unknown host")
         return
 
+    if not host.holds_scan_lease(scan_output.original_input.scan_lease):
+        logger.warning(f"Dropping results of a superseded scan of {host.fqdn}")
+        return
+
     if scan_output.errors:
         logger.error(f"Errors for {host.fqdn}: {scan_output.errors}")
 
-    host.add_scan(scan_output.model_dump(mode="json"))
+    # Partial scans are usually already merged while generating alerts, but scans
+    # can also reach us through other routes. Merging twice is a no-op.
+    scan_output = merge_host_scan(host, scan_output)
+    update_host_cadence(host, scan_output)
+
+    previous_scan = host.last_scan_cache
+    scan_data = scan_output.model_dump(mode="json")
+    if host.add_scan(scan_data):
+        # Only searches on the artefacts that changed need to be recomputed
+        bump_data_versions(get_changed_artefacts(previous_scan, scan_data))
+
+    host.release_scan_lease(scan_output.original_input.scan_lease)
 
 
 @shared_task(name=SCANNING_SCAN_HANDLE_ERROR)
@@ -65,13 +78,17 @@ def on_scan_error(id, **kwargs):
 
 @shared_task(name=SCANNING_FULL_SCAN_SCHEDULER)
 def schedule_full_scans(
-    *, max_batch_size: int = 10, scan_interval_hours: int = 1
+    *,
+    max_batch_size: int = 10,
+    scan_interval_hours: int = 1,
+    run_interval_seconds: int | None = None,
 ) -> str:
     """
-    Schedules full host scans for eligible hosts based on the provided criteria. The
-    function considers only hosts marked as schedulable and checks their last scheduled
-    scan time against a calculated threshold. Hosts that satisfy the conditions are
-    processed up to a specified maximum batch size.
+    Schedules full host scans for eligible hosts, spread evenly over the scan
+    interval. Every run schedules the share of the fleet that needs to be scanned in
+    `run_interval_seconds` to scan every host once per `scan_interval_hours`,
+    prioritizing the hosts that were scanned the furthest back. See ScanScheduler for
+    the details.
 
     :param max_batch_size: The maximum number of hosts that can be scheduled for scans in
         a single execution.
@@ -80,43 +97,28 @@ def schedule_full_scans(
         for scheduling hosts. Only hosts whose last scan was scheduled before this time
         (or never scheduled) are eligible.
     :type scan_interval_hours: int
+    :param run_interval_seconds: How often this task is run, in seconds. By default,
+        this is read from the interval of its periodic task, see get_run_interval.
+    :type run_interval_seconds: int | None
     :return: str
     """
-    # Get a datetime to compare last schedules against. If the last scheduled scan
-    # of a host was before this time, it is deemed 'schedulable'.
-    scan_threshold_datetime = timezone.now() - timedelta(hours=scan_interval_hours)
-
-    schedulable_hosts = (
-        Host.objects.filter(
-            # Ignore any host that is not explicitly marked as auto-schedulable
-            data_source__scan_scheduling=ScanScheduling.SCHEDULED,
-            archived=False,
-        )
-        .filter(
-            # Filter out any that have had a scan scheduled after our threshold
-            Q(last_scan_scheduled__lte=scan_threshold_datetime)
-            |
-            # Also allow those without any previous scan scheduled
-            Q(last_scan_scheduled=None),
-        )
-        .order_by(
-            # Sort by last scan scheduled dt, so we always scan the host that was
-            # scanned the furthest back first.
-            "last_scan_scheduled"
-        )
+    scheduler = ScanScheduler(
+        scan_interval=timedelta(hours=scan_interval_hours),
+        run_interval=(
+            timedelta(seconds=run_interval_seconds)
+            if run_interval_seconds
+            else get_run_interval()
+        ),
+        max_batch_size=max_batch_size,
+        max_concurrent_scans=settings.SCANNING_MAX_CONCURRENT_SCANS,
+        max_queue_depth=settings.SCANNING_MAX_QUEUE_DEPTH,
     )
 
-    if schedulable_hosts.count() == 0:
-        return "No hosts were due for scanning"
+    scans = scheduler.run()
 
-    # Slice our results to a max of max_batch_size if we have more than our max batch
-    # size
-    if schedulable_hosts.count() > max_batch_size:
-        schedulable_hosts = schedulable_hosts[:max_batch_size]
-
-    for host in schedulable_hosts:
-        queue_full_scan(host)
+    if not scans:
+        return "No hosts were due for scanning"
 
     return "Scheduled the following hosts: {}".format(
-        ", ".join([host.fqdn for host in schedulable_hosts])
+        ", ".join([scan.host.fqdn for scan in scans])
     )
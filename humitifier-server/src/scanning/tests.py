@@ -1,7 +1,27 @@
-from django.test import TestCase
-from humitifier_common.artefacts import registry
+from datetime import timedelta
+from unittest import mock
 
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django_celery_beat.models import IntervalSchedule, PeriodicTask
+from humitifier_common.artefacts import registry
+from humitifier_common.celery.task_names import SCANNER_RUN_SCAN
+from humitifier_common.celery.task_routes import SCANNER_PRIORITY_QUEUE
+from humitifier_common.scan_data import (
+    ArtefactScanOptions,
+    ScanError,
+    ScanInput,
+    ScanOutput,
+)
+
+from hosts.models import DataSource, Host, ScanScheduling
+from humitifier_server.celery.task_names import SCANNING_FULL_SCAN_SCHEDULER
+from scanning.cadence import merge_host_scan, update_host_cadence
 from scanning.models import ScanSpec, ArtefactSpec
+from scanning.resolution import get_resolved_scan_spec
+from scanning.scheduling import ScanScheduler, get_run_interval
+from scanning.utils import _start_scan, get_scan_input, start_bulk_scans
 
 
 class ScanInputBuildingTestCase(TestCase):
@@ -159,3 +179,638 @@ class ScanInputBuildingTestCase(TestCase):
             len(resolved_scan_artefacts.items()),
             len(registry.get_all_in_group("generic")),
         )
+
+
+@mock.patch("scanning.scheduling._start_scan")
+class ScanSchedulerTestCase(TestCase):
+
+    def setUp(self):
+        self.now = timezone.now()
+        self.data_source = DataSource.objects.create(
+            name="test", scan_scheduling=ScanScheduling.SCHEDULED
+        )
+        self.hosts = [
+            Host.objects.create(
+                fqdn=f"host{i}.example.com", data_source=self.data_source
+            )
+            for i in range(120)
+        ]
+
+    def _get_scheduler(self, **kwargs):
+        kwargs.setdefault("max_batch_size", 1000)
+        kwargs.setdefault("now", self.now)
+        return ScanScheduler(
+            scan_interval=timedelta(hours=1),
+            run_interval=timedelta(minutes=1),
+            **kwargs,
+        )
+
+    def test_spreads_scans_over_interval(self, start_scan):
+        """
+        Test that a run only schedules its share of the fleet, and spreads the
+        scans over the run interval.
+        """
+        scans = self._get_scheduler().run()
+
+        # 120 hosts per hour, ran every minute => 2 hosts per run
+        self.assertEqual(len(scans), 2)
+        self.assertEqual(start_scan.call_count, 2)
+        for scan in scans:
+            self.assertTrue(0 <= scan.delay_seconds < 60)
+
+        self.assertEqual(Host.objects.filter(last_scan_scheduled=self.now).count(), 2)
+
+    def test_max_batch_size(self, start_scan):
+        """Test that the batch size is still respected"""
+        scans = self._get_scheduler(max_batch_size=1).run()
+
+        self.assertEqual(len(scans), 1)
+
+    def test_selected_hosts_defer_last_scan(self, start_scan):
+        """Test that selecting hosts doesn't load their last scans"""
+        hosts = self._get_scheduler().select_hosts(2)
+
+        self.assertEqual(len(hosts), 2)
+        for host in hosts:
+            self.assertIn("last_scan_cache", host.get_deferred_fields())
+
+    def test_skips_recently_scheduled_hosts(self, start_scan):
+        """
+        Test that hosts scheduled within the interval are not scheduled again,
+        and that hosts that were never scheduled go first.
+        """
+        Host.objects.exclude(pk=self.hosts[0].pk).update(
+            last_scan_scheduled=self.now - timedelta(hours=2),
+        )
+        Host.objects.filter(pk__in=[h.pk for h in self.hosts[1:10]]).update(
+            last_scan_scheduled=self.now - timedelta(minutes=5),
+        )
+
+        scans = self._get_scheduler().run()
+
+        self.assertEqual(scans[0].host, self.hosts[0])
+        self.assertNotIn(self.hosts[1], [scan.host for scan in scans])
+
+    def test_global_concurrency_limit(self, start_scan):
+        """
+        Test that no new scans are scheduled when the limit of in-flight scans
+        is reached.
+        """
+        Host.objects.filter(pk__in=[h.pk for h in self.hosts[:5]]).update(
+            last_scan_scheduled=self.now - timedelta(minutes=1),
+        )
+
+        scans = self._get_scheduler(max_concurrent_scans=5).run()
+
+        self.assertEqual(scans, [])
+
+    def test_data_source_concurrency_limit(self, start_scan):
+        """
+        Test that data sources with a limit get no more scans than allowed, while
+        other data sources are unaffected.
+        """
+        self.data_source.max_concurrent_scans = 1
+        self.data_source.save()
+        other_data_source = DataSource.objects.create(
+            name="other", scan_scheduling=ScanScheduling.SCHEDULED
+        )
+        # Both go after the hosts of the limited data source
+        other_hosts = [
+            Host.objects.create(
+                fqdn=f"other{i}.example.com", data_source=other_data_source
+            )
+            for i in range(2)
+        ]
+
+        scans = self._get_scheduler().run()
+
+        # The budget is still filled by hosts of the other data source
+        self.assertEqual(len(scans), 2)
+        self.assertEqual(
+            len([s for s in scans if s.host.data_source == self.data_source]), 1
+        )
+        self.assertIn(other_hosts[0], [s.host for s in scans])
+
+        # The limited data source now has a scan in flight
+        scans = self._get_scheduler(now=self.now + timedelta(minutes=1)).run()
+        self.assertEqual([s.host for s in scans], [other_hosts[1]])
+
+    def test_carries_over_unused_tokens(self, start_scan):
+        """
+        Test that tokens a run could not use carry over to the next run, and that
+        the bucket refills by the time that actually passed.
+        """
+        self.assertEqual(len(self._get_scheduler(max_concurrent_scans=0).run()), 0)
+
+        # Two runs worth of tokens
+        scans = self._get_scheduler(now=self.now + timedelta(minutes=1)).run()
+        self.assertEqual(len(scans), 4)
+
+        # The scheduler ran late, so the bucket refilled for three minutes
+        scans = self._get_scheduler(now=self.now + timedelta(minutes=4)).run()
+        self.assertEqual(len(scans), 6)
+
+        # But never beyond the maximum batch size
+        scans = self._get_scheduler(
+            now=self.now + timedelta(hours=1), max_batch_size=3
+        ).run()
+        self.assertEqual(len(scans), 3)
+
+    def test_run_interval_from_periodic_task(self, start_scan):
+        """
+        Test that the run interval is read from the periodic task of the
+        scheduler, falling back to the setting.
+        """
+        with self.settings(SCANNING_SCHEDULER_RUN_INTERVAL_SECONDS=120):
+            self.assertEqual(get_run_interval(), timedelta(seconds=120))
+
+        PeriodicTask.objects.create(
+            name="Scheduler",
+            task=SCANNING_FULL_SCAN_SCHEDULER,
+            interval=IntervalSchedule.objects.create(
+                every=5, period=IntervalSchedule.MINUTES
+            ),
+        )
+        self.assertEqual(get_run_interval(), timedelta(minutes=5))
+
+    def test_skips_offline_hosts(self, start_scan):
+        """Test that offline hosts are excluded by the scheduler"""
+        Host.objects.exclude(pk=self.hosts[0].pk).update(last_scan_scheduled=self.now)
+        self.hosts[0].set_offline()
+
+        scans = self._get_scheduler().run()
+
+        self.assertEqual(scans, [])
+
+        self.hosts[0].set_online()
+        scans = self._get_scheduler().run()
+
+        self.assertEqual([scan.host for scan in scans], [self.hosts[0]])
+
+    @override_settings(
+        SCANNING_BACKOFF_THRESHOLD=2,
+        SCANNING_BACKOFF_BASE_MINUTES=60,
+        SCANNING_BACKOFF_MAX_HOURS=3,
+    )
+    def test_backoff_after_repeated_failures(self, start_scan):
+        """
+        Test that hosts failing repeatedly are backed off exponentially, and that a
+        successful scan resets the backoff.
+        """
+        host = self.hosts[0]
+
+        host.record_scan_failure()
+        self.assertIsNone(host.scan_backoff_until)
+
+        expected_backoffs = [1, 2, 3, 3]
+        for hours in expected_backoffs:
+            host.record_scan_failure()
+            backoff = host.scan_backoff_until - timezone.now()
+            self.assertAlmostEqual(backoff.total_seconds(), hours * 3600, delta=60)
+
+        Host.objects.exclude(pk=host.pk).update(last_scan_scheduled=self.now)
+        self.assertEqual(self._get_scheduler().run(), [])
+
+        host.add_scan({"version": 2})
+        host.refresh_from_db()
+        self.assertEqual(host.consecutive_scan_failures, 0)
+        self.assertIsNone(host.scan_backoff_until)
+        self.assertEqual(len(self._get_scheduler().run()), 1)
+
+    def test_concurrent_scan_failures(self, start_scan):
+        """
+        Test that failures recorded through different instances of a host, like in
+        concurrent tasks, are all counted.
+        """
+        first = Host.objects.get(pk=self.hosts[0].pk)
+        second = Host.objects.get(pk=self.hosts[0].pk)
+
+        first.record_scan_failure()
+        second.record_scan_failure()
+
+        self.hosts[0].refresh_from_db()
+        self.assertEqual(self.hosts[0].consecutive_scan_failures, 2)
+        self.assertEqual(second.consecutive_scan_failures, 2)
+
+    @mock.patch("scanning.scheduling.get_queue_depth")
+    def test_queue_depth_limit(self, get_queue_depth, start_scan):
+        """
+        Test that the scheduler backs off when the scanner queue is full, or the
+        broker can't be reached.
+        """
+        get_queue_depth.return_value = 499
+        scans = self._get_scheduler(max_queue_depth=500).run()
+        self.assertEqual(len(scans), 1)
+
+        get_queue_depth.return_value = 600
+        self.assertEqual(self._get_scheduler(max_queue_depth=500).run(), [])
+
+        get_queue_depth.return_value = None
+        self.assertEqual(self._get_scheduler(max_queue_depth=500).run(), [])
+
+    def test_skips_hosts_being_scanned(self, start_scan):
+        """
+        Test that scheduled hosts get a scan lease, and that hosts with a scan in
+        flight are not scheduled again.
+        """
+        Host.objects.exclude(pk=self.hosts[0].pk).update(last_scan_scheduled=self.now)
+        self.hosts[0].acquire_scan_lease(self.now + timedelta(minutes=30))
+
+        self.assertEqual(self._get_scheduler().run(), [])
+
+        self.hosts[0].release_scan_lease(self.hosts[0].scan_lease_token)
+        scans = self._get_scheduler().run()
+
+        self.assertEqual([scan.host for scan in scans], [self.hosts[0]])
+        self.hosts[0].refresh_from_db()
+        self.assertEqual(self.hosts[0].scan_lease_token, scans[0].lease_token)
+
+    def test_skips_hosts_not_due_according_to_cadence(self, start_scan):
+        """
+        Test that hosts with a known cadence are scheduled when their next scan is
+        due, regardless of when they were last scheduled.
+        """
+        Host.objects.update(
+            last_scan_scheduled=self.now - timedelta(hours=2),
+            next_scan_at=self.now + timedelta(hours=1),
+        )
+        Host.objects.filter(pk=self.hosts[0].pk).update(
+            last_scan_scheduled=self.now - timedelta(minutes=5),
+            next_scan_at=self.now - timedelta(minutes=1),
+        )
+
+        scans = self._get_scheduler().run()
+
+        self.assertEqual([scan.host for scan in scans], [self.hosts[0]])
+        start_scan.assert_called_once_with(
+            self.hosts[0],
+            delay_seconds=scans[0].delay_seconds,
+            partial=True,
+            lease_token=scans[0].lease_token,
+        )
+
+        # Until results come in, the host will be retried after the scan interval
+        self.hosts[0].refresh_from_db()
+        self.assertEqual(self.hosts[0].next_scan_at, self.now + timedelta(hours=1))
+
+
+@override_settings(
+    SCANNING_METRIC_SCAN_INTERVAL_MINUTES=15,
+    SCANNING_MIN_FACT_SCAN_INTERVAL_MINUTES=60,
+    SCANNING_MAX_FACT_SCAN_INTERVAL_MINUTES=24 * 60,
+)
+class ScanCadenceTestCase(TestCase):
+
+    def setUp(self):
+        self.now = timezone.now()
+        self.scan_spec = ScanSpec.objects.create(name="test")
+        for artefact_name in ["generic.Memory", "generic.Users", "generic.Groups"]:
+            ArtefactSpec.objects.create(
+                artefact_name=artefact_name, scan_spec=self.scan_spec
+            )
+
+        self.host = Host.objects.create(
+            fqdn="host.example.com", scan_spec_override=self.scan_spec
+        )
+
+    def _get_scan_output(self, artefacts, *, facts=None, metrics=None, errors=None):
+        return ScanOutput.model_construct(
+            original_input=ScanInput(
+                hostname=self.host.fqdn,
+                artefacts={name: ArtefactScanOptions() for name in artefacts},
+                partial=True,
+            ),
+            scan_date=self.now,
+            hostname=self.host.fqdn,
+            facts=facts or {},
+            metrics=metrics or {},
+            errors=errors or [],
+        )
+
+    def test_inherited_cadence(self):
+        """Test that unset intervals are inherited from the parent or settings"""
+        parent = ScanSpec.objects.create(name="parent", metric_scan_interval=5)
+        self.scan_spec.parent = parent
+        self.scan_spec.max_fact_scan_interval = 120
+        self.scan_spec.save()
+
+        cadence = self.scan_spec.get_scan_cadence()
+
+        self.assertEqual(cadence.metric_interval, timedelta(minutes=5))
+        self.assertEqual(cadence.min_fact_interval, timedelta(minutes=60))
+        self.assertEqual(cadence.max_fact_interval, timedelta(minutes=120))
+
+    def test_fact_interval_follows_change_rate(self):
+        """
+        Test that stable facts are scanned less often than volatile facts, within
+        the configured bounds, and that metrics use their own interval.
+        """
+        cadence = self.scan_spec.get_scan_cadence()
+        statistics = {
+            "generic.Users": {"change_rate": 0.0},
+            "generic.Groups": {"change_rate": 1.0},
+            "generic.Memory": {"change_rate": 0.0},
+        }
+
+        self.assertEqual(
+            cadence.get_interval("generic.Users", statistics), timedelta(hours=24)
+        )
+        self.assertEqual(
+            cadence.get_interval("generic.Groups", statistics), timedelta(hours=1)
+        )
+        self.assertEqual(
+            cadence.get_interval("generic.Memory", statistics), timedelta(minutes=15)
+        )
+
+    def test_artefact_interval_override(self):
+        """
+        Test that artefacts with their own interval ignore the cadence of the spec,
+        and that those intervals are inherited.
+        """
+        parent = ScanSpec.objects.create(name="parent")
+        ArtefactSpec.objects.create(
+            artefact_name="generic.PackageList", scan_spec=parent, scan_interval=720
+        )
+        self.scan_spec.parent = parent
+        self.scan_spec.save()
+        self.scan_spec.artefacts.filter(artefact_name="generic.Memory").update(
+            scan_interval=5
+        )
+
+        cadence = self.scan_spec.get_scan_cadence()
+
+        self.assertEqual(
+            cadence.get_interval("generic.PackageList", {}), timedelta(hours=12)
+        )
+        self.assertEqual(
+            cadence.get_interval("generic.Memory", {}), timedelta(minutes=5)
+        )
+        self.assertEqual(cadence.get_interval("generic.Users", {}), timedelta(hours=1))
+
+    def test_partial_scan_input(self):
+        """Test that a partial scan input only contains the due artefacts"""
+        self.host.scan_statistics = {
+            "generic.Memory": {
+                "last_collected": (self.now - timedelta(minutes=20)).isoformat(),
+                "change_rate": 1.0,
+            },
+            "generic.Users": {
+                "last_collected": (self.now - timedelta(hours=2)).isoformat(),
+                "change_rate": 0.0,
+            },
+            "generic.Groups": {
+                "last_collected": (self.now - timedelta(hours=2)).isoformat(),
+                "change_rate": 1.0,
+            },
+        }
+
+        scan_input = self.host.get_scan_input(partial=True)
+
+        self.assertTrue(scan_input.partial)
+        self.assertEqual(
+            set(scan_input.artefacts), {"generic.Memory", "generic.Groups"}
+        )
+        # The other artefacts are still available for artefacts that require them
+        self.assertEqual(set(scan_input.available_artefacts), {"generic.Users"})
+
+        # Manual scans still collect everything
+        scan_input = self.host.get_scan_input()
+        self.assertFalse(scan_input.partial)
+        self.assertEqual(len(scan_input.artefacts), 3)
+
+    def test_change_rate_learning(self):
+        """
+        Test that the change rate of unchanged artefacts decays, and that failed
+        artefacts are marked as collected without affecting their change rate.
+        """
+        self.host.last_scan_cache = {"version": 2, "facts": {"generic.Users": []}}
+        self.host.scan_statistics = {"generic.Groups": {"change_rate": 0.5}}
+
+        scan_output = self._get_scan_output(
+            ["generic.Users", "generic.Groups"],
+            facts={"generic.Users": []},
+            errors=[ScanError(message="Failed", artefact="generic.Groups")],
+        )
+        update_host_cadence(self.host, scan_output)
+
+        statistics = self.host.scan_statistics
+        self.assertLess(statistics["generic.Users"]["change_rate"], 1.0)
+        self.assertEqual(statistics["generic.Groups"]["change_rate"], 0.5)
+        self.assertEqual(
+            statistics["generic.Groups"]["last_collected"], self.now.isoformat()
+        )
+        # Memory was never collected, so it's due right away
+        self.assertEqual(self.host.next_scan_at, self.now)
+
+    def test_merge_partial_scan(self):
+        """
+        Test that partial scans are completed with configured artefacts of the
+        previous scan, and that merging is idempotent.
+        """
+        self.host.last_scan_cache = {
+            "version": 2,
+            "facts": {"generic.Users": [], "generic.SELinux": None},
+            "metrics": {
+                "generic.Memory": {
+                    "total_mb": 1,
+                    "used_mb": 1,
+                    "free_mb": 0,
+                    "swap_total_mb": 0,
+                    "swap_used_mb": 0,
+                    "swap_free_mb": 0,
+                }
+            },
+        }
+
+        scan_output = self._get_scan_output(
+            ["generic.Groups"], facts={"generic.Groups": []}
+        )
+        merged = merge_host_scan(self.host, scan_output)
+
+        self.assertEqual(set(merged.facts), {"generic.Users", "generic.Groups"})
+        self.assertEqual(set(merged.metrics), {"generic.Memory"})
+        self.assertEqual(merge_host_scan(self.host, merged), merged)
+
+
+class ResolvedScanSpecTestCase(TestCase):
+
+    def setUp(self):
+        self.parent = ScanSpec.objects.create(name="parent", metric_scan_interval=5)
+        self.scan_spec = ScanSpec.objects.create(
+            name="test", parent=self.parent, artefact_groups=["generic"]
+        )
+        self.data_source = DataSource.objects.create(
+            name="test",
+            scan_scheduling=ScanScheduling.SCHEDULED,
+            default_scan_spec=self.scan_spec,
+        )
+        self.host = Host.objects.create(
+            fqdn="host.example.com", data_source=self.data_source
+        )
+
+    def test_resolved_spec_is_cached(self):
+        """
+        Test that resolved specs are cached, and invalidated when a spec or one of
+        its artefacts changes.
+        """
+        resolved = get_resolved_scan_spec(self.scan_spec.pk)
+        self.assertEqual(
+            resolved.artefacts, self.scan_spec._build_artefact_scan_input()
+        )
+        self.assertEqual(resolved.cadence.metric_interval, timedelta(minutes=5))
+
+        with self.assertNumQueries(0):
+            get_resolved_scan_spec(self.scan_spec.pk)
+
+        ArtefactSpec.objects.create(
+            artefact_name=registry.get_all_in_group("server")[0].__artefact_name__,
+            scan_spec=self.parent,
+        )
+        self.assertEqual(
+            len(get_resolved_scan_spec(self.scan_spec.pk).artefacts),
+            len(resolved.artefacts) + 1,
+        )
+
+        self.parent.metric_scan_interval = 10
+        self.parent.save()
+        self.assertEqual(
+            get_resolved_scan_spec(self.scan_spec.pk).cadence.metric_interval,
+            timedelta(minutes=10),
+        )
+
+    def test_scan_input(self):
+        """
+        Test that scan inputs are only built for schedulable hosts, unless forced.
+        """
+        scan_input = get_scan_input(self.host)
+        self.assertEqual(scan_input.hostname, self.host.fqdn)
+        self.assertEqual(
+            scan_input.artefacts, self.scan_spec._build_artefact_scan_input()
+        )
+
+        self.data_source.scan_scheduling = ScanScheduling.MANUAL
+        self.data_source.save()
+
+        self.assertIsNone(get_scan_input(self.host))
+        self.assertIsNotNone(get_scan_input(self.host, force=True))
+
+
+class StartScanTestCase(TestCase):
+
+    def setUp(self):
+        scan_spec = ScanSpec.objects.create(name="test", artefact_groups=["generic"])
+        data_source = DataSource.objects.create(
+            name="test",
+            scan_scheduling=ScanScheduling.SCHEDULED,
+            default_scan_spec=scan_spec,
+        )
+        self.host = Host.objects.create(
+            fqdn="host.example.com", data_source=data_source
+        )
+
+    @mock.patch("celery.canvas._chain.apply_async", autospec=True)
+    def test_priority_scan(self, apply_async):
+        """
+        Test that scans are sent with a pre-built scan input and an expiry, and
+        that priority scans are sent to the priority queue.
+        """
+        _start_scan(self.host)
+        run_scan = apply_async.call_args.args[0].tasks[0]
+
+        self.assertEqual(run_scan.task, SCANNER_RUN_SCAN)
+        self.assertEqual(run_scan.args[0]["hostname"], self.host.fqdn)
+        self.assertIn("expires", run_scan.options)
+        self.assertNotIn("queue", run_scan.options)
+
+        self.host.release_scan_lease(self.host.scan_lease_token)
+        _start_scan(self.host, priority=True)
+        run_scan = apply_async.call_args.args[0].tasks[0]
+
+        self.assertEqual(run_scan.options["queue"], SCANNER_PRIORITY_QUEUE)
+
+    @mock.patch("celery.canvas._chain.apply_async", autospec=True)
+    def test_scans_are_deduplicated(self, apply_async):
+        """
+        Test that a host can't be scanned while a scan is in flight, and that only
+        the results of the current scan are accepted.
+        """
+        self.assertIsNotNone(_start_scan(self.host))
+        self.assertIsNone(_start_scan(self.host, priority=True))
+        self.assertEqual(apply_async.call_count, 1)
+
+        lease = apply_async.call_args.args[0].tasks[0].args[0]["scan_lease"]
+        self.host.refresh_from_db()
+        self.assertTrue(self.host.holds_scan_lease(lease))
+        self.assertTrue(self.host.holds_scan_lease(None))
+
+        # Once the lease expires, a new scan supersedes the old one
+        Host.objects.filter(pk=self.host.pk).update(scan_lease_until=timezone.now())
+        self.assertIsNotNone(_start_scan(self.host))
+        self.host.refresh_from_db()
+        self.assertFalse(self.host.holds_scan_lease(lease))
+
+        # Releasing with an old token does nothing
+        self.host.release_scan_lease(lease)
+        self.host.refresh_from_db()
+        self.assertIsNotNone(self.host.scan_lease_token)
+
+    @mock.patch("scanning.utils.group")
+    def test_bulk_scans(self, group):
+        """
+        Test that bulk scans skip hosts that can't be scanned, spread the scans over
+        the window, and publish them in chunks.
+        """
+        hosts = [
+            Host.objects.create(
+                fqdn=f"bulk{i}.example.com", data_source=self.host.data_source
+            )
+            for i in range(4)
+        ]
+        hosts[0].acquire_scan_lease(timezone.now() + timedelta(minutes=5))
+        hosts[1].set_offline()
+
+        started = start_bulk_scans(
+            Host.objects.filter(fqdn__startswith="bulk"),
+            window_seconds=60,
+            chunk_size=1,
+        )
+
+        self.assertEqual(started, hosts[2:])
+        self.assertEqual(group.call_count, 2)
+        for host in started:
+            self.assertIn("last_scan_cache", host.get_deferred_fields())
+
+        etas = [
+            call.args[0][0].tasks[0].options["eta"] for call in group.call_args_list
+        ]
+        self.assertEqual((etas[1] - etas[0]).total_seconds(), 30)
+
+        self.assertEqual(
+            Host.objects.filter(
+                pk__in=[host.pk for host in hosts[2:]],
+                scan_lease_token__isnull=False,
+                last_scan_scheduled__isnull=False,
+            ).count(),
+            2,
+        )
+
+    @mock.patch("scanning.utils.start_bulk_scans", return_value=[])
+    def test_queue_scan_command_selection(self, start_bulk_scans):
+        """Test the host selection options of the queue_scan command"""
+        Host.objects.create(
+            fqdn="customer.example.com",
+            customer='"ACME"',
+            data_source=self.host.data_source,
+        )
+
+        call_command("queue_scan", "--customer", "ACME", "--window", "60")
+
+        hosts = start_bulk_scans.call_args.args[0]
+        self.assertEqual([host.fqdn for host in hosts], ["customer.example.com"])
+        self.assertEqual(start_bulk_scans.call_args.kwargs["window_seconds"], 60)
+
+        with self.assertRaises(CommandError):
+            call_command("queue_scan", "--data-source", "does-not-exist")
+
+        with self.assertRaisesMessage(CommandError, "use a positive integer"):
+            call_command("queue_scan", "--all", "--chunk-size", "0")
@@ -1,15 +1,27 @@
+import uuid
 from datetime import UTC, datetime, timedelta
+from itertools import batched
 
-from celery import signature
+from celery import group, signature
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q, QuerySet
 from django.utils import timezone
 
-from hosts.models import Host
+from hosts.models import Host, ScanScheduling
 from humitifier_common.celery.task_names import SCANNER_RUN_SCAN
+from humitifier_common.celery.task_routes import SCANNER_PRIORITY_QUEUE
+from humitifier_common.scan_data import ScanInput
 from humitifier_server.celery.task_names import *
+from humitifier_server.logger import logger
 
 
 def start_full_scan(
-    host: Host, *, force: bool = False, delay_seconds: int | None = None
+    host: Host,
+    *,
+    force: bool = False,
+    delay_seconds: int | None = None,
+    priority: bool = False,
 ):
     """
     Schedules and initiates a full scan on the given host. The scan can optionally be
@@ -23,17 +35,61 @@ def start_full_scan(
     :param delay_seconds: An optional delay, in seconds, before the scan begins.
         If None, the scan starts immediately.
     :type delay_seconds: int | None
-    :return: None
+    :param priority: Whether the scan should skip the queue of scheduled scans.
+        Meant for scans requested by a user.
+    :type priority: bool
+    :return: The result of the scan chain, or None if no scan was started
     """
-    host.last_scan_scheduled = timezone.now()
-    host.save()
-
-    # Bit of a hack, to skip the actual scan here
-    # TODO: make the schedular itself ignore offline hosts
+    # Offline hosts can't be scanned; the scheduler already excludes them, but
+    # this function is also used for manual scans.
     if host.is_offline:
-        return
+        return None
+
+    result = _start_scan(
+        host, force=force, delay_seconds=delay_seconds, priority=priority
+    )
+
+    if result is not None:
+        host.last_scan_scheduled = timezone.now()
+        host.save(update_fields=["last_scan_scheduled"])
+
+    return result
+
+
+def get_scan_input(
+    host: Host, *, force: bool = False, partial: bool = False
+) -> ScanInput | None:
+    """
+    Builds the scan input for a host, if the host may be scanned.
+
+    :param host: The host to build the scan input for
+    :param force: Whether to build a scan input for hosts whose data source does
+        not allow scheduled scanning
+    :param partial: Whether to only request the artefacts that are due. See
+        scanning.cadence
+    :return: The scan input, or None if the host may not be scanned
+    """
+    # Check if the host's data source allows scheduled scanning, and handle
+    # non-schedulable cases unless forced.
+    if (
+        not host.data_source
+        or host.data_source.scan_scheduling != ScanScheduling.SCHEDULED
+    ):
+        if not force:
+            logger.error(
+                f"Start-scan: scan requested for non-schedulable host {host.fqdn}"
+            )
+            return None
+
+    scan_input = host.get_scan_input(partial=partial)
 
-    _start_scan(host, force=force, delay_seconds=delay_seconds)
+    if not scan_input:
+        logger.error(
+            f"Start-scan: scan requested for host {host.fqdn} without scan spec set"
+        )
+        return None
+
+    return scan_input
 
 
 def _start_scan(
@@ -41,48 +97,172 @@ def _start_scan(
     *,
     force: bool = False,
     delay_seconds: int | None = None,
+    partial: bool = False,
+    priority: bool = False,
+    lease_token: uuid.UUID | None = None,
 ):
     """
     Starts a scanning process for a given host by creating a task chain with error
     handling, and optionally scheduling the process with a delay.
 
     The function orchestrates the following steps:
-    1. Generates the scan input based on the provided host and force configuration.
-    2. Configures error handling for the scan input generation process.
-    3. Sets up and executes the scanning operation, along with error handling for
-       the scanning process itself.
-    4. Combines the scan input generation and scanning processes into a task
-       chain, applying additional processing if necessary.
-    5. Optionally schedules the execution of the chain based on the provided delay.
+    1. Builds the scan input for the host; resolved scan specs are cached, so this
+       is cheap and saves a separate task to do so.
+    2. Sets up the scanning operation, along with error handling for the scanning
+       process itself.
+    3. Combines the scanning and processing into a task chain.
+    4. Optionally schedules the execution of the chain based on the provided delay.
+
+    Scans expire if they haven't started within SCANNING_IN_FLIGHT_TIMEOUT_MINUTES
+    of their scheduled time; the scheduler considers them lost after that, and
+    after an outage of the scanners we don't want to run a backlog of stale scans.
+
+    Only one scan per host can be in flight; the scan holds the scan lease of the
+    host until its results are processed, or until it expires. Requests to scan a
+    host that is already being scanned are dropped, as the scan in flight will
+    provide the same results.
 
     :param host: The host object containing all necessary information for scanning.
     :param force: Whether to force the scanning process regardless of existing configurations.
     :param delay_seconds: Optional delay in seconds to schedule the scan. If None, the task is
         executed immediately.
-    :return: None
+    :param partial: Whether to only collect the artefacts that are due, instead of
+        all artefacts. See scanning.cadence
+    :param priority: Whether to send the scan to the priority queue of the
+        scanners, skipping the queue of scheduled scans.
+    :param lease_token: The token of the scan lease, if it was already acquired by
+        the caller.
+    :return: The result of the chain, or None if the host may not be scanned or
+        is already being scanned
     """
-    # Get our generic log-error handler-task
-    log_error_task = signature(MAIN_LOG_ERROR)
+    scan_input = get_scan_input(host, force=force, partial=partial)
+    if scan_input is None:
+        return None
+
+    eta = None
+    if delay_seconds:
+        eta = datetime.now(UTC) + timedelta(seconds=delay_seconds)
+    expires = (eta or datetime.now(UTC)) + timedelta(
+        minutes=settings.SCANNING_IN_FLIGHT_TIMEOUT_MINUTES
+    )
+
+    if lease_token is None:
+        lease_token = host.acquire_scan_lease(expires)
+        if lease_token is None:
+            logger.info(f"Start-scan: a scan of {host.fqdn} is already in flight")
+            return None
+
+    scan_input.scan_lease = str(lease_token)
+
+    chain = _build_scan_chain(scan_input, eta=eta, expires=expires, priority=priority)
+
+    return chain.apply_async()
 
-    # Setup scan input creation
-    get_scan_input_task = signature(SCANNING_GET_SCAN_INPUT, args=(host.fqdn, force))
-    get_scan_input_task.on_error(log_error_task)
 
+def start_bulk_scans(
+    hosts: QuerySet[Host],
+    *,
+    force: bool = False,
+    delay_seconds: int = 0,
+    window_seconds: int = 0,
+    chunk_size: int = 500,
+) -> list[Host]:
+    """
+    Starts full scans for many hosts at once.
+
+    All hosts are locked, validated and leased in a single transaction, with one
+    UPDATE for all of them. The scans are spread evenly over the window, and
+    published in chunks; every chunk is sent as a single group, which reuses one
+    connection to the broker.
+
+    Archived and offline hosts, and hosts that are already being scanned, are
+    skipped. So are hosts that may not be scanned, unless forced.
+
+    :param hosts: The hosts to scan
+    :param force: Whether to also scan hosts whose data source does not allow
+        scheduled scanning
+    :param delay_seconds: The delay before the first scan starts
+    :param window_seconds: The period over which the scans are spread
+    :param chunk_size: The number of scans to publish at once
+    :return: The hosts for which a scan was started
+    """
+    now = datetime.now(UTC)
+    lease_token = uuid.uuid4()
+    lease_until = now + timedelta(
+        seconds=delay_seconds + window_seconds,
+        minutes=settings.SCANNING_IN_FLIGHT_TIMEOUT_MINUTES,
+    )
+
+    with transaction.atomic():
+        candidates = (
+            # Selecting by pk keeps any annotations or ordering of the given
+            # queryset out of the locking query
+            Host.objects.filter(pk__in=hosts.values("pk"), archived=False)
+            .online()
+            .filter(Q(scan_lease_until=None) | Q(scan_lease_until__lte=now))
+            .select_related("data_source")
+            # Building the scan inputs doesn't need the last scan, which can be
+            # large; the scan statistics are needed for partial scans
+            .defer("last_scan_cache")
+            .select_for_update(skip_locked=True, of=("self",))
+            .order_by("pk")
+        )
+
+        scan_inputs = {}
+        for host in candidates:
+            if scan_input := get_scan_input(host, force=force):
+                scan_inputs[host] = scan_input
+
+        Host.objects.filter(pk__in=[host.pk for host in scan_inputs]).update(
+            last_scan_scheduled=now,
+            scan_lease_token=lease_token,
+            scan_lease_until=lease_until,
+        )
+
+    chains = []
+    for i, (host, scan_input) in enumerate(scan_inputs.items()):
+        scan_input.scan_lease = str(lease_token)
+
+        eta = now + timedelta(
+            seconds=delay_seconds + window_seconds * i / len(scan_inputs)
+        )
+        expires = eta + timedelta(minutes=settings.SCANNING_IN_FLIGHT_TIMEOUT_MINUTES)
+
+        chains.append(_build_scan_chain(scan_input, eta=eta, expires=expires))
+
+    for chunk in batched(chains, chunk_size):
+        group(chunk).apply_async()
+
+    return list(scan_inputs)
+
+
+def _build_scan_chain(
+    scan_input: ScanInput,
+    *,
+    eta: datetime | None = None,
+    expires: datetime | None = None,
+    priority: bool = False,
+):
+    """
+    Builds the chain that runs a scan and processes its results.
+    """
     # Setup scan running
-    run_scan_task = signature(SCANNER_RUN_SCAN)
+    run_scan_task = signature(
+        SCANNER_RUN_SCAN, args=(scan_input.model_dump(mode="json"),)
+    )
 
     on_scan_error = signature(SCANNING_SCAN_HANDLE_ERROR)
     run_scan_task.on_error(on_scan_error)
 
-    # Setup the task-chain
-    chain = get_scan_input_task | run_scan_task | _get_processing_chain()
-
-    # Schedule our tasks
-    eta = None
-    if delay_seconds:
-        eta = datetime.now(UTC) + timedelta(seconds=delay_seconds)
+    if eta:
+        run_scan_task.set(eta=eta)
+    if expires:
+        run_scan_task.set(expires=expires)
+    if priority:
+        run_scan_task.set(queue=SCANNER_PRIORITY_QUEUE)
 
-    return chain.apply_async(eta=eta)
+    # Setup the task-chain
+    return run_scan_task | _get_processing_chain()
 
 
 def _get_processing_chain(initial_args: tuple | None = None):
@@ -30,10 +30,17 @@ class StartHostScanView(LoginRequiredMixin, SuperuserRequiredMixin, RedirectView
             return reverse("hosts:detail", args=[host_fqdn])
 
         if host.can_schedule_scan:
-            start_full_scan(host)
-            messages.success(
-                self.request, "Scan scheduled. It may take a few minutes to complete."
-            )
+            if start_full_scan(host, priority=True) is not None:
+                messages.success(
+                    self.request,
+                    "Scan scheduled. It may take a few minutes to complete.",
+                )
+            else:
+                messages.warning(
+                    self.request,
+                    "No scan was scheduled. The host is either offline, or "
+                    "already being scanned.",
+                )
         else:
             messages.error(self.request, "Scans cannot be scheduled for this host.")
 